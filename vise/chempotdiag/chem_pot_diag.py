@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 #  Copyright (c) 2020. Distributed under the terms of the MIT License.
 
+from itertools import combinations
 import json
 import string
+import struct
+import zipfile
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 import numpy as np
+from scipy.sparse import csr_matrix
 from typing import Optional, List, Dict
 
 from monty.json import MSONable, MontyEncoder
@@ -13,7 +17,7 @@ from monty.serialization import loadfn
 
 from pymatgen.analysis.phase_diagram import PhaseDiagram, PDEntry
 from pymatgen.core.composition import Composition
-from pymatgen.core.periodic_table import Element
+from pymatgen.core.periodic_table import Element, get_el_sp
 from pymatgen.util.string import latexify
 
 from vise.util.logger import get_logger
@@ -88,33 +92,28 @@ class ChemPotDiag(MSONable):
                 competing phases in the phase diagram equilibrates.
         """
         elements = sorted(pd.elements)
-        vertices = []
-        adjoin_comps = []  # List of adjoining compositions to each vertex.
+        entries = pd.qhull_entries
+        facets = np.array(pd.facets, dtype=int).reshape(-1, len(elements))
 
-        for fc in pd.facets:
-            comp_list = [pd.qhull_entries[i].composition for i in fc]
-            e_list = [pd.get_form_energy_per_atom(pd.qhull_entries[i])
-                      for i in fc]
-            atomic_frac = [[c.get_atomic_fraction(e) for e in elements]
-                           for c in comp_list]
-            chempot = dict(zip(elements, np.linalg.solve(atomic_frac, e_list)))
+        atomic_frac = np.array([[e.composition.get_atomic_fraction(el)
+                                 for el in elements] for e in entries])
+        form_energy = np.array([pd.get_form_energy_per_atom(e)
+                                for e in entries])
+        # Solve all the (dim x dim) linear equations at once.
+        chempots = np.linalg.solve(atomic_frac[facets],
+                                   form_energy[facets][..., np.newaxis])
+        vertices = np.round(chempots[..., 0], 10).tolist()
 
-            vertices.append([round(chempot[e], 10) for e in elements])
-            adjoin_comps.append([pd.qhull_entries[i].composition for i in fc])
-
-        comp_facets = []  # List of vertex indices comprising each composition.
-        for e in pd.qhull_entries:
-            comp_facets.append(
-                [i for i, cs in enumerate(adjoin_comps) if e.composition in cs])
+        comp_facets = cls._comp_facets(entries, facets)
 
         target_comp_chempot = {}
         unstable_energy = None
         if target_comp:
-            target_inds = [i for i, e in enumerate(pd.qhull_entries)
-                           if Composition(e.name) == Composition(target_comp)]
+            target_ind = \
+                cls._comp_indices(entries).get(Composition(target_comp))
 
             alphabet_list = list(string.ascii_uppercase)
-            if not target_inds:
+            if target_ind is None:
                 if not allow_unstable_target_chempot:
                     raise ValueError(f"Target composition {target_comp} "
                                      f"is invalid. Choose from "
@@ -130,26 +129,20 @@ class ChemPotDiag(MSONable):
                             f"{[e.name for e in pd.unstable_entries]}")
                     comp = target_inds[0].composition
                     unstable_energy = pd.get_hull_energy(comp)
-                    # Find the facet in phase diagram where comp belongs to.
+                    # Find the facets in phase diagram where comp belongs to,
+                    # whose indices are the same as the vertices.
                     c = pd.pd_coords(comp)
-                    facets = []
-                    for f, s in zip(pd.facets, pd.simplexes):
-                        if s.in_simplex(c, PhaseDiagram.numerical_tol / 10):
-                            facets.append(f)
-
-                    # Find the index of vertices in chemical potential diagram.
-                    for i, fc in enumerate(facets):
-                        ind = [v.tolist() for v in pd.facets].index(fc.tolist())
+                    inds = [i for i, s in enumerate(pd.simplexes)
+                            if s.in_simplex(c, PhaseDiagram.numerical_tol / 10)]
+
+                    for i, ind in enumerate(inds):
                         target_comp_chempot[alphabet_list[i]] = vertices[ind]
                         logger.warning(
                             f"Unstable compound {comp} is evaluated in "
                             f"ChemPotDiag. Unstable energy: {unstable_energy}.")
             else:
-                if len(comp_facets) > 26:
-                    raise ValueError(f"Too many vertices: {len(comp_facets)}.")
-
-                for i, fc in enumerate(comp_facets[target_inds[0]]):
-                    target_comp_chempot[alphabet_list[i]] = vertices[fc]
+                target_comp_chempot = \
+                    cls._labeled_vertices(vertices, comp_facets[target_ind])
 
         return cls(elements=elements,
                    el_ref_list=[pd.el_refs[e] for e in elements],
@@ -161,6 +154,233 @@ class ChemPotDiag(MSONable):
                    target_comp_chempot=target_comp_chempot,
                    unstable_energy=unstable_energy)
 
+    @staticmethod
+    def _comp_facets(entries: List[PDEntry],
+                     facets: np.ndarray) -> List[List[int]]:
+        """Vertex indices adjoining each entry via a sparse incidence matrix.
+
+        Entries with the same composition share the vertices.
+
+        Args:
+            entries (List[PDEntry]):
+                Entries, e.g., qhull_entries of PhaseDiagram.
+            facets (np.ndarray):
+                Entry indices comprising each facet in (n_facets, dim) shape.
+
+        Returns:
+            List of vertex indices for each entry in ascending order.
+        """
+        comp_ids = {}
+        entry_comp_ids = np.array(
+            [comp_ids.setdefault(e.composition, i)
+             for i, e in enumerate(entries)], dtype=int)
+
+        rows = entry_comp_ids[facets].ravel()
+        cols = np.repeat(np.arange(len(facets)), facets.shape[1])
+        incidence = csr_matrix((np.ones(len(rows), dtype=int), (rows, cols)),
+                               shape=(len(entries), len(facets)))
+        incidence.sum_duplicates()
+        incidence.sort_indices()
+
+        ptr, inds = incidence.indptr, incidence.indices
+        return [inds[ptr[i]:ptr[i + 1]].tolist() for i in entry_comp_ids]
+
+    @staticmethod
+    def _comp_indices(entries: List[PDEntry]) -> Dict[Composition, int]:
+        """Map from the compositions of entry names to the first indices."""
+        indices = {}
+        for i, e in enumerate(entries):
+            indices.setdefault(Composition(e.name), i)
+        return indices
+
+    @staticmethod
+    def _labeled_vertices(vertices: List[List[float]],
+                          facet: List[int]) -> Dict[str, List[float]]:
+        """Vertices labeled with alphabets as in target_comp_chempot."""
+        if len(facet) > 26:
+            raise ValueError(f"Too many vertices: {len(facet)}.")
+        return {label: [float(c) for c in vertices[i]]
+                for label, i in zip(string.ascii_uppercase, facet)}
+
+    def target_chempots(self, target_comps: Optional[List[str]] = None
+                        ) -> Dict[str, Dict[str, List[float]]]:
+        """Chemical potentials at the vertices of multiple targets.
+
+        Args:
+            target_comps (List[str]):
+                Target compositions. If None, all the stable compounds
+                including the elements are targeted.
+
+        Returns:
+            Dict of target compositions as keys and dicts in the same form as
+            target_comp_chempot as values.
+        """
+        return {target: self._labeled_vertices(self.vertices, facet)
+                for target, facet in self._target_facets(target_comps).items()}
+
+    def target_abs_chempots(self, target_comps: Optional[List[str]] = None
+                            ) -> Dict[str, Dict[str, List[float]]]:
+        """Same as target_chempots but in absolute scale."""
+        abs_vertices = np.round(np.array(self.vertices)
+                                + self._el_ref_energies, 10).tolist()
+        return {target: self._labeled_vertices(abs_vertices, facet)
+                for target, facet in self._target_facets(target_comps).items()}
+
+    def _target_facets(self, target_comps: Optional[List[str]]
+                       ) -> Dict[str, List[int]]:
+        stables = [e.name for e, fc in zip(self.qhull_entries, self.comp_facets)
+                   if fc]
+        if target_comps is None:
+            target_comps = stables
+
+        comp_indices = self._comp_indices(self.qhull_entries)
+        result = {}
+        for target in target_comps:
+            ind = comp_indices.get(Composition(target))
+            if ind is None or not self.comp_facets[ind]:
+                raise ValueError(f"Target composition {target} is invalid. "
+                                 f"Choose from {stables}")
+            result[target] = self.comp_facets[ind]
+        return result
+
+    @property
+    def _el_ref_energies(self) -> np.ndarray:
+        return np.array([e.energy_per_atom for e in self.el_ref_list])
+
+    def add_entry(self, entry: PDEntry, tol: float = 1e-8) -> bool:
+        """Add an entry and update only the vertices cut by it.
+
+        The stability region of the entry is the face of the chemical
+        potential polytope where sum_i x_i mu_i = dE, so the vertices with
+        sum_i x_i mu_i > dE are removed and the new vertices are searched only
+        among the entries adjoining the removed vertices. When the entry has
+        the same composition as an existing one, the existing one is replaced.
+
+        The whole diagram is recalculated via PhaseDiagram when the entry
+        changes an elemental reference, when it replaces an entry with a
+        higher energy, which enlarges the regions of the others, or in the
+        degenerate cases.
+
+        Args:
+            entry (PDEntry):
+                Entry to be added.
+            tol (float):
+                Tolerance in eV/atom to judge whether the entry cuts vertices.
+
+        Returns:
+            Whether the diagram is changed. False when the entry is above the
+            convex hull. ValueError is raised without changing the diagram
+            when the target composition becomes unstable.
+        """
+        if not set(entry.composition.elements) <= set(self.elements):
+            raise ValueError(f"{entry.name} has elements other than "
+                             f"{self.elements}.")
+
+        entries = self.qhull_entries
+        el_ref_energies = self._el_ref_energies
+
+        def frac(e: PDEntry) -> List[float]:
+            return [e.composition.get_atomic_fraction(el)
+                    for el in self.elements]
+
+        atomic_frac = np.array([frac(e) for e in entries])
+        form_energy = np.array([e.energy_per_atom for e in entries]) \
+            - atomic_frac @ el_ref_energies
+        x = np.array(frac(entry))
+        de = entry.energy_per_atom - x @ el_ref_energies
+
+        reduced_comp = entry.composition.reduced_composition
+        replaced = [i for i, e in enumerate(entries)
+                    if e.composition.reduced_composition == reduced_comp]
+        if any(entry.energy_per_atom > entries[i].energy_per_atom + tol
+               for i in replaced):
+            return self._recalc(entry, replaced)
+
+        is_removed = np.array(self.vertices) @ x - de > tol
+        if len(entry.composition.elements) == 1:
+            if de < -tol:
+                return self._recalc(entry, replaced)
+            return False
+        if not is_removed.any():
+            return False
+
+        facets = [[] for _ in self.vertices]
+        for i, fc in enumerate(self.comp_facets):
+            for v in fc:
+                facets[v].append(i)
+        if any(len(f) != self.dim for f in facets) \
+                or self.unstable_energy is not None:
+            return self._recalc(entry, replaced)
+
+        # The cut faces belong to the entries adjoining the removed vertices,
+        # so the new vertices are the intersections of the new hyperplane and
+        # dim - 1 hyperplanes of those entries.
+        neighbors = {i for f, removed in zip(facets, is_removed) if removed
+                     for i in f} - set(replaced)
+        new_ind = len(entries)
+        new_facets, new_vertices = [], []
+        for comb in combinations(sorted(neighbors), self.dim - 1):
+            a = np.vstack([atomic_frac[list(comb)], x])
+            if abs(np.linalg.det(a)) < tol:
+                continue
+            mu = np.linalg.solve(a, np.append(form_energy[list(comb)], de))
+            if np.any(atomic_frac @ mu - form_energy > tol):
+                continue
+            new_facets.append(list(comb) + [new_ind])
+            new_vertices.append(mu)
+
+        # More than dim hyperplanes meet at a vertex.
+        if len(np.unique(np.round(new_vertices, 8), axis=0)) \
+                < len(new_vertices):
+            return self._recalc(entry, replaced)
+
+        kept = np.flatnonzero(~is_removed)
+        all_facets = np.array([facets[i] for i in kept] + new_facets,
+                              dtype=int).reshape(-1, self.dim)
+        all_entries = entries + [entry]
+        vertices = np.round(np.vstack([np.array(self.vertices)[kept]]
+                                      + new_vertices), 10).tolist()
+
+        # Remove the replaced entry, which no longer adjoins any vertex.
+        for i in reversed(replaced):
+            all_facets[all_facets > i] -= 1
+            all_entries.pop(i)
+
+        comp_facets = self._comp_facets(all_entries, all_facets)
+
+        target_comp_chempot = {}
+        if self.target_comp:
+            target_inds = [i for i, e in enumerate(all_entries)
+                           if Composition(e.name)
+                           == Composition(self.target_comp)]
+            if not target_inds or not comp_facets[target_inds[0]]:
+                raise ValueError(self._unstable_target_msg(entry))
+            for label, fc in zip(string.ascii_uppercase,
+                                 comp_facets[target_inds[0]]):
+                target_comp_chempot[label] = vertices[fc]
+
+        self.vertices = vertices
+        self.qhull_entries = all_entries
+        self.comp_facets = comp_facets
+        self.target_comp_chempot = target_comp_chempot
+        return True
+
+    def _recalc(self, entry: PDEntry, replaced: List[int]) -> bool:
+        entries = [e for i, e in enumerate(self.qhull_entries)
+                   if i not in replaced]
+        pd = PhaseDiagram(entries + [entry])
+        cpd = self.from_phase_diagram(
+            pd, target_comp=self.target_comp,
+            allow_unstable_target_chempot=self.unstable_energy is not None)
+        if self.target_comp and not cpd.target_comp_chempot:
+            raise ValueError(self._unstable_target_msg(entry))
+        self.__dict__.update(cpd.__dict__)
+        return True
+
+    def _unstable_target_msg(self, entry: PDEntry) -> str:
+        return (f"Target composition {self.target_comp} becomes unstable by "
+                f"adding {entry.name}.")
+
     @property
     def target_comp_abs_chempot(self) -> Dict[str, List[float]]:
         """Same as target_comp_chempot but in absolute scale.
@@ -168,11 +388,11 @@ class ChemPotDiag(MSONable):
         Mostly used for calculating chemical potential-related properties such
         as point defects.
         """
-        abs_chempot = {}
-        for point, chempot in self.target_comp_chempot.items():
-            abs_chempot[point] = [round(e.energy_per_atom + c, 10)
-                                  for e, c in zip(self.el_ref_list, chempot)]
-        return abs_chempot
+        if not self.target_comp_chempot:
+            return {}
+        chempots = np.array(list(self.target_comp_chempot.values()))
+        abs_chempots = np.round(chempots + self._el_ref_energies, 10)
+        return dict(zip(self.target_comp_chempot, abs_chempots.tolist()))
 
     def draw_diagram(self,
                      title: str = None,
@@ -188,7 +408,7 @@ class ChemPotDiag(MSONable):
         Returns:
             Pyplot
         """
-        draw_range = min(-1.0, min(sum([i for i in self.vertices], [])) * 1.1)
+        draw_range = min(-1.0, float(np.min(self.vertices)) * 1.1)
 
         if self.dim == 2 or self.dim == 3:
             ax = self._plot(draw_range, title)
@@ -304,10 +524,123 @@ class ChemPotDiag(MSONable):
     def load_json(cls, filename: str = "cpd.json"):
         return loadfn(filename)
 
+    def as_dict(self) -> dict:
+        d = super().as_dict()
+        # vertices is a np.memmap when loaded by load_npz.
+        d["vertices"] = np.asarray(self.vertices).tolist()
+        return d
+
     def to_json_file(self, filename: str = "cpd.json"):
         with open(filename, 'w') as fw:
             json.dump(self.as_dict(), fw, indent=2, cls=MontyEncoder)
 
+    def to_npz_file(self, filename: str = "cpd.npz") -> None:
+        """Write a compact file of arrays and a slim entry table.
+
+        The file is an uncompressed npz so that load_npz can memory-map the
+        vertices. Entries are stored only with names, compositions and
+        energies, so they are restored as PDEntry.
+        """
+        entries = self.qhull_entries + self.el_ref_list
+        vertices = np.array(self.vertices, dtype=float).reshape(-1, self.dim)
+        facet_lengths = [len(fc) for fc in self.comp_facets]
+        facet_indices = [i for fc in self.comp_facets for i in fc]
+        target_chempots = np.array(list(self.target_comp_chempot.values()),
+                                   dtype=float).reshape(-1, self.dim)
+        unstable_energy = self.unstable_energy
+        np.savez(
+            filename,
+            vertices=vertices,
+            elements=np.array([str(el) for el in self.elements]),
+            entry_names=np.array([e.name for e in entries]),
+            entry_compositions=np.array(
+                json.dumps([e.composition.as_dict() for e in entries])),
+            entry_energies=np.array([e.energy for e in entries]),
+            num_qhull_entries=np.array(len(self.qhull_entries)),
+            comp_facet_indptr=np.cumsum([0] + facet_lengths),
+            comp_facet_indices=np.array(facet_indices, dtype=int),
+            target_comp=np.array(self.target_comp or ""),
+            target_labels=np.array(list(self.target_comp_chempot), dtype=str),
+            target_chempots=target_chempots,
+            unstable_energy=np.array(
+                np.nan if unstable_energy is None else unstable_energy))
+
+    @classmethod
+    def load_npz(cls, filename: str = "cpd.npz", mmap: bool = True
+                 ) -> "ChemPotDiag":
+        """Load the file written by to_npz_file.
+
+        Args:
+            filename (str):
+                npz file name.
+            mmap (bool):
+                Whether to memory-map the vertices. If True, vertices is a
+                read-only np.memmap and is not read until accessed. It is
+                written as a list by as_dict and replaced with a list by
+                add_entry.
+        """
+        with np.load(filename) as data:
+            arrays = {key: data[key] for key in data.files if key != "vertices"}
+            if not mmap:
+                arrays["vertices"] = data["vertices"].tolist()
+        if mmap:
+            arrays["vertices"] = _npz_memmap(filename, "vertices")
+
+        compositions = json.loads(str(arrays["entry_compositions"]))
+        entries = [PDEntry(Composition(c), float(energy), name=str(name))
+                   for c, energy, name in zip(compositions,
+                                              arrays["entry_energies"],
+                                              arrays["entry_names"])]
+        num_qhull = int(arrays["num_qhull_entries"])
+
+        ptr = arrays["comp_facet_indptr"]
+        indices = arrays["comp_facet_indices"].tolist()
+        comp_facets = [indices[ptr[i]:ptr[i + 1]] for i in range(num_qhull)]
+
+        target_comp_chempot = \
+            dict(zip(arrays["target_labels"].tolist(),
+                     arrays["target_chempots"].tolist()))
+        unstable_energy = float(arrays["unstable_energy"])
+
+        return cls(elements=[get_el_sp(el) for el in arrays["elements"]],
+                   el_ref_list=entries[num_qhull:],
+                   dim=len(arrays["elements"]),
+                   vertices=arrays["vertices"],
+                   qhull_entries=entries[:num_qhull],
+                   comp_facets=comp_facets,
+                   target_comp=str(arrays["target_comp"]) or None,
+                   target_comp_chempot=target_comp_chempot,
+                   unstable_energy=None if np.isnan(unstable_energy)
+                   else unstable_energy)
+
+
+def _npz_memmap(filename: str, name: str) -> np.memmap:
+    """Memory-map an array stored without compression in an npz file."""
+    with zipfile.ZipFile(filename) as zf:
+        info = zf.getinfo(f"{name}.npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{name} in {filename} is compressed.")
+
+    with open(filename, "rb") as f:
+        # The local file header is 30 bytes followed by the file name and
+        # the extra field, whose lengths are at bytes 26-29.
+        f.seek(info.header_offset)
+        header = f.read(30)
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = \
+                np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = \
+                np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+
+    return np.memmap(filename, dtype=dtype, mode="r", offset=offset,
+                     shape=shape, order="F" if fortran_order else "C")
+
 
 def sort_coords(coords: np.ndarray) -> np.ndarray:
     """Sort coordinates based on the angle with first coord from the center.
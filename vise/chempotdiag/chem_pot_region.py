@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2020. Distributed under the terms of the MIT License.
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.spatial import HalfspaceIntersection
+
+from monty.json import MSONable
+
+from pymatgen.analysis.phase_diagram import PDEntry
+from pymatgen.core.composition import Composition
+
+from vise.util.logger import get_logger
+
+""" Stability regions in chemical potential diagrams via halfspace intersection.
+
+The stable region of the chemical potentials relative to the elemental phases
+satisfies sum_i x_ji mu_i <= dE_j for all the compounds j, where x_ji is the
+atomic fraction and dE_j is the formation energy per atom. The region of a
+compound is the face of this polytope where its inequality is tight, so it is
+obtained without constructing the compositional convex hull.
+"""
+
+logger = get_logger(__name__)
+
+
+class ChemPotRegions(MSONable):
+    """Vertices and stability regions of compounds in chemical potential space.
+
+    Vertices on the artificial lower bound of the chemical potentials are also
+    included so that the regions are closed polytopes.
+    """
+    def __init__(self,
+                 elements: List[str],
+                 vertices: List[List[float]],
+                 comp_vertices: Dict[str, List[int]],
+                 lower_bound: float):
+        """
+        Args:
+            elements (List[str]):
+                Element names.
+            vertices (List[List[float]]):
+                Chemical potentials relative to the elemental phases at the
+                vertices.
+            comp_vertices (Dict[str, List[int]]):
+                Reduced formulas as keys and vertex indices comprising their
+                stability regions as values. Only stable compounds are included.
+            lower_bound (float):
+                Lower bound of the chemical potentials.
+        """
+        self.elements = elements
+        self.vertices = vertices
+        self.comp_vertices = comp_vertices
+        self.lower_bound = lower_bound
+
+    @property
+    def dim(self) -> int:
+        return len(self.elements)
+
+    @property
+    def on_lower_bound(self) -> List[bool]:
+        """Whether each vertex lies on the artificial lower bound."""
+        return [bool(np.isclose(min(v), self.lower_bound))
+                for v in self.vertices]
+
+    def adjacent_comps(self, formula: str) -> List[str]:
+        """Compounds whose regions share a (dim - 2)-dimensional face.
+
+        Args:
+            formula (str):
+                Reduced formula of the compound.
+
+        Returns:
+            List of reduced formulas.
+        """
+        formula = Composition(formula).reduced_formula
+        target = set(self.comp_vertices[formula])
+        adjacent = []
+        for name, inds in self.comp_vertices.items():
+            shared = sorted(target & set(inds))
+            if name == formula or len(shared) < self.dim - 1:
+                continue
+            coords = np.array([self.vertices[i] for i in shared])
+            if np.linalg.matrix_rank(coords - coords[0]) >= self.dim - 2:
+                adjacent.append(name)
+        return adjacent
+
+
+class ChemPotRegionEngine:
+    """Compute ChemPotRegions from entries with HalfspaceIntersection."""
+
+    def __init__(self,
+                 entries: Iterable[PDEntry],
+                 lower_bound: Optional[float] = None):
+        """
+        Only the lowest energy entry is considered for each composition.
+
+        Args:
+            entries (Iterable[PDEntry]):
+                Entries such as FreeEnergyEntrySet.
+            lower_bound (float):
+                Lower bound of the relative chemical potentials. If None, it is
+                set below all the vertices.
+        """
+        lowest = {}
+        for e in entries:
+            formula = e.composition.reduced_formula
+            if formula not in lowest \
+                    or e.energy_per_atom < lowest[formula].energy_per_atom:
+                lowest[formula] = e
+
+        self.elements = sorted({str(el) for e in lowest.values()
+                                for el in e.composition.elements})
+        el_refs = {}
+        for formula, e in lowest.items():
+            if len(e.composition.elements) == 1:
+                el_refs[str(e.composition.elements[0])] = e.energy_per_atom
+        missing = set(self.elements) - set(el_refs)
+        if missing:
+            raise ValueError(f"Elemental phases of {missing} do not exist.")
+
+        self.formulas = list(lowest)
+        self.atomic_frac = np.array(
+            [[e.composition.get_atomic_fraction(el) for el in self.elements]
+             for e in lowest.values()])
+        self.el_ref_energies = np.array([el_refs[el] for el in self.elements])
+        self.form_energy = \
+            np.array([e.energy_per_atom for e in lowest.values()]) \
+            - self.atomic_frac @ self.el_ref_energies
+
+        if lower_bound is None:
+            # A vertex satisfies x_ji mu_i >= dE_j for the adjoining compounds.
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(self.atomic_frac > 0,
+                                 self.form_energy[:, None] / self.atomic_frac,
+                                 0.0)
+            lower_bound = min(-1.0, 1.1 * ratio.min())
+        self.lower_bound = lower_bound
+
+    @property
+    def dim(self) -> int:
+        return len(self.elements)
+
+    def _halfspaces(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Halfspaces in A mu <= b form including the lower bound."""
+        a = np.vstack([self.atomic_frac, -np.eye(self.dim)])
+        b = np.concatenate([self.form_energy,
+                            np.full(self.dim, -self.lower_bound)])
+        return a, b
+
+    def regions(self, tol: float = 1e-6) -> ChemPotRegions:
+        """Stability regions of all the compounds.
+
+        Args:
+            tol (float):
+                Tolerance in eV to judge whether a vertex lies on a halfspace.
+
+        Returns:
+            ChemPotRegions object.
+        """
+        a, b = self._halfspaces()
+        if self.dim == 1:
+            vertices = np.array([[0.0], [self.lower_bound]])
+        else:
+            vertices = _intersections(a, b)
+
+        # Judge the active halfspaces with the residuals, which is robust for
+        # the degenerate vertices where more than dim halfspaces meet.
+        active = np.abs(vertices @ a[:len(self.formulas)].T
+                        - self.form_energy) < tol
+
+        comp_vertices = {}
+        for formula, is_active in zip(self.formulas, active.T):
+            inds = np.flatnonzero(is_active).tolist()
+            if _is_full_face(vertices[inds], self.dim):
+                comp_vertices[formula] = inds
+
+        return ChemPotRegions(elements=self.elements,
+                              vertices=vertices.tolist(),
+                              comp_vertices=comp_vertices,
+                              lower_bound=self.lower_bound)
+
+    def target_region(self, target_comp: str) -> List[List[float]]:
+        """Vertices of the stability region of a single compound.
+
+        The intersection is calculated only on the hyperplane of the target, so
+        the regions of the other compounds are not calculated.
+
+        Args:
+            target_comp (str):
+                Target composition.
+
+        Returns:
+            List of the relative chemical potentials at the vertices.
+        """
+        formula = Composition(target_comp).reduced_formula
+        if formula not in self.formulas:
+            raise ValueError(f"Target composition {target_comp} is invalid. "
+                             f"Choose from {self.formulas}")
+        t = self.formulas.index(formula)
+        a, b = self._halfspaces()
+        a_t, b_t = a[t], b[t]
+
+        # mu = mu_0 + basis @ s on the hyperplane of the target.
+        mu_0 = a_t * b_t / (a_t @ a_t)
+        basis = np.linalg.svd(a_t[None, :])[2][1:].T
+        others = np.arange(len(b)) != t
+        a_s = a[others] @ basis
+        b_s = b[others] - a[others] @ mu_0
+
+        if self.dim == 1:
+            return [mu_0.tolist()]
+
+        _, radius = _chebyshev_center(a_s, b_s)
+        if radius < 1e-8:
+            raise ValueError(f"{target_comp} is not stable.")
+
+        if self.dim == 2:
+            # Interval along the single basis vector.
+            upper = np.min(b_s[a_s[:, 0] > 0] / a_s[a_s[:, 0] > 0, 0])
+            lower = np.max(b_s[a_s[:, 0] < 0] / a_s[a_s[:, 0] < 0, 0])
+            s = np.array([[lower], [upper]])
+        else:
+            s = _intersections(a_s, b_s)
+
+        # Adding 0.0 removes the negative zeros.
+        return (np.round(mu_0 + s @ basis.T, 8) + 0.0).tolist()
+
+
+def _chebyshev_center(a: np.ndarray,
+                      b: np.ndarray) -> Tuple[Optional[np.ndarray], float]:
+    """Center and radius of the largest ball inside a x <= b."""
+    norm = np.linalg.norm(a, axis=1)[:, None]
+    c = np.zeros(a.shape[1] + 1)
+    c[-1] = -1
+    res = linprog(c, A_ub=np.hstack([a, norm]), b_ub=b,
+                  bounds=[(None, None)] * a.shape[1] + [(0, None)])
+    if not res.success:
+        # The halfspaces have no common region.
+        return None, 0.0
+    return res.x[:-1], res.x[-1]
+
+
+def _intersections(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Unique vertices of the polytope a x <= b."""
+    interior_point, radius = _chebyshev_center(a, b)
+    if radius <= 0:
+        raise ValueError("Interior point of the halfspaces is not found.")
+    hs = HalfspaceIntersection(np.hstack([a, -b[:, None]]), interior_point)
+    return np.unique(np.round(hs.intersections, 8) + 0.0, axis=0)
+
+
+def _is_full_face(coords: np.ndarray, dim: int) -> bool:
+    """Whether the coords span a (dim - 1)-dimensional face."""
+    if len(coords) < dim:
+        return False
+    if dim == 1:
+        return True
+    return np.linalg.matrix_rank(coords - coords[0], tol=1e-6) == dim - 1
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2020. Distributed under the terms of the MIT License.
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from vise.chempotdiag.chem_pot_region import ChemPotRegionEngine
+from vise.chempotdiag.free_energy_entries import FreeEnergyEntry
+from vise.chempotdiag.gas import Gas
+from vise.config import REFERENCE_PRESSURE
+from vise.util.logger import get_logger
+
+""" Chemical potential diagrams swept over temperatures and gas pressures.
+
+The solid phases are parsed only once and only the free energies of the gas
+phases are shifted at each condition. The stability regions are calculated
+with ChemPotRegionEngine, which does not need the compositional convex hull.
+"""
+
+logger = get_logger(__name__)
+
+
+class ChemPotSweep:
+    """Vertices of chemical potential diagrams at temperatures and pressures.
+
+    Attributes:
+        elements (List[str]):
+            Element names, which are common for all the conditions.
+        gases (List[str]):
+            Gas formulas, e.g., ["N2", "O2"].
+        conditions (np.ndarray):
+            (num_conditions, 1 + len(gases)) array of the temperature in K
+            and the partial pressures of the gases in Pa.
+        vertices (List[np.ndarray]):
+            (num_vertices, len(elements)) arrays of the chemical potentials
+            relative to el_ref_energies at each condition. Vertices on the
+            lower bound are also included.
+        lower_bounds (np.ndarray):
+            Lower bounds of the relative chemical potentials.
+        el_ref_energies (np.ndarray):
+            (num_conditions, len(elements)) array of the energies per atom of
+            the elemental phases.
+        target_comp (str):
+            Target composition.
+        target_vertices (List[np.ndarray]):
+            Vertices of the stability region of the target. Arrays with no
+            vertex mean that the target is unstable at the condition.
+    """
+
+    def __init__(self,
+                 elements: List[str],
+                 gases: List[str],
+                 conditions: np.ndarray,
+                 vertices: List[np.ndarray],
+                 lower_bounds: np.ndarray,
+                 el_ref_energies: np.ndarray,
+                 target_comp: Optional[str] = None,
+                 target_vertices: Optional[List[np.ndarray]] = None):
+        self.elements = list(elements)
+        self.gases = list(gases)
+        self.conditions = np.asarray(conditions, dtype=float)
+        self.vertices = vertices
+        self.lower_bounds = np.asarray(lower_bounds, dtype=float)
+        self.el_ref_energies = np.asarray(el_ref_energies, dtype=float)
+        self.target_comp = target_comp
+        self.target_vertices = target_vertices
+
+    def __len__(self):
+        return len(self.conditions)
+
+    @property
+    def temperatures(self) -> np.ndarray:
+        return self.conditions[:, 0]
+
+    def pressures(self, gas: str) -> np.ndarray:
+        return self.conditions[:, 1 + self.gases.index(gas)]
+
+    def abs_vertices(self, index: int) -> np.ndarray:
+        """Vertices in the absolute chemical potential scale."""
+        return self.vertices[index] + self.el_ref_energies[index]
+
+    def to_npz(self, filename: Union[str, Path] = "cpd_sweep.npz") -> None:
+        """Write arrays to npz file.
+
+        The vertices are padded with nan to the largest number of vertices
+        and the actual numbers are stored in num_vertices.
+        """
+        arrays = {"elements": np.array(self.elements),
+                  "gases": np.array(self.gases),
+                  "conditions": self.conditions,
+                  "lower_bounds": self.lower_bounds,
+                  "el_ref_energies": self.el_ref_energies}
+        arrays["vertices"], arrays["num_vertices"] = \
+            _pad(self.vertices, len(self.elements))
+
+        if self.target_comp:
+            arrays["target_comp"] = np.array(self.target_comp)
+            arrays["target_vertices"], arrays["num_target_vertices"] = \
+                _pad(self.target_vertices, len(self.elements))
+
+        np.savez_compressed(filename, **arrays)
+
+    @classmethod
+    def from_npz(cls, filename: Union[str, Path] = "cpd_sweep.npz"
+                 ) -> "ChemPotSweep":
+        with np.load(filename) as data:
+            kwargs = {"elements": data["elements"].tolist(),
+                      "gases": data["gases"].tolist(),
+                      "conditions": data["conditions"],
+                      "lower_bounds": data["lower_bounds"],
+                      "el_ref_energies": data["el_ref_energies"],
+                      "vertices": _unpad(data["vertices"],
+                                         data["num_vertices"])}
+            if "target_comp" in data:
+                kwargs["target_comp"] = str(data["target_comp"])
+                kwargs["target_vertices"] = \
+                    _unpad(data["target_vertices"],
+                           data["num_target_vertices"])
+
+        return cls(**kwargs)
+
+
+def sweep_chem_pot_diag(entries: List[FreeEnergyEntry],
+                        temperatures: Sequence[float],
+                        partial_pressures: Dict[str, Sequence[float]] = None,
+                        target_comp: Optional[str] = None,
+                        num_processes: int = 1) -> ChemPotSweep:
+    """Sweep chemical potential diagrams over temperatures and pressures.
+
+    Gas entries are those with free_e_shift, which are constructed from the
+    mol_* directories in FreeEnergyEntrySet.from_vasp_files with parse_gas.
+    Their total energies are reused and the zero point vibrational energies
+    and free energy shifts are replaced at each condition.
+
+    Args:
+        entries (List[FreeEnergyEntry]):
+            Entries of solid and gas phases.
+        temperatures (Sequence[float]):
+            Temperatures in K.
+        partial_pressures (Dict[str, Sequence[float]]):
+            Gas formulas as keys and sequences of pressures in Pa as values.
+            Example: {"O2": [1e-5, 1e5], "N2": [7e4]}
+            Pressures of the gases not included are set to REFERENCE_PRESSURE.
+        target_comp (str):
+            Target composition.
+        num_processes (int):
+            Number of processes used for calculating the diagrams.
+
+    Returns:
+        ChemPotSweep object. The conditions are ordered as
+        itertools.product(temperatures, pressures of gases[0], ...).
+    """
+    partial_pressures = partial_pressures or {}
+    solid_entries = [e for e in entries if e.free_e_shift is None]
+    gas_entries = [e for e in entries if e.free_e_shift is not None]
+
+    gases = sorted({e.composition.formula for e in gas_entries})
+    for name in set(partial_pressures) - set(gases):
+        logger.warning(f"Pressures of {name} are ignored as the gas entry "
+                       f"does not exist.")
+    pressures = [list(partial_pressures.get(g, [REFERENCE_PRESSURE]))
+                 for g in gases]
+
+    # Free energies of each gas on the (temperature, pressure) grid.
+    max_temperature = max(temperatures)
+    zpve, shifts = {}, {}
+    for g, p in zip(gases, pressures):
+        gas = Gas(g, temperature=max_temperature)
+        zpve[g] = gas.zero_point_vibrational_energy
+        shifts[g] = gas.free_energy_grid(temperatures, p)["chem_pot_shift"]
+
+    conditions, entries_list = [], []
+    indices = [range(len(temperatures))] + [range(len(p)) for p in pressures]
+    for i, *js in product(*indices):
+        conditions.append([temperatures[i]] +
+                          [p[j] for p, j in zip(pressures, js)])
+        shifted = []
+        for e in gas_entries:
+            name = e.composition.formula
+            j = js[gases.index(name)]
+            shifted.append(FreeEnergyEntry(composition=e.composition,
+                                           total_energy=e.total_energy,
+                                           zero_point_vib=zpve[name],
+                                           free_e_shift=shifts[name][i, j],
+                                           name=e.name))
+        entries_list.append(solid_entries + shifted)
+
+    if num_processes > 1:
+        with ProcessPoolExecutor(max_workers=num_processes) as executor:
+            chunksize = max(1, len(entries_list) // (4 * num_processes))
+            results = list(executor.map(_chem_pot_regions, entries_list,
+                                        [target_comp] * len(entries_list),
+                                        chunksize=chunksize))
+    else:
+        results = [_chem_pot_regions(e, target_comp) for e in entries_list]
+
+    elements = ChemPotRegionEngine(entries_list[0]).elements
+    vertices, lower_bounds, el_ref_energies, target_vertices = zip(*results)
+
+    return ChemPotSweep(
+        elements=elements,
+        gases=gases,
+        conditions=np.array(conditions),
+        vertices=list(vertices),
+        lower_bounds=np.array(lower_bounds),
+        el_ref_energies=np.array(el_ref_energies),
+        target_comp=target_comp,
+        target_vertices=list(target_vertices) if target_comp else None)
+
+
+def _chem_pot_regions(entries: List[FreeEnergyEntry],
+                      target_comp: Optional[str]
+                      ) -> Tuple[np.ndarray, float, np.ndarray,
+                                 Optional[np.ndarray]]:
+    """Calculate the regions at a condition. Picklable for process pools."""
+    engine = ChemPotRegionEngine(entries)
+    regions = engine.regions()
+    target_vertices = None
+    if target_comp:
+        try:
+            target_vertices = np.array(engine.target_region(target_comp))
+        except ValueError:
+            # Unstable at this condition.
+            target_vertices = np.zeros((0, engine.dim))
+
+    return (np.array(regions.vertices), engine.lower_bound,
+            engine.el_ref_energies, target_vertices)
+
+
+def _pad(arrays: List[np.ndarray], dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    num = np.array([len(a) for a in arrays], dtype=int)
+    padded = np.full((len(arrays), max(num, default=0), dim), np.nan)
+    for i, a in enumerate(arrays):
+        padded[i, :len(a)] = a
+    return padded, num
+
+
+def _unpad(padded: np.ndarray, num: np.ndarray) -> List[np.ndarray]:
+    return [p[:n] for p, n in zip(padded, num)]
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 #  Copyright (c) 2020. Distributed under the terms of the MIT License.
 
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
+import hashlib
+import json
+import os
 from pathlib import Path
-from typing import List, Dict, Union
+from typing import List, Dict, Union, Optional, Tuple
 import re
 
 from monty.json import MSONable
@@ -11,13 +15,13 @@ from monty.json import MSONable
 from pymatgen.analysis.phase_diagram import PDEntry
 from pymatgen.core.composition import Composition
 from pymatgen.entries.entry_tools import EntrySet
-from pymatgen.io.vasp import Vasprun
 
 from vise.util.mp_tools import get_mp_materials
 from vise.chempotdiag.gas import MOLECULE_DATA, Gas
 from vise.config import REFERENCE_PRESSURE
 from vise.util.logger import get_logger
 from vise.util.tools import parse_file
+from vise.util.vasprun_reader import LightVasprun
 
 logger = get_logger(__name__)
 
@@ -118,6 +122,8 @@ class FreeEnergyEntrySet(EntrySet, MSONable):
                         temperature: float = 0.0,
                         partial_pressures: Dict[str, float] = None,
                         ignore_file_not_found: bool = True,
+                        num_processes: int = 1,
+                        uses_cache: bool = True,
                         ) -> "FreeEnergyEntrySet":
         """ Constructs class object from vasp output files.
 
@@ -135,23 +141,35 @@ class FreeEnergyEntrySet(EntrySet, MSONable):
                 Dict of species as keys (str) and pressures in Pa as values.
                 Example: {"O2": 2e5, "N2": 70000}
             ignore_file_not_found (bool):
+            num_processes (int):
+                Number of processes used for parsing vasprun.xml files.
+            uses_cache (bool):
+                Whether to use the parse cache next to vasprun.xml.
+                See parse_composition_energy.
 
         Returns:
             FreeEnergyEntrySet class object.
         """
+        filenames = [Path(d) / vasprun for d in directory_paths]
+        if num_processes > 1:
+            with ProcessPoolExecutor(max_workers=num_processes) as executor:
+                futures = [executor.submit(_parse_composition_energy, f,
+                                           uses_cache) for f in filenames]
+                parsed = [future.result() for future in futures]
+        else:
+            parsed = [_parse_composition_energy(f, uses_cache)
+                      for f in filenames]
+
         energy_entries = []
-        for d in directory_paths:
-            logger.info(f"Parsing data in {d} ...")
-            try:
-                v: Vasprun = parse_file(Vasprun, Path(d) / vasprun)
-            except FileNotFoundError:
+        for d, filename, result in zip(directory_paths, filenames, parsed):
+            if result is None:
                 if ignore_file_not_found:
                     logger.error(f"{d} is not parsed as vasprun.xml does "
                                  f"not exist in it.")
                     continue
                 else:
-                    raise
-            composition = v.final_structure.composition.formula
+                    raise FileNotFoundError(f"{filename} does not exist.")
+            composition, final_energy = result
 
             kwargs = {}
             mol_dir = re.match(r"^mol_", str(d))
@@ -186,7 +204,7 @@ class FreeEnergyEntrySet(EntrySet, MSONable):
 
             energy_entries.append(
                 FreeEnergyEntry(composition=composition,
-                                total_energy=v.final_energy, **kwargs))
+                                total_energy=final_energy, **kwargs))
 
         return cls(energy_entries, temperature, partial_pressures)
 
@@ -271,3 +289,81 @@ class ConstrainedFreeEnergyEntrySet(FreeEnergyEntrySet):
                    pressure=entry_set.pressure)
 
 
+def parse_composition_energy(filename: Union[str, Path],
+                             uses_cache: bool = True) -> Tuple[str, float]:
+    """Composition formula and final energy in vasprun.xml with a cache.
+
+    The cache is written next to vasprun.xml, e.g., .vasprun.xml.cache.json,
+    and is used when the file size and mtime are unchanged or the sha1 hash
+    of the file is identical. The hash is stored only after the cache exists,
+    so vasprun.xml is read once at the first parse.
+
+    Args:
+        filename (str/Path):
+            vasprun.xml file name.
+        uses_cache (bool):
+            Whether to read and write the cache.
+
+    Returns:
+        Tuple of composition formula and final energy.
+    """
+    filename = Path(filename)
+    stat = os.stat(filename)
+    cache_file = filename.parent / f".{filename.name}.cache.json"
+
+    cache = _load_parse_cache(cache_file) if uses_cache else None
+    if cache and cache["size"] == stat.st_size \
+            and cache["mtime"] == stat.st_mtime:
+        return cache["composition"], cache["final_energy"]
+
+    # Hashing reads the whole file, so it is done only when the cache exists.
+    sha1 = _file_sha1(filename) if cache else None
+    if cache and cache["size"] == stat.st_size \
+            and cache.get("sha1") is not None and cache["sha1"] == sha1:
+        composition, final_energy = cache["composition"], cache["final_energy"]
+    else:
+        v = parse_file(LightVasprun, filename)
+        composition = v.final_structure.composition.formula
+        final_energy = v.final_energy
+
+    if uses_cache:
+        cache = {"size": stat.st_size,
+                 "mtime": stat.st_mtime,
+                 "sha1": sha1,
+                 "composition": composition,
+                 "final_energy": final_energy}
+        try:
+            with open(cache_file, "w") as fw:
+                json.dump(cache, fw)
+        except OSError as e:
+            logger.warning(f"Parse cache {cache_file} cannot be written: {e}")
+
+    return composition, final_energy
+
+
+def _parse_composition_energy(filename: Path,
+                              uses_cache: bool) -> Optional[Tuple[str, float]]:
+    """Return None if the file does not exist. Picklable for process pools."""
+    try:
+        return parse_composition_energy(filename, uses_cache)
+    except FileNotFoundError:
+        return None
+
+
+def _load_parse_cache(cache_file: Path) -> Optional[dict]:
+    try:
+        with open(cache_file) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning(f"Parse cache {cache_file} is broken and ignored.")
+        return None
+
+
+def _file_sha1(filename: Path, chunk_size: int = 1 << 20) -> str:
+    sha1 = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
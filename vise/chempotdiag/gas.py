@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 from functools import reduce
-from math import pi, log, exp, sqrt
+from math import pi, log
 from pathlib import Path
-from typing import Union
+from typing import Dict, Sequence, Union
 
+import numpy as np
 import yaml
 from pymatgen.core.composition import Composition
 from scipy.constants import hbar, eV, k, m_u
@@ -21,6 +22,9 @@ parent = Path(__file__).parent
 with open(parent / "molecules" / "molecule_data.yaml", 'r') as fr:
     MOLECULE_DATA = yaml.safe_load(fr)
 
+# Number of terms in the rotational partition sum for linear molecules.
+ROT_MAX_SUM = 50
+
 
 class Gas:
     def __init__(self,
@@ -56,14 +60,23 @@ class Gas:
         self.t = temperature
         self.pressure = pressure
 
-        high_temp_lim_criterion = max(self.char_rot_temp) * high_t_limit_factor
-        self.high_temp_lim = high_temp_lim_criterion < self.t
+        self.high_temp_lim_criterion = \
+            max(self.char_rot_temp) * high_t_limit_factor
+        self.high_temp_lim = self.high_temp_lim_criterion < self.t
 
         if self.is_linear is False and self.high_temp_lim is False:
             raise ValueError(
                 "Rotational free energy for non-linear molecule is estimated "
                 "only at the high-temperature limit. Set more than "
-                f"{high_temp_lim_criterion}K")
+                f"{self.high_temp_lim_criterion}K")
+
+        # Molecular constants used for the free energies.
+        composition = Composition(self.formula)
+        self._mass = composition.weight * m_u  # kg
+        self._n_atoms = composition.num_atoms
+        self._char_rot_temp_prod = reduce(lambda x, y: x * y,
+                                          self.char_rot_temp)
+        self._rot_j = np.arange(ROT_MAX_SUM)
 
     @property
     def zero_point_vibrational_energy(self) -> float:
@@ -79,41 +92,23 @@ class Gas:
 
     @property
     def trans_free_energy(self) -> float:
-        weight = Composition(self.formula).weight * m_u  # kg
-        quantum_volume = (2 * pi * hbar ** 2 / weight / self.kt) ** 1.5  # m^3
-        dist_func = self.kt / (self.pressure * quantum_volume)  # -
-        return - self.kt_in_ev * log(dist_func)  # eV
+        return float(self._trans_free_energy(self.t, self.pressure))
 
     @property
     def rot_free_energy(self) -> float:
-        max_sum = 50
-        if self.is_linear:
-            # high-temperature limit
-            if self.high_temp_lim:
-                q = self.t / self.char_rot_temp[0]
-            else:
-                factor = self.char_rot_temp[0] / self.t
-                q = sum([(2 * j + 1) * exp(-j * (j + 1) * factor)
-                         for j in range(0, max_sum)])
-        else:
-            # high-temperature limit
-            char_temp_mul = reduce(lambda x, y: x*y, self.char_rot_temp)
-            q = sqrt(pi * self.t ** 3) / sqrt(char_temp_mul)
-
-        return - self.kt_in_ev * log(q / self.sym_num)
+        return float(self._rot_free_energy(np.array([self.t]))[0])
 
     @property
     def vib_free_energy(self) -> float:
-        logs = [log(1 / (1 - exp(-t / self.t))) for t in self.char_vib_temp]
-        return - self.kt_in_ev * sum(logs)
+        return float(self._vib_free_energy(self.t))
 
     @property
     def spin_free_energy(self) -> float:
-        return - self.kt_in_ev * log(self.mag_degeneracy)
+        return float(self._spin_free_energy(self.t))
 
     @property
     def n_atoms(self) -> int:
-        return Composition(self.formula).num_atoms
+        return self._n_atoms
 
     @property
     def chem_pot_shift(self) -> float:
@@ -127,6 +122,80 @@ class Gas:
         return (self.chem_pot_shift +
                 self.zero_point_vibrational_energy / self.n_atoms)
 
+    def free_energy_grid(self,
+                         temperatures: Sequence[float],
+                         pressures: Sequence[float]) -> Dict[str, np.ndarray]:
+        """Free energy contributions on a temperature-pressure grid.
+
+        Note that the temperature and pressure of this object are not used.
+
+        Args:
+            temperatures (Sequence[float]):
+                Temperatures in K.
+            pressures (Sequence[float]):
+                Pressures in Pa.
+
+        Returns:
+            Dict of property names as keys, e.g., "trans_free_energy" and
+            "energy_shift", and np.ndarray with (len(temperatures),
+            len(pressures)) shape as values in the same units as the
+            properties.
+        """
+        t = np.asarray(temperatures, dtype=float)[:, np.newaxis]
+        p = np.asarray(pressures, dtype=float)[np.newaxis, :]
+        shape = (t.shape[0], p.shape[1])
+
+        if self.is_linear is False \
+                and np.any(t <= self.high_temp_lim_criterion):
+            raise ValueError(
+                "Rotational free energy for non-linear molecule is estimated "
+                "only at the high-temperature limit. Set more than "
+                f"{self.high_temp_lim_criterion}K")
+
+        grid = {"trans_free_energy": self._trans_free_energy(t, p),
+                "rot_free_energy": self._rot_free_energy(t[:, 0])[:, None],
+                "vib_free_energy": self._vib_free_energy(t),
+                "spin_free_energy": self._spin_free_energy(t)}
+        grid = {key: np.broadcast_to(value, shape).copy()
+                for key, value in grid.items()}
+
+        grid["chem_pot_shift"] = sum(grid.values()) / self.n_atoms
+        grid["energy_shift"] = (grid["chem_pot_shift"] +
+                                self.zero_point_vibrational_energy
+                                / self.n_atoms)
+        return grid
+
+    def _trans_free_energy(self, t, pressure):
+        kt = t * k  # J
+        quantum_volume = (2 * pi * hbar ** 2 / self._mass / kt) ** 1.5  # m^3
+        dist_func = kt / (pressure * quantum_volume)  # -
+        return - kt / eV * np.log(dist_func)  # eV
+
+    def _rot_free_energy(self, t: np.ndarray) -> np.ndarray:
+        if self.is_linear:
+            # The explicit sum is evaluated at once for all the temperatures
+            # and replaced by the high-temperature limit where possible.
+            high_t = t / self.char_rot_temp[0]
+            factor = self.char_rot_temp[0] / t[:, np.newaxis]
+            q = np.sum((2 * self._rot_j + 1)
+                       * np.exp(-self._rot_j * (self._rot_j + 1) * factor),
+                       axis=1)
+            q = np.where(t > self.high_temp_lim_criterion, high_t, q)
+        else:
+            # high-temperature limit
+            q = np.sqrt(pi * t ** 3 / self._char_rot_temp_prod)
+
+        return - t * k / eV * np.log(q / self.sym_num)
+
+    def _vib_free_energy(self, t):
+        t = np.asarray(t, dtype=float)
+        logs = [np.log(1 / (1 - np.exp(-char_t / t)))
+                for char_t in self.char_vib_temp]
+        return - t * k / eV * sum(logs)
+
+    def _spin_free_energy(self, t):
+        return - t * k / eV * log(self.mag_degeneracy)
+
 
 class NotRegisteredError(Exception):
     pass
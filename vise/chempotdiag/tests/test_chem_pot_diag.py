@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
+import tempfile
 import unittest
+from pathlib import Path
+
 import numpy as np
 from unittest.mock import patch
 
@@ -57,6 +60,110 @@ class TestChemPotDiag(ViseTest):
             target_comp="MgCaO2",
             allow_unstable_target_chempot=True)
 
+    def test_comp_facets(self):
+        for pd in [self.pd_2d, self.pd_3d, self.pd_4d, self.comp_pd]:
+            facets = np.array(pd.facets)
+            actual = ChemPotDiag._comp_facets(pd.qhull_entries, facets)
+            expected = [[i for i, fc in enumerate(pd.facets)
+                         if e.composition in
+                         [pd.qhull_entries[j].composition for j in fc]]
+                        for e in pd.qhull_entries]
+            self.assertEqual(expected, actual)
+
+    def test_add_entry(self):
+        mg = PDEntry(Composition("Mg"), -1.0)
+        ca = PDEntry(Composition("Ca"), -2.0)
+        o = PDEntry(Composition("O"), -4.0)
+        camg = PDEntry(Composition("Ca2Mg2"), -16.0)
+        camgo = PDEntry(Composition("CaMgO"), -17.0)
+        camgo2 = PDEntry(Composition("CaMgO2"), -11.0)
+
+        cpd = ChemPotDiag.from_phase_diagram(PhaseDiagram([mg, ca, camg, o]),
+                                             target_comp="CaMg")
+        self.assertTrue(cpd.add_entry(camgo))
+        expected = ChemPotDiag.from_phase_diagram(self.pd_3d,
+                                                  target_comp="CaMg")
+        self.assertEqual(sorted(expected.vertices), sorted(cpd.vertices))
+        self.assertEqual(sorted(expected.target_comp_chempot.values()),
+                         sorted(cpd.target_comp_chempot.values()))
+        # above the convex hull
+        self.assertFalse(cpd.add_entry(camgo2))
+
+    def test_add_entry_unstable_target(self):
+        vertices = self.cpd_2d.vertices
+        with self.assertRaises(ValueError):
+            self.cpd_2d.add_entry(PDEntry(Composition("Ca3Mg"), -40.0))
+        self.assertEqual(vertices, self.cpd_2d.vertices)
+
+    def assert_same_diagram(self, expected, actual):
+        np.testing.assert_almost_equal(sorted(expected.vertices),
+                                       sorted(actual.vertices))
+        np.testing.assert_almost_equal(
+            sorted(expected.target_comp_chempot.values()),
+            sorted(actual.target_comp_chempot.values()))
+
+    def add_entry_and_compare(self, entry):
+        reduced_comp = entry.composition.reduced_composition
+        entries = [e for e in self.pd_3d.all_entries
+                   if e.composition.reduced_composition != reduced_comp]
+        entries.append(entry)
+        expected = ChemPotDiag.from_phase_diagram(PhaseDiagram(entries),
+                                                  target_comp="CaMgO")
+        self.assertTrue(self.cpd_3d.add_entry(entry))
+        self.assert_same_diagram(expected, self.cpd_3d)
+
+    def test_add_entry_replaced_w_lower_energy(self):
+        self.add_entry_and_compare(PDEntry(Composition("CaMgO"), -20.0))
+
+    def test_add_entry_replaced_w_higher_energy(self):
+        self.add_entry_and_compare(PDEntry(Composition("CaMgO"), -15.0))
+
+    def test_add_entry_element(self):
+        self.add_entry_and_compare(PDEntry(Composition("Mg"), -1.5))
+
+    def test_add_entry_replaced_unstable_target(self):
+        vertices = self.cpd_3d.vertices
+        with self.assertRaises(ValueError):
+            self.cpd_3d.add_entry(PDEntry(Composition("CaMgO"), -5.0))
+        self.assertEqual(vertices, self.cpd_3d.vertices)
+
+    def test_npz(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            filename = str(Path(tmp_dirname) / "cpd.npz")
+            for cpd in [self.cpd_3d, self.cpd_3d_unstable]:
+                cpd.to_npz_file(filename)
+                actual = ChemPotDiag.load_npz(filename)
+                self.assertIsInstance(actual.vertices, np.memmap)
+                self.assertEqual(cpd.vertices, actual.vertices.tolist())
+                self.assertEqual(cpd.elements, actual.elements)
+                self.assertEqual(cpd.comp_facets, actual.comp_facets)
+                self.assertEqual(cpd.target_comp, actual.target_comp)
+                self.assertEqual(cpd.target_comp_abs_chempot,
+                                 actual.target_comp_abs_chempot)
+                self.assertEqual(cpd.unstable_energy, actual.unstable_energy)
+                self.assertEqual([e.name for e in cpd.qhull_entries],
+                                 [e.name for e in actual.qhull_entries])
+
+                actual = ChemPotDiag.load_npz(filename, mmap=False)
+                self.assertEqual(cpd.vertices, actual.vertices)
+                del actual
+
+    def test_npz_memmap_vertices(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            filename = str(Path(tmp_dirname) / "cpd.npz")
+            self.cpd_3d.to_npz_file(filename)
+            actual = ChemPotDiag.load_npz(filename)
+            self.assertEqual(self.cpd_3d.as_dict()["vertices"],
+                             actual.as_dict()["vertices"])
+            self.assertIsInstance(actual.as_dict()["vertices"], list)
+
+            entry = PDEntry(Composition("CaMgO"), -20.0)
+            self.assertTrue(actual.add_entry(entry))
+            self.assertTrue(self.cpd_3d.add_entry(entry))
+            self.assertIsInstance(actual.vertices, list)
+            self.assertEqual(self.cpd_3d.vertices, actual.vertices)
+            del actual
+
     def test_cpd_1d(self):
         self.assertEqual([Element.Mg], self.cpd_1d.elements)
         self.assertEqual(1, self.cpd_1d.dim)
@@ -110,6 +217,21 @@ class TestChemPotDiag(ViseTest):
                           'C': [0.0, -10.0, 0.0], 'D': [0.0, -5.0, -5.0]},
                          self.cpd_3d.target_comp_chempot)
 
+    def test_target_chempots(self):
+        actual = self.cpd_3d.target_chempots()
+        actual_abs = self.cpd_3d.target_abs_chempots()
+        self.assertEqual({"Ca", "Mg", "O2", "CaMg", "CaMgO"}, set(actual))
+        for target in actual:
+            cpd = ChemPotDiag.from_phase_diagram(pd=self.pd_3d,
+                                                 target_comp=target)
+            self.assertEqual(cpd.target_comp_chempot, actual[target])
+            self.assertEqual(cpd.target_comp_abs_chempot, actual_abs[target])
+
+        self.assertEqual({"MgCaO": self.cpd_3d.target_comp_chempot},
+                         self.cpd_3d.target_chempots(["MgCaO"]))
+        with self.assertRaises(ValueError):
+            self.cpd_3d.target_chempots(["CaMgO2"])
+
     @unittest.skipIf(not ViseTest.DISPLAY_DIAGRAM, ViseTest.no_display_reason)
     def test_cpd_3d_draw(self):
         self.cpd_3d.draw_diagram()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+from pymatgen.core.composition import Composition
+from pymatgen.analysis.phase_diagram import PDEntry
+
+from vise.chempotdiag.chem_pot_region import ChemPotRegionEngine
+from vise.util.testing import ViseTest
+
+
+class TestChemPotRegionEngine(ViseTest):
+
+    def setUp(self) -> None:
+        mg = PDEntry(Composition("Mg"), -1.0)
+        mg2 = PDEntry(Composition("Mg"), -0.5)
+        ca = PDEntry(Composition("Ca"), -2.0)
+        o = PDEntry(Composition("O"), -4.0)
+        camg = PDEntry(Composition("Ca2Mg2"), -16.0)  # rel -10.0
+        camgo = PDEntry(Composition("CaMgO"), -17.0)  # rel -10.0
+        camgo2 = PDEntry(Composition("CaMgO2"), -11.0)  # rel 0.0
+
+        self.engine_2d = ChemPotRegionEngine([mg, mg2, ca, camg])
+        self.engine_3d = \
+            ChemPotRegionEngine([mg, ca, camg, o, camgo, camgo2])
+
+    def test_regions_2d(self):
+        regions = self.engine_2d.regions()
+        self.assertEqual(["Ca", "Mg"], regions.elements)
+        vertices = [v for v, b in zip(regions.vertices, regions.on_lower_bound)
+                    if not b]
+        self.assertEqual([[-5.0, 0.0], [0.0, -5.0]], vertices)
+        self.assertEqual({"Ca", "Mg", "CaMg"}, set(regions.comp_vertices))
+
+    def test_regions_3d(self):
+        regions = self.engine_3d.regions()
+        vertices = [v for v, b in zip(regions.vertices, regions.on_lower_bound)
+                    if not b]
+        self.assertEqual([[-10.0, 0.0, 0.0], [-5.0, 0.0, -5.0],
+                          [0.0, -10.0, 0.0], [0.0, -5.0, -5.0]], vertices)
+        self.assertNotIn("CaMgO2", regions.comp_vertices)
+        self.assertEqual(["Ca", "CaMg", "Mg", "O2"],
+                         sorted(regions.adjacent_comps("CaMgO")))
+
+    def test_target_region(self):
+        expected = [[-10.0, 0.0, 0.0], [-5.0, 0.0, -5.0],
+                    [0.0, -10.0, 0.0], [0.0, -5.0, -5.0]]
+        self.assertEqual(expected,
+                         sorted(self.engine_3d.target_region("MgCaO")))
+        self.assertEqual([[-5.0, 0.0], [0.0, -5.0]],
+                         sorted(self.engine_2d.target_region("CaMg")))
+
+    def test_target_region_unstable(self):
+        with self.assertRaises(ValueError):
+            self.engine_3d.target_region("CaMgO2")
+
+    def test_msonable(self):
+        self.assertMSONable(self.engine_3d.regions())
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from vise.chempotdiag.chem_pot_region import ChemPotRegionEngine
+from vise.chempotdiag.chem_pot_sweep import ChemPotSweep, sweep_chem_pot_diag
+from vise.chempotdiag.free_energy_entries import FreeEnergyEntry
+from vise.chempotdiag.gas import Gas
+from vise.util.testing import ViseTest
+
+
+class TestSweepChemPotDiag(ViseTest):
+
+    def setUp(self) -> None:
+        self.mg = FreeEnergyEntry("Mg", -1.0)
+        self.mgo = FreeEnergyEntry("MgO", -10.0)
+        self.o2 = FreeEnergyEntry("O2", -8.0, zero_point_vib=0.1,
+                                  free_e_shift=-0.5)
+        self.sweep = sweep_chem_pot_diag(
+            entries=[self.mg, self.mgo, self.o2],
+            temperatures=[300.0, 1000.0],
+            partial_pressures={"O2": [1e-5, 1e+5]},
+            target_comp="MgO")
+
+    def test_conditions(self):
+        self.assertEqual(["Mg", "O"], self.sweep.elements)
+        self.assertEqual(["O2"], self.sweep.gases)
+        self.assertEqual([300.0, 300.0, 1000.0, 1000.0],
+                         self.sweep.temperatures.tolist())
+        self.assertEqual([1e-5, 1e+5, 1e-5, 1e+5],
+                         self.sweep.pressures("O2").tolist())
+
+    def test_vertices(self):
+        for i, (t, p) in enumerate(self.sweep.conditions):
+            gas = Gas("O2", temperature=t, pressure=p)
+            o2 = FreeEnergyEntry("O2", -8.0,
+                                 zero_point_vib=gas.zero_point_vibrational_energy,
+                                 free_e_shift=gas.chem_pot_shift)
+            engine = ChemPotRegionEngine([self.mg, self.mgo, o2])
+            np.testing.assert_array_almost_equal(
+                engine.regions().vertices, self.sweep.vertices[i])
+            np.testing.assert_array_almost_equal(
+                engine.target_region("MgO"), self.sweep.target_vertices[i])
+            np.testing.assert_array_almost_equal(
+                engine.el_ref_energies, self.sweep.el_ref_energies[i])
+
+    def test_parallel(self):
+        actual = sweep_chem_pot_diag(entries=[self.mg, self.mgo, self.o2],
+                                     temperatures=[300.0, 1000.0],
+                                     partial_pressures={"O2": [1e-5, 1e+5]},
+                                     target_comp="MgO",
+                                     num_processes=2)
+        for a, b in zip(self.sweep.vertices, actual.vertices):
+            np.testing.assert_array_almost_equal(a, b)
+
+    def test_npz(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            filename = Path(tmp_dirname) / "cpd_sweep.npz"
+            self.sweep.to_npz(filename)
+            actual = ChemPotSweep.from_npz(filename)
+
+        self.assertEqual(self.sweep.elements, actual.elements)
+        self.assertEqual(self.sweep.target_comp, actual.target_comp)
+        np.testing.assert_array_equal(self.sweep.conditions, actual.conditions)
+        for a, b in zip(self.sweep.vertices, actual.vertices):
+            np.testing.assert_array_equal(a, b)
+        for a, b in zip(self.sweep.target_vertices, actual.target_vertices):
+            np.testing.assert_array_equal(a, b)
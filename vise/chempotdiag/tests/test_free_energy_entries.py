@@ -2,14 +2,18 @@
 
 import os
 from pathlib import Path
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
 import warnings
 
 from pymatgen.core.composition import Composition
 from pymatgen.core.sites import Element
 
 from vise.chempotdiag.free_energy_entries import (
-    FreeEnergyEntry, FreeEnergyEntrySet, ConstrainedFreeEnergyEntrySet)
+    FreeEnergyEntry, FreeEnergyEntrySet, ConstrainedFreeEnergyEntrySet,
+    parse_composition_energy)
 from vise.util.testing import ViseTest
 
 
@@ -88,7 +92,8 @@ O2,0,2.0,-112
                  parent_dir / "vasp_MgO"]
         entry_set = FreeEnergyEntrySet.from_vasp_files(paths,
                                                        parse_gas=True,
-                                                       temperature=200)
+                                                       temperature=200,
+                                                       uses_cache=False)
         expected = {"Mg", "MgO", "O2"}
         actual = {str(e.name) for e in entry_set}
 
@@ -106,6 +111,39 @@ O2,0,2.0,-112
 # PDEntry : MgO with composition Mg1 O1. Energy: -12.512. Zero point vib energy: none. Free energy contribution: none. Data: None"""
 #         self.assertEqual(expected, str(entry_set))
 
+    def test_from_vasp_files_parallel(self):
+        paths = [parent_dir / "vasp_Mg", parent_dir / "vasp_MgO"]
+        entry_set = FreeEnergyEntrySet.from_vasp_files(paths,
+                                                       num_processes=2,
+                                                       uses_cache=False)
+        expected = {-5.18827492, -12.51242284}
+        actual = {e.energy for e in entry_set}
+        self.assertEqual(expected, actual)
+
+    def test_parse_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            filename = Path(tmp_dirname) / "vasprun.xml"
+            shutil.copy(parent_dir / "vasp_MgO" / "vasprun.xml", filename)
+            expected = ("Mg1 O1", -12.51242284)
+            self.assertEqual(expected, parse_composition_energy(filename))
+            self.assertTrue(
+                (Path(tmp_dirname) / ".vasprun.xml.cache.json").is_file())
+
+            path = "vise.chempotdiag.free_energy_entries.parse_file"
+            with patch(path) as mock:
+                self.assertEqual(expected, parse_composition_energy(filename))
+                mock.assert_not_called()
+
+            # The hash is not stored at the first parse to avoid reading the
+            # file twice, so the touched file is parsed once more.
+            os.utime(filename, (0, 0))
+            self.assertEqual(expected, parse_composition_energy(filename))
+            with patch(path) as mock:
+                # Touched file is identified with the hash.
+                os.utime(filename, (0, 1))
+                self.assertEqual(expected, parse_composition_energy(filename))
+                mock.assert_not_called()
+
     @unittest.skipIf(not ViseTest.PMG_MAPI_KEY, ViseTest.no_mapi_key)
     def test_from_mp(self):
         entry_set = FreeEnergyEntrySet.from_mp(["Mg", "O"])
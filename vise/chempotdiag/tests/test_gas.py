@@ -30,3 +30,17 @@ class TestGas(ViseTest):
         with self.assertRaises(ValueError):
             low_temp_nh3 = Gas("NH3", temperature=100)
 
+    def test_free_energy_grid(self):
+        temperatures = [300, 1000]
+        pressures = [REFERENCE_PRESSURE, 1e-3]
+        actual = self.o2.free_energy_grid(temperatures, pressures)
+        for i, t in enumerate(temperatures):
+            for j, p in enumerate(pressures):
+                gas = Gas("O2", temperature=t, pressure=p)
+                for key, value in actual.items():
+                    self.assertEqual((2, 2), value.shape)
+                    self.assertAlmostEqual(getattr(gas, key), value[i, j])
+
+    def test_free_energy_grid_error(self):
+        with self.assertRaises(ValueError):
+            self.nh3.free_energy_grid([100, 1000], [REFERENCE_PRESSURE])
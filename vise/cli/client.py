@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2020. Distributed under the terms of the MIT License.
+
+import json
+import os
+import socket
+import sys
+from typing import List, Optional
+
+from vise.config import SERVER_SOCKET
+
+""" Thin client sending vise commands to "vise serve".
+
+Usage is the same as vise, e.g., "vise_client vs -x hse". The socket is set by
+the VISE_SERVER_SOCKET environment variable. When the server is not running,
+the command is run in this process instead.
+"""
+
+__author__ = "Yu Kumagai"
+__maintainer__ = "Yu Kumagai"
+
+
+def request(args: List[str],
+            socket_path: str,
+            cwd: Optional[str] = None) -> dict:
+    """Send a command to the server and receive the response.
+
+    Args:
+        args (List[str]):
+            Command line arguments without "vise".
+        socket_path (str):
+            Unix domain socket path of the server.
+        cwd (str):
+            Working directory where the command is run. The current directory
+            is used when not given.
+
+    Returns:
+        Dict of "returncode", "stdout" and "stderr".
+    """
+    message = {"args": args, "cwd": cwd or os.getcwd()}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(socket_path)
+        with s.makefile("rw", encoding="utf-8") as f:
+            f.write(json.dumps(message) + "\n")
+            f.flush()
+            s.shutdown(socket.SHUT_WR)
+            return json.loads(f.readline())
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        if SERVER_SOCKET is None:
+            raise ConnectionError
+        response = request(args, SERVER_SOCKET)
+    except (ConnectionError, FileNotFoundError):
+        from vise.cli.main import main as vise_main
+        vise_main()
+        return
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    sys.exit(response["returncode"])
+
+
+if __name__ == "__main__":
+    main()
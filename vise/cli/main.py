@@ -3,24 +3,27 @@
 #  Copyright (c) 2020. Distributed under the terms of the MIT License.
 
 import argparse
+from argparse import Namespace
+from importlib import import_module
 import sys
-from typing import Union, List, Dict
-
-from vise.cli.main_function import (
-    get_poscar_from_mp, vasp_set, chempotdiag, plot_band, plot_dos, vasp_run,
-    kpt_conv, band_gap)
-from vise.config import SYMMETRY_TOLERANCE, ANGLE_TOL, KPT_DENSITY, TIMEOUT
-from vise.custodian_extension.jobs import ViseVaspJob
-from vise.custodian_extension.handler_groups import handler_group
-from vise.input_set.input_set import ViseInputSet
+from typing import Callable, Union, List, Dict, Optional
+
+from vise.config import (
+    SYMMETRY_TOLERANCE, ANGLE_TOL, KPT_DENSITY, TIMEOUT, SERVER_SOCKET)
 from vise.input_set.xc import Xc
 from vise.input_set.task import Task
 from vise.util.logger import get_logger
 from vise.cli.main_tools import dict2list, get_user_settings, get_default_args
-from vise.util.mp_tools import make_poscars_from_mp
 from vise.util.tools import str2bool
 from vise import __version__
 
+"""Command line interface of vise.
+
+Modules depending on pymatgen, custodian and matplotlib are imported only
+when the dispatched subcommand needs them, as vise is called many times from
+workflow scripts.
+"""
+
 __author__ = "Yu Kumagai"
 __maintainer__ = "Yu Kumagai"
 
@@ -84,6 +87,8 @@ def vasp_set_args() -> List[List]:
     Returns:
         List of args and kwargs.
     """
+    from vise.input_set.input_set import ViseInputSet
+
     vasp_set_defaults = get_default_args(ViseInputSet.make_input)
     vasp_set_defaults.update(ViseInputSet.TASK_OPTIONS)
     vasp_set_defaults.update(ViseInputSet.XC_OPTIONS)
@@ -159,20 +164,8 @@ def vasp_set_args() -> List[List]:
     return d
 
 
-def parse_args(args):
-
-    parser = argparse.ArgumentParser(
-        description="""                            
-    Vise is a package that helps researchers to do first-principles calculations 
-    with the VASP code.""",
-        epilog=f"""                                 
-    Author: Yu Kumagai \n
-    Version: {__version__}""",
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-
-    subparsers = parser.add_subparsers()
-
-    # -- parent parser: prec
+def make_prec_parser() -> argparse.ArgumentParser:
+    """Parent parser for the symmetry precisions."""
     prec = {"symprec": SYMMETRY_TOLERANCE,
             "angle_tolerance": ANGLE_TOL}
     simple_override(prec, ["symprec", "angle_tolerance"])
@@ -186,7 +179,14 @@ def parse_args(args):
         "--angle_tolerance", type=float, default=prec["angle_tolerance"],
         help="Set angle precision used for symmetry analysis.")
 
-    # -- parent parser:  custodian
+    return prec_parser
+
+
+def make_custodian_parser() -> argparse.ArgumentParser:
+    """Parent parser for the custodian runs."""
+    from vise.custodian_extension.handler_groups import handler_group
+    from vise.custodian_extension.jobs import ViseVaspJob
+
     custodian_defaults = get_default_args(ViseVaspJob.kpt_converge)
     custodian_defaults["vasp_cmd"] = None
     custodian_defaults["timeout"] = TIMEOUT
@@ -222,7 +222,11 @@ def parse_args(args):
         "--remove_wavecar", action="store_true",
         help="Remove WAVECAR file after the calculation is finished.")
 
-    # -- parent parser:  vasp set
+    return custodian_parser
+
+
+def make_vasp_set_parser() -> argparse.ArgumentParser:
+    """Parent parser for the vasp input sets."""
     vasp_set_parser = argparse.ArgumentParser(
         description="Vasp set-related parser",
         add_help=False)
@@ -230,7 +234,12 @@ def parse_args(args):
     for l, d in vasp_set_args():
         vasp_set_parser.add_argument(*l, **d)
 
-    # -- get_poscars -----------------------------------------------------------
+    return vasp_set_parser
+
+
+def add_get_poscars_parser(subparsers) -> None:
+    from vise.util.mp_tools import make_poscars_from_mp
+
     parser_get_poscar = subparsers.add_parser(
         name="get_poscars",
         description="Tools for generating POSCAR file(s)",
@@ -255,12 +264,13 @@ def parse_args(args):
         "--molecules", type=str2bool, default=gp_defaults["molecules"],
         help="Whether to generate molecules models instead of pmg structures.")
 
-    parser_get_poscar.set_defaults(func=get_poscar_from_mp)
+    parser_get_poscar.set_defaults(func=lazy_function("get_poscar_from_mp"))
+
 
-    # -- vasp_set ---------------------------------------------------------
+def add_vasp_set_parser(subparsers) -> None:
     parser_vasp_set = subparsers.add_parser(
         name="vasp_set",
-        parents=[vasp_set_parser, prec_parser],
+        parents=[make_vasp_set_parser(), make_prec_parser()],
         description="Tools for constructing vasp input set with vise",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         aliases=['vs'])
@@ -290,18 +300,28 @@ def parse_args(args):
     parser_vasp_set.add_argument(
         "--dirs", nargs="+", type=str, default=["."],
         help="Make vasp set for the directories in the same condition.")
+    parser_vasp_set.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="Number of processes used for constructing vasp sets in the "
+             "directories.")
+    parser_vasp_set.add_argument(
+        "-u", "--unique_structures", type=str2bool, default=False,
+        help="Construct vasp sets only for one of the directories with "
+             "duplicated structures. The groups are written in "
+             "duplicated_structures.json.")
     parser_vasp_set.add_argument(
         "-d", "--prev_dir", type=str,
         help="Inherit input files from the previous directory.")
 
     del vs_defaults
 
-    parser_vasp_set.set_defaults(func=vasp_set)
+    parser_vasp_set.set_defaults(func=lazy_function("vasp_set"))
 
-    # -- vasp_run --------------------------------------------------------------
+
+def add_vasp_run_parser(subparsers) -> None:
     parser_vasp_run = subparsers.add_parser(
         name="vasp_run",
-        parents=[custodian_parser, prec_parser],
+        parents=[make_custodian_parser(), make_prec_parser()],
         description="Tools for vasp run",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         aliases=['vr'])
@@ -312,13 +332,26 @@ def parse_args(args):
     parser_vasp_run.add_argument(
         "--json_file", default="str_opt.json", type=str,
         help="str_opt.json filename.")
+    parser_vasp_run.add_argument(
+        "--force_criterion", type=float,
+        help="Skip further relaxations when the max force in eV/A is within "
+             "this criterion.")
+    parser_vasp_run.add_argument(
+        "--volume_criterion", type=float,
+        help="Skip further relaxations when the relative volume change is "
+             "within this criterion.")
+
+    parser_vasp_run.set_defaults(func=lazy_function("vasp_run"))
 
-    parser_vasp_run.set_defaults(func=vasp_run)
 
-    # -- kpt_conv --------------------------------------------------------------
+def add_kpt_conv_parser(subparsers) -> None:
+    from vise.custodian_extension.jobs import ViseVaspJob
+
     parser_kpt_conv = subparsers.add_parser(
         name="kpt_conv",
-        parents=[vasp_set_parser, custodian_parser, prec_parser],
+        parents=[make_vasp_set_parser(),
+                 make_custodian_parser(),
+                 make_prec_parser()],
         description="Tools for vasp run for k-point convergence",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         aliases=['kc'])
@@ -344,11 +377,16 @@ def parse_args(args):
         "--criterion", dest="convergence_criterion",
         default=kc_defaults["convergence_criterion"], type=float,
         help="Convergence criterion of kpoints in eV/atom.")
+    parser_kpt_conv.add_argument(
+        "--num_parallel", type=int, default=None,
+        help="Number of k-point meshes calculated concurrently in separate "
+             "directories. If not set, meshes are calculated one by one.")
 
     del kc_defaults
-    parser_kpt_conv.set_defaults(func=kpt_conv)
+    parser_kpt_conv.set_defaults(func=lazy_function("kpt_conv"))
 
-    # -- chempotdiag -----------------------------------------------------------
+
+def add_chempotdiag_parser(subparsers) -> None:
     parser_cpd = subparsers.add_parser(
         name="chempotdiag",
         description="Tools for chemical potentials",
@@ -390,6 +428,17 @@ def parse_args(args):
     parser_cpd.add_argument(
         "-t", "--temperature", type=float, default=0.0,
         help="temperature of system in K.")
+    parser_cpd.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="Number of processes used for parsing vasprun.xml files.")
+    parser_cpd.add_argument(
+        "-st", "--sweep_temperatures", type=float, nargs='+',
+        help="Temperatures in K for sweeping the diagrams. When set, vertices "
+             "at each condition are written to cpd_sweep.npz.")
+    parser_cpd.add_argument(
+        "-sp", "--sweep_pressures", type=str, nargs='+',
+        help="Partial pressures in Pa for sweeping the diagrams. "
+             "Example: -sp O2 1e-5 1e+5 N2 20000")
 
     # thermodynamic status (P and T) input
     # # output
@@ -400,12 +449,13 @@ def parse_args(args):
 
     del cpd_defaults
 
-    parser_cpd.set_defaults(func=chempotdiag)
+    parser_cpd.set_defaults(func=lazy_function("chempotdiag"))
+
 
-    # -- plot_band -----------------------------------------------------------
+def add_plot_band_parser(subparsers) -> None:
     parser_plot_band = subparsers.add_parser(
         name="plot_band",
-        parents=[prec_parser],
+        parents=[make_prec_parser()],
         description="Tools for plotting band structures",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         aliases=['pb'])
@@ -434,12 +484,13 @@ def parse_args(args):
 
     del pb_defaults
 
-    parser_plot_band.set_defaults(func=plot_band)
+    parser_plot_band.set_defaults(func=lazy_function("plot_band"))
 
-    # -- plot_dos -----------------------------------------------------------
+
+def add_plot_dos_parser(subparsers) -> None:
     parser_plot_dos = subparsers.add_parser(
         name="plot_dos",
-        parents=[prec_parser],
+        parents=[make_prec_parser()],
         description="Tools for plotting density of states",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         aliases=['pd'])
@@ -493,9 +544,10 @@ def parse_args(args):
 
     del pd_defaults
 
-    parser_plot_dos.set_defaults(func=plot_dos)
+    parser_plot_dos.set_defaults(func=lazy_function("plot_dos"))
+
 
-    # -- band_gap --------------------------------------------------------------
+def add_band_gap_parser(subparsers) -> None:
     parser_band_gap = subparsers.add_parser(
         name="band_gap",
         description="Calculate the band gap from vasprun.xml",
@@ -512,10 +564,80 @@ def parse_args(args):
     parser_band_gap.add_argument(
         "-o", "--outcar", type=str, default=bg_defaults["outcar"],
         help="OUTCAR file name.")
-    parser_band_gap.set_defaults(func=band_gap)
+    parser_band_gap.set_defaults(func=lazy_function("band_gap"))
 
     del bg_defaults
 
+
+def add_serve_parser(subparsers) -> None:
+    parser_serve = subparsers.add_parser(
+        name="serve",
+        description="Keep a warm interpreter and run vise commands sent as "
+                    "JSON lines from vise_client or stdin.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser_serve.add_argument(
+        "-s", "--socket", type=str, default=SERVER_SOCKET,
+        help="Unix domain socket path. If not set, requests are read from "
+             "stdin and responses are written to stdout.")
+
+    parser_serve.set_defaults(func=lazy_function("serve"))
+
+
+def lazy_function(name: str) -> Callable[[Namespace], None]:
+    """Function in vise.cli.main_function imported only when it is called."""
+    def function(args: Namespace) -> None:
+        main_function = import_module("vise.cli.main_function")
+        getattr(main_function, name)(args)
+
+    function.__name__ = name
+    return function
+
+
+# Subcommand names and aliases, and functions adding their parsers.
+subcommands = [(["get_poscars", "gp"], add_get_poscars_parser),
+               (["vasp_set", "vs"], add_vasp_set_parser),
+               (["vasp_run", "vr"], add_vasp_run_parser),
+               (["kpt_conv", "kc"], add_kpt_conv_parser),
+               (["chempotdiag", "cpd"], add_chempotdiag_parser),
+               (["plot_band", "pb"], add_plot_band_parser),
+               (["plot_dos", "pd"], add_plot_dos_parser),
+               (["band_gap", "bg"], add_band_gap_parser),
+               (["serve"], add_serve_parser)]
+
+
+def dispatched_subcommand(args: List[str]) -> Optional[str]:
+    """Subcommand name in args, or None when it is not found."""
+    for arg in args:
+        if not arg.startswith("-"):
+            for names, _ in subcommands:
+                if arg in names:
+                    return names[0]
+            return None
+    return None
+
+
+def parse_args(args):
+
+    parser = argparse.ArgumentParser(
+        description="""                            
+    Vise is a package that helps researchers to do first-principles calculations 
+    with the VASP code.""",
+        epilog=f"""                                 
+    Author: Yu Kumagai \n
+    Version: {__version__}""",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    subparsers = parser.add_subparsers()
+
+    # Only the parser of the dispatched subcommand is constructed, as the
+    # defaults of some subcommands need heavy modules such as custodian.
+    # All the parsers are constructed for the help and invalid inputs.
+    command = dispatched_subcommand(args)
+    for names, add_parser in subcommands:
+        if command in (None, names[0]):
+            add_parser(subparsers)
+
     # try:
     #     import argcomplete
     #     argcomplete.autocomplete(parser)
@@ -1,37 +1,24 @@
 # -*- coding: utf-8 -*-
 #  Copyright (c) 2020. Distributed under the terms of the MIT License.
 
+import json
 import os
+import sys
 from argparse import Namespace
 from copy import deepcopy
 from itertools import chain
 from pathlib import Path
-from typing import Tuple
-
-from custodian.custodian import Custodian
-
-from pymatgen.analysis.phase_diagram import PhaseDiagram, PDPlotter
-from pymatgen.core.periodic_table import Element
-from pymatgen.core.structure import Structure
-from pymatgen.ext.matproj import MPRester
-
-from vise.analyzer.band_gap import band_gap_properties
-from vise.analyzer.band_plotter import PrettyBSPlotter
-from vise.analyzer.dos_plotter import get_dos_plot
-from vise.chempotdiag.chem_pot_diag import ChemPotDiag
-from vise.chempotdiag.free_energy_entries import FreeEnergyEntrySet
-from vise.custodian_extension.handler_groups import handler_group
-from vise.custodian_extension.jobs import (
-    ViseVaspJob, KptConvResult, StructureOptResult)
-from vise.input_set.incar import incar_flags
-from vise.input_set.input_set import ViseInputSet
-from vise.input_set.prior_info import PriorInfo
-from vise.input_set.task import Task
-from vise.input_set.xc import Xc
+from typing import List, Tuple
+
 from vise.util.error_classes import NoVaspCommandError
 from vise.util.logger import get_logger
 from vise.cli.main_tools import potcar_str2dict, list2dict
-from vise.util.mp_tools import make_poscars_from_mp
+
+""" Functions dispatched from vise.cli.main.
+
+Modules depending on pymatgen, custodian and matplotlib are imported in the
+functions to keep the startup of vise fast.
+"""
 
 logger = get_logger(__name__)
 
@@ -39,6 +26,9 @@ logger = get_logger(__name__)
 def vasp_settings_from_args(args: Namespace
                             ) -> Tuple[dict, dict]:
     """Generate vasp input settings from the given args. """
+    from pymatgen.core.periodic_table import Element
+    from vise.input_set.incar import incar_flags
+    from vise.input_set.input_set import ViseInputSet
 
     flags = [str(s) for s in list(Element)]
     ldauu = list2dict(args.ldauu, flags)
@@ -64,6 +54,9 @@ def vasp_settings_from_args(args: Namespace
 
 
 def get_poscar_from_mp(args: Namespace) -> None:
+    from pymatgen.ext.matproj import MPRester
+    from vise.util.mp_tools import make_poscars_from_mp
+
     if getattr(args, "number", None):
         s = MPRester().get_structure_by_material_id(f"mp-{args.number}")
         s.to(fmt="poscar", filename=args.poscar)
@@ -76,6 +69,12 @@ def get_poscar_from_mp(args: Namespace) -> None:
 
 
 def vasp_set(args: Namespace) -> None:
+    from pymatgen.core.structure import Structure
+    from vise.input_set.input_set import ViseInputSet
+    from vise.input_set.prior_info import PriorInfo
+    from vise.input_set.task import Task
+    from vise.input_set.xc import Xc
+
     if args.print:
         vis = ViseInputSet.load_json(args.json)
         print(vis)
@@ -94,12 +93,16 @@ def vasp_set(args: Namespace) -> None:
     started_dir = os.getcwd()
     cwd = Path.cwd()
 
+    if args.prev_dir:
+        logger.warning("user_incar_settings is not used when using "
+                       "previous calculation.")
+
+    structures, output_dirs, individual_kwargs = [], [], []
     for d in args.dirs:
         d = cwd / d
-        os.chdir(d)
-        logger.info(f"Constructing vasp set in {d}")
         user_incar_settings = deepcopy(base_user_incar_settings)
         kwargs = deepcopy(base_vis_kwargs)
+        dir_task = task
 
         if args.prior_info:
             yaml_file = d / "prior_info.yaml"
@@ -108,37 +111,104 @@ def vasp_set(args: Namespace) -> None:
                 if prior_info.is_magnetic:
                     kwargs["is_magnetization"] = True
                 if prior_info.is_cluster:
-                    if task != Task.cluster_opt:
-                        logger.warning(f"task is changed from {task} to "
+                    if dir_task != Task.cluster_opt:
+                        logger.warning(f"task is changed from {dir_task} to "
                                        f"{Task.cluster_opt}.")
-                        task = Task.cluster_opt
+                        dir_task = Task.cluster_opt
                 if prior_info.incar:
                     user_incar_settings.update(prior_info.incar)
 
         if args.prev_dir:
-            logger.warning("user_incar_settings is not used when using "
-                           "previous calculation.")
+            # prev_dir is relative to each directory.
+            os.chdir(d)
+            logger.info(f"Constructing vasp set in {d}")
             files = {"CHGCAR": "C", "WAVECAR": "M", "WAVEDER": "M"}
             input_set = ViseInputSet.from_prev_calc(args.prev_dir,
-                                                    task=task,
+                                                    task=dir_task,
                                                     xc=xc,
                                                     files_to_transfer=files,
                                                     **kwargs)
+            input_set.write_input(".")
+            os.chdir(started_dir)
         else:
-            s = Structure.from_file(args.poscar)
-            input_set = \
-                ViseInputSet.make_input(structure=s,
-                                        task=task,
-                                        xc=xc,
-                                        user_incar_settings=user_incar_settings,
-                                        **kwargs)
-
-        input_set.write_input(".")
-
-    os.chdir(started_dir)
+            structures.append(Structure.from_file(d / args.poscar))
+            output_dirs.append(str(d))
+            individual_kwargs.append(
+                {"task": dir_task,
+                 "user_incar_settings": user_incar_settings, **kwargs})
+
+    if structures and getattr(args, "unique_structures", False):
+        structures, output_dirs, individual_kwargs = \
+            remove_duplicated_structures(structures, output_dirs,
+                                         individual_kwargs,
+                                         symprec=args.symprec,
+                                         angle_tolerance=args.angle_tolerance)
+
+    if structures:
+        failures = ViseInputSet.make_inputs(
+            structures=structures,
+            output_dirs=output_dirs,
+            num_processes=getattr(args, "jobs", 1),
+            individual_kwargs=individual_kwargs,
+            xc=xc)
+        if failures:
+            logger.error(f"Vasp sets are not constructed in "
+                         f"{len(failures)} directories: "
+                         f"{', '.join(failures)}")
+            sys.exit(1)
+
+
+def remove_duplicated_structures(structures: list,
+                                 output_dirs: List[str],
+                                 individual_kwargs: List[dict],
+                                 symprec: float,
+                                 angle_tolerance: float,
+                                 manifest: str = "duplicated_structures.json"
+                                 ) -> Tuple[list, list, list]:
+    """Keep only the representative of the duplicated structures.
+
+    Structures are duplicated when their fingerprints and kwargs are the same.
+    The groups of the directories are written in the manifest json file only
+    when duplicated structures exist.
+
+    Args:
+        structures (List[Structure]):
+            Structures to be written in the output_dirs.
+
+    Returns:
+        Tuple of structures, output_dirs and individual_kwargs of the
+        representatives.
+    """
+    from vise.util.structure_handler import (
+        group_duplicated_structures, structure_fingerprint)
+
+    groups = group_duplicated_structures(
+        structures, symprec=symprec, angle_tolerance=angle_tolerance,
+        keys=[str(kwargs) for kwargs in individual_kwargs])
+
+    representatives = [g[0] for g in groups]
+    cwd = os.getcwd()
+    summary = [{"representative": os.path.relpath(output_dirs[g[0]], cwd),
+                "duplicates": [os.path.relpath(output_dirs[i], cwd)
+                               for i in g[1:]],
+                "fingerprint": structure_fingerprint(structures[g[0]],
+                                                     symprec, angle_tolerance)}
+               for g in groups]
+    num_duplicates = len(structures) - len(representatives)
+    if num_duplicates:
+        with open(manifest, "w") as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Vasp sets are not constructed in {num_duplicates} "
+                    f"directories with duplicated structures. See {manifest}.")
+
+    return ([structures[i] for i in representatives],
+            [output_dirs[i] for i in representatives],
+            [individual_kwargs[i] for i in representatives])
 
 
 def vasp_run_parser(args) -> tuple:
+    from vise.custodian_extension.handler_groups import handler_group
+
     if isinstance(args.vasp_cmd, str):
         vasp_cmd = args.vasp_cmd.split()
     elif isinstance(args.vasp_cmd, list):
@@ -171,12 +241,16 @@ def vasp_run_parser(args) -> tuple:
 
 
 def vasp_run(args) -> None:
+    from custodian.custodian import Custodian
+    from vise.custodian_extension.jobs import ViseVaspJob, StructureOptResult
 
     if args.print:
         print(StructureOptResult.load_json(args.json_file))
         return
 
     optimization_args, custodian_args = vasp_run_parser(args)
+    optimization_args["force_criterion"] = args.force_criterion
+    optimization_args["volume_criterion"] = args.volume_criterion
 
     custodian_args["jobs"] = ViseVaspJob.structure_optimization_run(
         **optimization_args)
@@ -186,6 +260,10 @@ def vasp_run(args) -> None:
 
 
 def kpt_conv(args) -> None:
+    from custodian.custodian import Custodian
+    from vise.custodian_extension.jobs import ViseVaspJob, KptConvResult
+    from vise.input_set.task import Task
+    from vise.input_set.xc import Xc
 
     if args.print:
         print(KptConvResult.load_json(args.json_file))
@@ -194,6 +272,20 @@ def kpt_conv(args) -> None:
     user_incar_settings, vis_kwargs = vasp_settings_from_args(args)
     optimization_args, custodian_args = vasp_run_parser(args)
 
+    if args.num_parallel:
+        handlers = custodian_args.pop("handlers")
+        ViseVaspJob.kpt_converge_parallel(
+            xc=Xc.from_string(args.xc),
+            task=Task.from_string(args.task),
+            convergence_criterion=args.convergence_criterion,
+            initial_kpt_density=args.initial_kpt_density,
+            user_incar_settings=user_incar_settings,
+            handlers=handlers,
+            num_processes=args.num_parallel,
+            custodian_kwargs=custodian_args,
+            **optimization_args, **vis_kwargs)
+        return
+
     custodian_args["jobs"] = ViseVaspJob.kpt_converge(
         xc=Xc.from_string(args.xc),
         task=Task.from_string(args.task),
@@ -207,6 +299,14 @@ def kpt_conv(args) -> None:
 
 
 def chempotdiag(args: Namespace) -> None:
+    from pymatgen.analysis.phase_diagram import PhaseDiagram, PDPlotter
+    from vise.chempotdiag.chem_pot_diag import ChemPotDiag
+    from vise.chempotdiag.free_energy_entries import FreeEnergyEntrySet
+
+    if args.sweep_temperatures:
+        chempotdiag_sweep(args)
+        return
+
     if args.elements:
         entry_set = FreeEnergyEntrySet.from_mp(args.elements)
     else:
@@ -215,7 +315,8 @@ def chempotdiag(args: Namespace) -> None:
             vasprun=args.vasprun,
             parse_gas=args.parse_gas,
             temperature=args.temperature,
-            partial_pressures=args.partial_pressures)
+            partial_pressures=args.partial_pressures,
+            num_processes=args.jobs)
 
     entry_set.to_json()
     pd = PhaseDiagram(entries=entry_set.entries)
@@ -235,7 +336,34 @@ def chempotdiag(args: Namespace) -> None:
     cpd.draw_diagram(filename=args.filename)
 
 
+def chempotdiag_sweep(args: Namespace) -> None:
+    from vise.chempotdiag.chem_pot_sweep import sweep_chem_pot_diag
+    from vise.chempotdiag.free_energy_entries import FreeEnergyEntrySet
+    from vise.chempotdiag.gas import MOLECULE_DATA
+
+    # Gas entries are parsed at the reference pressure and shifted later.
+    entry_set = FreeEnergyEntrySet.from_vasp_files(
+        directory_paths=args.vasp_dirs,
+        vasprun=args.vasprun,
+        parse_gas=args.parse_gas,
+        temperature=args.sweep_temperatures[0],
+        num_processes=args.jobs)
+
+    pressures = list2dict(args.sweep_pressures, list(MOLECULE_DATA))
+    pressures = {k: v if isinstance(v, list) else [v]
+                 for k, v in pressures.items()}
+
+    sweep = sweep_chem_pot_diag(entries=entry_set.entries,
+                                temperatures=args.sweep_temperatures,
+                                partial_pressures=pressures,
+                                target_comp=args.target_comp,
+                                num_processes=args.jobs)
+    sweep.to_npz()
+
+
 def plot_band(args) -> None:
+    from vise.analyzer.band_plotter import PrettyBSPlotter
+
     p = PrettyBSPlotter.from_vasp_files(kpoints_filenames=args.kpoints,
                                         vasprun_filenames=args.vasprun,
                                         vasprun2_filenames=args.vasprun2,
@@ -249,6 +377,8 @@ def plot_band(args) -> None:
 
 
 def plot_dos(args) -> None:
+    from vise.analyzer.dos_plotter import get_dos_plot
+
     if args.cbm_vbm:
         if len(args.cbm_vbm) != 2 or args.cbm_vbm[0] < args.cbm_vbm[1]:
             raise ValueError(f"cbm_vbm values {args.cbm_vbm} are not proper.")
@@ -269,6 +399,8 @@ def plot_dos(args) -> None:
 
 
 def band_gap(args) -> None:
+    from vise.analyzer.band_gap import band_gap_properties
+
     try:
         band_gap_value, vbm_info, cbm_info = \
             band_gap_properties(vasprun=args.vasprun, outcar=args.outcar)
@@ -279,3 +411,11 @@ def band_gap(args) -> None:
         print("Metallic system")
 
 
+def serve(args) -> None:
+    from vise.cli.server import preload, serve_socket, serve_stdin
+
+    if args.socket:
+        preload()
+        serve_socket(args.socket)
+    else:
+        serve_stdin()
@@ -7,8 +7,6 @@ from typing import Optional, Callable, List, Union, Tuple
 
 import yaml
 
-from pymatgen.core.periodic_table import Element
-
 from vise.util.tools import is_str_int, is_str_digit, str2bool
 from distutils.util import strtobool
 
@@ -30,6 +28,8 @@ def potcar_str2dict(potcar_list: Union[str, List[str], None]) -> dict:
     Returns:
          Dictionary with element names as keys and potcar names as values.
     """
+    from pymatgen.core.periodic_table import Element
+
     if potcar_list is None:
         return {}
     elif isinstance(potcar_list, str):
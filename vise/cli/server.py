@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2020. Distributed under the terms of the MIT License.
+
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from importlib import import_module
+import io
+import json
+import logging
+import os
+import socketserver
+import sys
+from typing import IO, Iterator, List
+
+from vise.cli.main import dispatched_subcommand, parse_args
+from vise.util.logger import get_logger
+
+""" Server keeping a warm interpreter for the vise command.
+
+Requests are JSON lines such as
+    {"args": ["vs", "-x", "hse"], "cwd": "/path/to/calc"}
+and each response is a JSON line with "returncode", "stdout" and "stderr".
+A request {"shutdown": true} stops the server. Requests are processed one by
+one as the working directory is changed during each request.
+"""
+
+__author__ = "Yu Kumagai"
+__maintainer__ = "Yu Kumagai"
+
+logger = get_logger(__name__)
+
+# Modules imported when the server starts. Importing the input set also loads
+# the datasets in vise/input_set/datasets.
+preloaded_modules = ["vise.cli.main_function",
+                     "vise.input_set.input_set",
+                     "vise.custodian_extension.jobs",
+                     "vise.analyzer.band_gap"]
+
+refused_subcommands = ["serve"]
+
+
+def preload() -> None:
+    for name in preloaded_modules:
+        try:
+            import_module(name)
+        except ImportError as e:
+            logger.warning(f"{name} is not preloaded: {e}")
+
+
+@contextmanager
+def _captured_output(out: IO, err: IO) -> Iterator[None]:
+    """Redirect stdout, stderr and the vise loggers writing to them."""
+    swapped = []
+    for l in [logging.getLogger()] + \
+             list(logging.Logger.manager.loggerDict.values()):
+        for h in getattr(l, "handlers", []):
+            if isinstance(h, logging.StreamHandler) \
+                    and h.stream in (sys.stdout, sys.stderr):
+                swapped.append((h, h.stream))
+                h.stream = out if h.stream is sys.stdout else err
+    try:
+        with redirect_stdout(out), redirect_stderr(err):
+            yield
+    finally:
+        for h, stream in swapped:
+            h.stream = stream
+
+
+def handle_request(request: dict) -> dict:
+    """Run a vise command in the working directory of the request.
+
+    Args:
+        request (dict):
+            "args" are the command line arguments without "vise" and "cwd" is
+            the working directory, which is the current one when not given.
+
+    Returns:
+        Dict of the return code and the captured stdout and stderr.
+    """
+    args: List[str] = [str(a) for a in request.get("args", [])]
+    if dispatched_subcommand(args) in refused_subcommands:
+        return {"returncode": 2,
+                "stdout": "",
+                "stderr": f"{args} cannot be run in the server.\n"}
+
+    out, err = io.StringIO(), io.StringIO()
+    returncode = 0
+    cwd = os.getcwd()
+    try:
+        os.chdir(request.get("cwd", cwd))
+        with _captured_output(out, err):
+            try:
+                parsed = parse_args(args)
+                parsed.func(parsed)
+            except SystemExit as e:
+                # argparse exits for --help and invalid arguments.
+                if isinstance(e.code, int):
+                    returncode = e.code
+                elif e.code is not None:
+                    print(e.code, file=sys.stderr)
+                    returncode = 1
+            except Exception as e:
+                logger.error(f"{type(e).__name__}: {e}")
+                returncode = 1
+    except OSError as e:
+        err.write(f"{e}\n")
+        returncode = 1
+    finally:
+        os.chdir(cwd)
+
+    return {"returncode": returncode,
+            "stdout": out.getvalue(),
+            "stderr": err.getvalue()}
+
+
+def _respond(line: str) -> dict:
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"returncode": 2, "stdout": "",
+                "stderr": f"Invalid request {line!r}: {e}\n"}
+    if not isinstance(request, dict):
+        return {"returncode": 2, "stdout": "",
+                "stderr": f"Request must be a JSON object: {line!r}\n"}
+    if request.get("shutdown"):
+        return {"shutdown": True, "returncode": 0, "stdout": "", "stderr": ""}
+    return handle_request(request)
+
+
+def serve_stream(reader: IO, writer: IO) -> bool:
+    """Respond to JSON lines until EOF or a shutdown request.
+
+    Returns:
+        Whether the shutdown is requested.
+    """
+    for line in reader:
+        if not line.strip():
+            continue
+        response = _respond(line)
+        writer.write(json.dumps(response) + "\n")
+        writer.flush()
+        if response.get("shutdown"):
+            return True
+    return False
+
+
+def serve_stdin() -> None:
+    """Serve JSON lines from stdin. stdout is reserved for the responses."""
+    writer = sys.stdout
+    with _captured_output(sys.stderr, sys.stderr):
+        preload()
+        serve_stream(sys.stdin, writer)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        reader = io.TextIOWrapper(self.rfile, encoding="utf-8")
+        writer = io.TextIOWrapper(self.wfile, encoding="utf-8")
+        try:
+            if serve_stream(reader, writer):
+                self.server.shutdown_requested = True
+        finally:
+            # Socket files are closed by the handler itself.
+            reader.detach()
+            writer.detach()
+
+
+class ViseUnixServer(socketserver.UnixStreamServer):
+    shutdown_requested = False
+
+
+def serve_socket(socket_path: str) -> None:
+    """Serve at a Unix domain socket, which is removed at the end."""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with ViseUnixServer(socket_path, _RequestHandler) as server:
+        logger.info(f"Vise server is listening at {socket_path}.")
+        try:
+            while not server.shutdown_requested:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
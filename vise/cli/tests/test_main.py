@@ -104,6 +104,8 @@ class MainVaspSetTest(ViseTest):
             standardize_structure=True,
             prior_info=True,
             dirs=["."],
+            jobs=1,
+            unique_structures=False,
             prev_dir=None,
             func=parsed_args.func,
             **default_vasp_args, **symprec_args)
@@ -137,6 +139,8 @@ class MainVaspSetTest(ViseTest):
             standardize_structure=True,
             prior_info=True,
             dirs=["."],
+            jobs=1,
+            unique_structures=False,
             prev_dir="c",
             func=parsed_args.func)
 
@@ -164,6 +168,8 @@ class MainVaspSetTest(ViseTest):
                                   "-s", "F",
                                   "-pi", "T",
                                   "--dirs", "a", "b",
+                                  "-j", "4",
+                                  "-u", "T",
                                   "-d", "c"])
 
         expected = Namespace(
@@ -186,6 +192,8 @@ class MainVaspSetTest(ViseTest):
             standardize_structure=False,
             prior_info=True,
             dirs=["a", "b"],
+            jobs=4,
+            unique_structures=True,
             prev_dir="c",
             func=parsed_args.func)
 
@@ -199,6 +207,8 @@ class MainVaspRunTest(ViseTest):
         expected = Namespace(
             print=False,
             json_file="str_opt.json",
+            force_criterion=None,
+            volume_criterion=None,
             vasp_cmd=["vasp", "cmd"],
             handler_name="default",
             timeout=TIMEOUT,
@@ -213,6 +223,8 @@ class MainVaspRunTest(ViseTest):
         parsed_args = parse_args(["vr",
                                   "--print",
                                   "--json_file", "test.json",
+                                  "--force_criterion", "0.05",
+                                  "--volume_criterion", "0.001",
                                   "-v", "vasp", "cmd",
                                   "--handler_name", "dielectric",
                                   "--timeout", "1000",
@@ -223,6 +235,8 @@ class MainVaspRunTest(ViseTest):
         expected = Namespace(
             print=True,
             json_file="test.json",
+            force_criterion=0.05,
+            volume_criterion=0.001,
             vasp_cmd=["vasp", "cmd"],
             handler_name="dielectric",
             timeout=1000,
@@ -248,6 +262,7 @@ class MainKptConvTest(ViseTest):
             remove_wavecar=False,
             max_relax_num=kpt_conv_defaults["max_relax_num"],
             convergence_criterion=kpt_conv_defaults["convergence_criterion"],
+            num_parallel=None,
             left_files=kpt_conv_defaults["left_files"],
             func=parsed_args.func,
             **default_vasp_args, **symprec_args)
@@ -263,6 +278,7 @@ class MainKptConvTest(ViseTest):
                                   "--remove_wavecar",
                                   "--max_relax_num", "10",
                                   "--criterion", "0.01",
+                                  "--num_parallel", "3",
                                   "--left_files", "POSCAR", "PCDAT"])
         expected = Namespace(
             print=False,
@@ -274,6 +290,7 @@ class MainKptConvTest(ViseTest):
             remove_wavecar=True,
             max_relax_num=10,
             convergence_criterion=0.01,
+            num_parallel=3,
             left_files=["POSCAR", "PCDAT"],
             func=parsed_args.func,
             **default_vasp_args, **symprec_args)
@@ -293,6 +310,9 @@ class MainChemPotDiagTest(ViseTest):
             parse_gas=True,
             partial_pressures=None,
             temperature=0.0,
+            jobs=1,
+            sweep_temperatures=None,
+            sweep_pressures=None,
             func=parsed_args.func)
         self.assertEqual(expected, parsed_args)
 
@@ -306,7 +326,10 @@ class MainChemPotDiagTest(ViseTest):
                                   "-f", "cpd.pdf",
                                   "-pg", "F",
                                   "-pp", "O", "1e+5",
-                                  "-t", "1000"])
+                                  "-t", "1000",
+                                  "-j", "2",
+                                  "-st", "300", "1000",
+                                  "-sp", "O2", "1e-5", "1e+5"])
 
         expected = Namespace(
             draw_phase_diagram=True,
@@ -318,6 +341,9 @@ class MainChemPotDiagTest(ViseTest):
             parse_gas=False,
             partial_pressures=["O", "1e+5"],
             temperature=1000.0,
+            jobs=2,
+            sweep_temperatures=[300.0, 1000.0],
+            sweep_pressures=["O2", "1e-5", "1e+5"],
             func=parsed_args.func)
         self.assertEqual(expected, parsed_args)
 
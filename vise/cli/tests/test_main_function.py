@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 #  Copyright (c) 2020. Distributed under the terms of the MIT License.
 
+import json
 import os
+import tempfile
 from copy import deepcopy
 
 from argparse import Namespace
@@ -14,7 +16,7 @@ from pymatgen.core.structure import IStructure
 from vise.util.testing import ViseTest
 from vise.cli.main_function import (
     vasp_settings_from_args, get_poscar_from_mp, vasp_set, vasp_run,
-    chempotdiag, plot_band, plot_dos, band_gap)
+    chempotdiag, plot_band, plot_dos, band_gap, remove_duplicated_structures)
 from vise.cli.tests.test_main import default_vasp_args, symprec_args
 from vise.input_set.task import Task
 from vise.input_set.xc import Xc
@@ -73,7 +75,7 @@ direct
         actual = IStructure.from_file("POSCAR")
         self.assertEqual(expected, actual)
 
-    @patch('vise.cli.main_function.make_poscars_from_mp')
+    @patch('vise.util.mp_tools.make_poscars_from_mp')
     def test_mp_poscars(self, mock_make_poscars):
         get_poscar_from_mp(self.args_elements)
         mock_make_poscars.assert_called_with(**self.kwargs)
@@ -114,12 +116,12 @@ class VaspSetTest(ViseTest):
                                      prev_dir=None,
                                      **vasp_args, **symprec_args)
 
-    @patch('vise.cli.main_function.ViseInputSet.load_json')
+    @patch('vise.input_set.input_set.ViseInputSet.load_json')
     def test_print(self, mock):
         vasp_set(self.args_print)
         mock.assert_called_with("vasp_input_set.json")
 
-    @patch('vise.cli.main_function.ViseInputSet.from_prev_calc')
+    @patch('vise.input_set.input_set.ViseInputSet.from_prev_calc')
     def test_prev_dir(self, mock):
         vasp_set(self.args_prev)
         kwargs = {"override_potcar_set": vasp_args["potcar_set"] or {},
@@ -139,8 +141,8 @@ class VaspSetTest(ViseTest):
 
         mock.assert_called_with("a", **kwargs)
 
-    @patch('vise.cli.main_function.Structure.from_file')
-    @patch('vise.cli.main_function.ViseInputSet.make_input')
+    @patch('pymatgen.core.structure.Structure.from_file')
+    @patch('vise.input_set.input_set.ViseInputSet.make_input')
     def test_input_set(self, mock, mock_structure):
         vasp_set(self.args_normal)
 
@@ -163,6 +165,58 @@ class VaspSetTest(ViseTest):
 
         mock.assert_called_with(**kwargs)
 
+    @patch('pymatgen.core.structure.Structure.from_file')
+    @patch('vise.input_set.input_set.ViseInputSet.make_inputs')
+    def test_failed_input_set(self, mock, mock_structure):
+        mock.return_value = {".": "ValueError: invalid"}
+        with self.assertRaises(SystemExit) as cm:
+            vasp_set(self.args_normal)
+        self.assertEqual(1, cm.exception.code)
+
+
+class RemoveDuplicatedStructuresTest(ViseTest):
+    def test(self):
+        mgo = self.get_structure_by_name("MgO")
+        conv_mgo = self.get_structure_by_name("conventional_MgO")
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            os.chdir(tmp_dirname)
+            try:
+                actual = remove_duplicated_structures(
+                    structures=[mgo, conv_mgo, mgo],
+                    output_dirs=[os.path.join(tmp_dirname, d)
+                                 for d in ["a", "b", "c"]],
+                    individual_kwargs=[{}, {}, {"charge": 1}],
+                    symprec=0.01,
+                    angle_tolerance=5)
+                with open("duplicated_structures.json") as f:
+                    manifest = json.load(f)
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual([mgo, mgo], actual[0])
+        self.assertEqual(["a", "c"], [os.path.basename(d) for d in actual[1]])
+        self.assertEqual([{}, {"charge": 1}], actual[2])
+        self.assertEqual(["b"], manifest[0]["duplicates"])
+        self.assertEqual([], manifest[1]["duplicates"])
+
+    def test_wo_duplicates(self):
+        mgo = self.get_structure_by_name("MgO")
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            os.chdir(tmp_dirname)
+            try:
+                remove_duplicated_structures(
+                    structures=[mgo, mgo],
+                    output_dirs=[os.path.join(tmp_dirname, d)
+                                 for d in ["a", "b"]],
+                    individual_kwargs=[{}, {"charge": 1}],
+                    symprec=0.01,
+                    angle_tolerance=5)
+                self.assertFalse(os.path.exists("duplicated_structures.json"))
+            finally:
+                os.chdir(cwd)
+
 
 class VaspRunTest(ViseTest):
     def setUp(self) -> None:
@@ -187,7 +241,10 @@ class TestChemPotDiag(ViseTest):
             "filename": None,
             "parse_gas": True,
             "partial_pressures": ["O", "1e+5"],
-            "temperature": 1000.0}
+            "temperature": 1000.0,
+            "jobs": 1,
+            "sweep_temperatures": None,
+            "sweep_pressures": None}
 
         self.from_mp_pd_filename = Namespace(**self.kwargs_1)
 
@@ -200,22 +257,26 @@ class TestChemPotDiag(ViseTest):
             "filename": "cpd.pdf",
             "parse_gas": False,
             "partial_pressures": ["O", "1e+5"],
-            "temperature": 0.0}
+            "temperature": 0.0,
+            "jobs": 2,
+            "sweep_temperatures": None,
+            "sweep_pressures": None}
 
         self.from_dir_cpd = Namespace(**self.kwargs_2)
 
-    @patch('vise.cli.main_function.PDPlotter')
-    @patch('vise.cli.main_function.PhaseDiagram')
-    @patch('vise.cli.main_function.FreeEnergyEntrySet.from_mp')
+    @patch('pymatgen.analysis.phase_diagram.PDPlotter')
+    @patch('pymatgen.analysis.phase_diagram.PhaseDiagram')
+    @patch('vise.chempotdiag.free_energy_entries.FreeEnergyEntrySet.from_mp')
     def test_from_mp_pd_filename(self, mock_entry_set, mock_pd, mock_pd_plot):
         chempotdiag(self.from_mp_pd_filename)
         mock_entry_set.assert_called_with(self.kwargs_1["elements"])
         mock_pd.assert_called_with(entries=mock_entry_set().entries)
         mock_pd_plot.assert_called_with(mock_pd())
 
-    @patch('vise.cli.main_function.ChemPotDiag.from_phase_diagram')
-    @patch('vise.cli.main_function.PhaseDiagram')
-    @patch('vise.cli.main_function.FreeEnergyEntrySet.from_vasp_files')
+    @patch('vise.chempotdiag.chem_pot_diag.ChemPotDiag.from_phase_diagram')
+    @patch('pymatgen.analysis.phase_diagram.PhaseDiagram')
+    @patch('vise.chempotdiag.free_energy_entries.FreeEnergyEntrySet.'
+           'from_vasp_files')
     def test_from_dir_cpd(self, mock_entry_set, mock_pd, mock_cpd):
         chempotdiag(self.from_dir_cpd)
         mock_entry_set.assert_called_with(
@@ -223,11 +284,34 @@ class TestChemPotDiag(ViseTest):
             vasprun=self.kwargs_2["vasprun"],
             parse_gas=self.kwargs_2["parse_gas"],
             temperature=self.kwargs_2["temperature"],
-            partial_pressures=self.kwargs_2["partial_pressures"])
+            partial_pressures=self.kwargs_2["partial_pressures"],
+            num_processes=self.kwargs_2["jobs"])
         mock_pd.assert_called_with(entries=mock_entry_set().entries)
         mock_cpd.assert_called_with(mock_pd(),
                                     target_comp=self.kwargs_2["target_comp"])
 
+    @patch('vise.chempotdiag.chem_pot_sweep.sweep_chem_pot_diag')
+    @patch('vise.chempotdiag.free_energy_entries.FreeEnergyEntrySet.'
+           'from_vasp_files')
+    def test_sweep(self, mock_entry_set, mock_sweep):
+        kwargs = deepcopy(self.kwargs_2)
+        kwargs.update({"sweep_temperatures": [300.0, 1000.0],
+                       "sweep_pressures": ["O2", "1e-5", "1e+5", "N2", "1e+5"]})
+        chempotdiag(Namespace(**kwargs))
+        mock_entry_set.assert_called_with(
+            directory_paths=kwargs["vasp_dirs"],
+            vasprun=kwargs["vasprun"],
+            parse_gas=kwargs["parse_gas"],
+            temperature=300.0,
+            num_processes=kwargs["jobs"])
+        mock_sweep.assert_called_with(
+            entries=mock_entry_set().entries,
+            temperatures=[300.0, 1000.0],
+            partial_pressures={"O2": [1e-5, 1e+5], "N2": [1e+5]},
+            target_comp=kwargs["target_comp"],
+            num_processes=kwargs["jobs"])
+        mock_sweep().to_npz.assert_called_once_with()
+
 
 class TestPlotBand(ViseTest):
     def setUp(self) -> None:
@@ -239,7 +323,7 @@ class TestPlotBand(ViseTest):
                        "legend": False}
         self.args = Namespace(filename="band.pdf", **self.kwargs, **symprec_args)
 
-    @patch('vise.cli.main_function.PrettyBSPlotter.from_vasp_files')
+    @patch('vise.analyzer.band_plotter.PrettyBSPlotter.from_vasp_files')
     def test_get_band_plot(self, mock):
         plot_band(self.args)
         kwargs = deepcopy(self.kwargs)
@@ -263,7 +347,7 @@ class TestGetDosPlotter(ViseTest):
                        "crop_first_value": True}
         self.args = Namespace(filename="dos.pdf", **self.kwargs, **symprec_args)
 
-    @patch('vise.cli.main_function.get_dos_plot')
+    @patch('vise.analyzer.dos_plotter.get_dos_plot')
     def test_get_dos_plot(self, mock):
         plot_dos(self.args)
         kwargs = deepcopy(self.kwargs)
@@ -277,7 +361,7 @@ class TestBandGap(ViseTest):
         self.kwargs = {"vasprun": "vasprun.xml", "outcar": "OUTCAR"}
         self.args = Namespace(**self.kwargs)
 
-    @patch('vise.cli.main_function.band_gap_properties',
+    @patch('vise.analyzer.band_gap.band_gap_properties',
            return_value=({"a": 1}, {"b": 2}, {"c": 3}))
     def test_succeed(self, mock):
         band_gap(self.args)
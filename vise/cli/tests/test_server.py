@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2020. Distributed under the terms of the MIT License.
+
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from vise.cli.client import request
+from vise.cli.server import handle_request, serve_socket, serve_stream
+from vise.util.testing import ViseTest
+
+
+class HandleRequestTest(ViseTest):
+    def test_help(self):
+        actual = handle_request({"args": ["bg", "--help"]})
+        self.assertEqual(0, actual["returncode"])
+        self.assertIn("vasprun", actual["stdout"])
+
+    def test_invalid_args(self):
+        actual = handle_request({"args": ["bg", "--no_such_flag"]})
+        self.assertEqual(2, actual["returncode"])
+        self.assertIn("unrecognized arguments", actual["stderr"])
+
+    def test_refused(self):
+        actual = handle_request({"args": ["serve"]})
+        self.assertEqual(2, actual["returncode"])
+
+    def test_cwd(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            actual = handle_request({"args": ["bg", "-v", "no_vasprun.xml"],
+                                     "cwd": tmp_dirname})
+        self.assertEqual(1, actual["returncode"])
+        self.assertEqual(cwd, os.getcwd())
+
+
+class ServeTest(ViseTest):
+    def test_stream(self):
+        reader = io.StringIO('{"args": ["bg", "--help"]}\n'
+                             'invalid\n'
+                             '{"shutdown": true}\n'
+                             '{"args": ["bg", "--help"]}\n')
+        writer = io.StringIO()
+        self.assertTrue(serve_stream(reader, writer))
+        responses = [json.loads(l) for l in writer.getvalue().splitlines()]
+        self.assertEqual([0, 2, 0], [r["returncode"] for r in responses])
+
+    def test_socket(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            socket_path = os.path.join(tmp_dirname, "vise.sock")
+            server = threading.Thread(target=serve_socket, args=(socket_path,))
+            server.start()
+            while not os.path.exists(socket_path):
+                time.sleep(0.01)
+
+            actual = request(["bg", "--help"], socket_path)
+            self.assertEqual(0, actual["returncode"])
+            self.assertIn("vasprun", actual["stdout"])
+
+            actual = request(["bg", "--help"], socket_path)
+            self.assertEqual(0, actual["returncode"])
+
+            from socket import AF_UNIX, socket
+            with socket(AF_UNIX) as s:
+                s.connect(socket_path)
+                s.sendall(b'{"shutdown": true}\n')
+                s.recv(1024)
+            server.join(timeout=10)
+            self.assertFalse(server.is_alive())
+            self.assertFalse(os.path.exists(socket_path))
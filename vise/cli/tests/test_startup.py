@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2020. Distributed under the terms of the MIT License.
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from statistics import median
+
+import vise
+from vise.util.testing import ViseTest
+
+""" Startup of the vise command.
+
+The benchmark is run only when VISE_STARTUP_BENCHMARK is set to the allowed
+median wall time in seconds, e.g., VISE_STARTUP_BENCHMARK=1.0.
+"""
+
+root_dir = str(Path(vise.__file__).parent.parent)
+benchmark_limit = os.environ.get("VISE_STARTUP_BENCHMARK")
+
+heavy_modules = ["custodian", "matplotlib", "pymatgen"]
+
+code = """
+import sys
+from vise.cli.main import parse_args
+parse_args(sys.argv[1:])
+print(",".join(m for m in {} if m in sys.modules))
+""".format(heavy_modules)
+
+# band_gap_properties is mocked so that only the imports of the dispatch path
+# are checked.
+dispatch_code = """
+import sys
+from unittest.mock import MagicMock
+band_gap = MagicMock()
+band_gap.band_gap_properties.return_value = (1.0, {{}}, {{}})
+sys.modules["vise.analyzer.band_gap"] = band_gap
+from vise.cli.main import parse_args
+args = parse_args(sys.argv[1:])
+args.func(args)
+print("heavy modules: " + ",".join(m for m in {} if m in sys.modules))
+""".format(heavy_modules)
+
+
+def run_vise(args, check_code=code):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([root_dir, env.get("PYTHONPATH", "")])
+    return subprocess.run([sys.executable, "-c", check_code] + args,
+                          stdout=subprocess.PIPE, env=env, check=True,
+                          universal_newlines=True).stdout.strip()
+
+
+class LazyImportTest(ViseTest):
+    def test_light_subcommands(self):
+        for args in [["bg", "-v", "vasprun.xml"],
+                     ["pb", "-v", "vasprun.xml", "-k", "KPOINTS"],
+                     ["pd", "-v", "vasprun.xml"],
+                     ["cpd", "-e", "Mg", "O"]]:
+            with self.subTest(args=args):
+                self.assertEqual("", run_vise(args))
+
+        output = run_vise(["bg", "-v", "vasprun.xml"], dispatch_code)
+        self.assertEqual(["band gap info 1.0", "heavy modules:"],
+                         output.splitlines()[-2:])
+
+
+@unittest.skipIf(benchmark_limit is None,
+                 "Set VISE_STARTUP_BENCHMARK to run the startup benchmark")
+class StartupBenchmarkTest(ViseTest):
+    def test_startup_time(self):
+        timer = """
+import sys, time
+t = time.perf_counter()
+from vise.cli.main import parse_args
+parse_args(sys.argv[1:])
+print(time.perf_counter() - t)
+"""
+        times = [float(run_vise(["bg", "-v", "vasprun.xml"], timer))
+                 for _ in range(5)]
+        self.assertLess(median(times), float(benchmark_limit),
+                        f"Median startup time of vise bg: "
+                        f"{median(times):.3f} s")
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 
 __author__ = "Yu Kumagai"
 __maintainer__ = "Yu Kumagai"
@@ -6,6 +7,13 @@ __maintainer__ = "Yu Kumagai"
 
 SYMMETRY_TOLERANCE = 0.01
 ANGLE_TOL = 5
+SYMMETRY_CACHE_SIZE = 128  # Max number of structures in the symmetry cache.
+# Directory storing seekpath results on disk. Switched off when not set.
+SEEKPATH_CACHE_DIR = os.environ.get("VISE_SEEKPATH_CACHE_DIR")
+
+# Directory storing pickled yaml datasets of the input sets. Switched off when
+# not set.
+DATASET_CACHE_DIR = os.environ.get("VISE_DATASET_CACHE_DIR")
 
 DOS_STEP_SIZE = 0.01
 
@@ -28,3 +36,7 @@ TIMEOUT = 518400
 ROOM_TEMPERATURE = 298.15
 REFERENCE_PRESSURE = 1e5
 MOLECULE_SUFFIX = "molecule_chempotdiag"
+
+# server
+# Unix domain socket of "vise serve" and vise_client. Switched off when not set.
+SERVER_SOCKET = os.environ.get("VISE_SERVER_SOCKET")
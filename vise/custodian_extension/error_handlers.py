@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
-import subprocess
+import os
+import re
 from collections import Counter
 from copy import deepcopy
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 from custodian.custodian import ErrorHandler
 from custodian.utils import backup
@@ -10,6 +14,8 @@ from pymatgen.io.vasp import Vasprun
 from vise.input_set.incar import ViseIncar
 from vise.input_set.vasp_input import ViseVaspInput
 from vise.custodian_extension.modder import ViseVaspModder
+from vise.custodian_extension.resource_monitor import (
+    file_age, job_memory_usage, system_memory_usage)
 from pymatgen.io.vasp.inputs import VaspInput, Incar, Kpoints
 from pymatgen.io.vasp.outputs import Oszicar
 from pymatgen.transformations.standard_transformations import \
@@ -20,6 +26,166 @@ orig_handlers.Incar = ViseIncar
 orig_handlers.VaspModder = ViseVaspModder
 orig_handlers.VaspInput = ViseVaspInput
 
+# Number of the latest electronic steps used for the SCF convergence fit.
+SCF_PREDICTION_WINDOW = 15
+
+
+class FileTail:
+    """Read the lines appended to a file since the previous read.
+
+    Monitors check output files such as vasp.out many times during a
+    calculation, so only the bytes after the offset of the previous read are
+    read. The file is read from the beginning when it is replaced, truncated
+    or its head is rewritten.
+    """
+
+    head_size = 256
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.offset = 0
+        self._inode = None
+        self._head = b""
+
+    def read(self) -> Tuple[str, bool]:
+        """Read the new lines.
+
+        The last line without the line break is also returned, but it is read
+        again at the next time as it may still be being written.
+
+        Returns:
+            Tuple of the new lines and whether the file is read from the
+            beginning.
+        """
+        stat = os.stat(self.filename)
+        with open(self.filename, "rb") as f:
+            is_reset = (stat.st_ino != self._inode
+                        or stat.st_size < self.offset
+                        or f.read(len(self._head)) != self._head)
+            if is_reset:
+                self.offset = 0
+                self._inode = stat.st_ino
+
+            f.seek(self.offset)
+            data = f.read()
+
+        if is_reset:
+            self._head = data[:self.head_size]
+        self.offset += data.rfind(b"\n") + 1
+
+        return data.decode("utf-8", errors="replace"), is_reset
+
+    def reset(self) -> None:
+        self.offset = 0
+        self._inode = None
+        self._head = b""
+
+
+_incar_cache = {}
+
+
+def cached_incar(filename: str = "INCAR") -> Incar:
+    """Incar parsed again only when the file is modified.
+
+    The returned Incar is shared, so do not modify it.
+    """
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if path not in _incar_cache or _incar_cache[path][0] != stamp:
+        _incar_cache[path] = (stamp, Incar.from_file(path))
+    return _incar_cache[path][1]
+
+
+class OszicarStep:
+    """Summary of the electronic steps in an ionic step of OSZICAR. """
+
+    def __init__(self):
+        self.num_electronic_steps = 0
+        # dE of the electronic steps.
+        self.energy_changes = []
+        self.last_energy = None
+        self.max_energy = float("-inf")
+        self.max_abs_energy = 0.0
+        # Free energy F written at the end of the ionic step.
+        self.free_energy = None
+
+    def add_electronic_step(self, energy: float,
+                            energy_change: float = None) -> None:
+        self.num_electronic_steps += 1
+        if energy_change is not None:
+            self.energy_changes.append(energy_change)
+        self.last_energy = energy
+        self.max_energy = max(self.max_energy, energy)
+        self.max_abs_energy = max(self.max_abs_energy, abs(energy))
+
+
+class OszicarMonitor:
+    """Rolling summary of OSZICAR updated with only the appended lines.
+
+    The monitors of the same OSZICAR are shared among the error handlers via
+    oszicar_monitor, so each line is parsed only once during a calculation.
+    """
+
+    electronic_pattern = re.compile(r"^\s*\w+:\s+(\d+)\s+(\S+)\s+(\S+)")
+    ionic_pattern = re.compile(r"^\s*\d+\s+F=\s*(\S+)")
+
+    def __init__(self, filename: str = "OSZICAR"):
+        self._tail = FileTail(filename)
+        self.ionic_steps: List[OszicarStep] = []
+        self.current_step = OszicarStep()
+        self.max_electronic_steps = 0
+
+    def update(self) -> "OszicarMonitor":
+        text, is_reset = self._tail.read()
+        if is_reset:
+            self.ionic_steps = []
+            self.current_step = OszicarStep()
+            self.max_electronic_steps = 0
+
+        # The last line without line break is parsed at the next update.
+        for line in text[:text.rfind("\n") + 1].splitlines():
+            match = self.electronic_pattern.match(line)
+            if match:
+                self.current_step.add_electronic_step(_to_float(match[2]),
+                                                      _to_float(match[3]))
+                self.max_electronic_steps = max(self.max_electronic_steps,
+                                                int(match[1]))
+                continue
+            match = self.ionic_pattern.match(line)
+            if match:
+                self.current_step.free_energy = _to_float(match[1])
+                self.ionic_steps.append(self.current_step)
+                self.current_step = OszicarStep()
+
+        return self
+
+    @property
+    def last_step(self) -> Optional[OszicarStep]:
+        """Ionic step in progress, or the last one if it is not started. """
+        if self.current_step.num_electronic_steps or not self.ionic_steps:
+            return self.current_step
+        return self.ionic_steps[-1]
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        # Fortran writes asterisks when the value overflows.
+        return float("inf")
+
+
+_oszicar_monitors = {}
+
+
+def oszicar_monitor(filename: str = "OSZICAR") -> OszicarMonitor:
+    """OszicarMonitor of the file updated to the current content. """
+    path = os.path.abspath(filename)
+    if path not in _oszicar_monitors:
+        _oszicar_monitors[path] = OszicarMonitor(path)
+    return _oszicar_monitors[path].update()
+
 
 # When the original error handlers are modified, add *Vise* to the class name.
 class ViseVaspErrorHandler(orig_handlers.VaspErrorHandler):
@@ -33,31 +199,63 @@ class ViseVaspErrorHandler(orig_handlers.VaspErrorHandler):
         super().__init__(output_filename=output_filename,
                          natoms_large_cell=natoms_large_cell,
                          errors_subset_to_catch=ViseVaspErrorHandler.error_msgs)
+        self._reset_scan()
 
     def check(self):
-        incar = Incar.from_file("INCAR")
+        """Scan only the lines appended to the output since the last check.
+
+        All the messages are searched at once with a combined regex, and the
+        lines with any match are checked for each message.
+        """
+        text, is_reset = self._tail.read()
+        if is_reset:
+            self._found = set()
+
+        pos = 0
+        while True:
+            match = self._pattern.search(text, pos)
+            if match is None:
+                break
+            start = text.rfind("\n", 0, match.start()) + 1
+            end = text.find("\n", match.end())
+            end = len(text) if end == -1 else end
+            line = text[start:end].strip()
+            for err, msgs in self.error_msgs.items():
+                if err in self.errors_subset_to_catch:
+                    for msg in msgs:
+                        if line.find(msg) != -1:
+                            self._found.add((err, msg))
+            pos = end + 1
+
         self.errors = set()
+        if not self._found:
+            return False
+
+        incar = cached_incar("INCAR")
         errors = set()
-        with open(self.output_filename, "r") as f:
-            for line in f:
-                l = line.strip()
-                for err, msgs in self.error_msgs.items():
-                    if err in self.errors_subset_to_catch:
-                        for msg in msgs:
-                            if l.find(msg) != -1:
-                                # this checks if we want to run a charged
-                                # computation (e.g., defects) if yes we don't
-                                # want to kill it because there is a change in
-                                # e-density (brmix error)
-                                if err == "brmix" and 'NELECT' in incar:
-                                    continue
-                                self.errors.add(err)
-                                errors.add(msg)
+        for err, msg in self._found:
+            # this checks if we want to run a charged computation (e.g.,
+            # defects) if yes we don't want to kill it because there is a
+            # change in e-density (brmix error)
+            if err == "brmix" and 'NELECT' in incar:
+                continue
+            self.errors.add(err)
+            errors.add(msg)
         for msg in errors:
             self.logger.error(msg, extra={"incar": incar.as_dict()})
         return len(self.errors) > 0
 
+    def _reset_scan(self):
+        self._tail = FileTail(self.output_filename)
+        # Pairs of the error and message found in the output.
+        self._found = set()
+        msgs = [msg for err, msgs in self.error_msgs.items()
+                if err in self.errors_subset_to_catch for msg in msgs]
+        self._pattern = re.compile("|".join(re.escape(m) for m in msgs))
+
     def correct(self):
+        # vasp.out is overwritten by the next run.
+        self._reset_scan()
 
         backup(orig_handlers.VASP_BACKUP_FILES | {self.output_filename})
         actions = []
@@ -288,6 +486,19 @@ class ViseVaspErrorHandler(orig_handlers.VaspErrorHandler):
         return {"errors": list(self.errors), "actions": actions}
 
 
+def scf_correction_settings(incar: dict) -> dict:
+    """INCAR settings for the unconverged electronic steps. """
+    # For SCAN try switching to CG for the electronic minimization
+    if "SCAN" in incar.get("METAGGA", "").upper():
+        return {"ALGO": "All"}
+    return {"ISTART":   1,
+            "ALGO":     "Normal",
+            "NELMDL":   -6,
+            "BMIX":     0.001,
+            "AMIX_MAG": 0.8,
+            "BMIX_MAG": 0.001}
+
+
 class ViseUnconvergedErrorHandler(orig_handlers.UnconvergedErrorHandler):
 
     def correct(self):
@@ -296,17 +507,7 @@ class ViseUnconvergedErrorHandler(orig_handlers.UnconvergedErrorHandler):
         actions = [{"file":   "CONTCAR",
                     "action": {"_file_copy": {"dest": "POSCAR"}}}]
         if not v.converged_electronic:
-            # For SCAN try switching to CG for the electronic minimization
-            if "SCAN" in v.incar.get("METAGGA", "").upper():
-                new_settings = {"ALGO": "All"}
-            else:
-                new_settings = {"ISTART":   1,
-                                "ALGO":     "Normal",
-                                "NELMDL":   -6,
-                                "BMIX":     0.001,
-                                "AMIX_MAG": 0.8,
-                                "BMIX_MAG": 0.001}
-
+            new_settings = scf_correction_settings(v.incar)
             if all([v.incar.get(k, "") == val for k, val in
                     new_settings.items()]):
                 return {"errors": ["Unconverged"], "actions": None}
@@ -326,6 +527,122 @@ class ViseUnconvergedErrorHandler(orig_handlers.UnconvergedErrorHandler):
         return {"errors": ["Unconverged"], "actions": actions}
 
 
+class ScfConvergencePredictionHandler(ErrorHandler):
+    """Detects electronic steps that are predicted not to converge in NELM.
+
+    The upper envelope of |dE| of the latest electronic steps in the current
+    ionic step is fitted to an exponential decay, i.e., a line in log scale.
+    Taking the envelope, the local maxima of |dE|, makes the fit robust for
+    the oscillating charge sloshing. When |dE| is not decreasing or EDIFF is
+    predicted to be reached after NELM, the calculation is stopped and the
+    same corrections as ViseUnconvergedErrorHandler are applied.
+
+    Vasp proceeds to the next ionic step even when the electronic steps reach
+    NELM, and ViseUnconvergedErrorHandler checks only the final ionic step.
+    Therefore, only the NSW-th ionic step, which is the only one in the
+    single point calculations, is predicted. Once the corrections have been
+    applied, the prediction is not done either.
+    """
+
+    is_monitor = True
+
+    def __init__(self,
+                 oszicar="OSZICAR",
+                 incar="INCAR",
+                 min_steps=30,
+                 window=SCF_PREDICTION_WINDOW):
+        """
+        Args:
+            oszicar (str):
+                OSZICAR file name.
+            incar (str):
+                INCAR file name.
+            min_steps (int):
+                Minimum number of electronic steps for the prediction, which
+                also should be larger than the non-selfconsistent steps.
+            window (int):
+                Number of the latest electronic steps used for the fit.
+        """
+        self.oszicar = oszicar
+        self.incar = incar
+        self.min_steps = min_steps
+        self.window = window
+
+    def check(self):
+        monitor = oszicar_monitor(self.oszicar)
+        incar = cached_incar(self.incar)
+        if len(monitor.ionic_steps) + 1 < incar.get("NSW", 0):
+            return False
+        if all([incar.get(k, "") == val
+                for k, val in scf_correction_settings(incar).items()]):
+            return False
+
+        step = monitor.current_step
+        nelm = incar.get("NELM", 60)
+        ediff = incar.get("EDIFF", 1e-4)
+
+        if step.num_electronic_steps < min(self.min_steps, nelm) \
+                or step.num_electronic_steps >= nelm:
+            return False
+
+        num_steps = predicted_num_scf_steps(step.energy_changes, ediff,
+                                            window=self.window)
+        return num_steps > nelm
+
+    def correct(self):
+        backup(orig_handlers.VASP_BACKUP_FILES)
+        incar = Incar.from_file(self.incar)
+        new_settings = scf_correction_settings(incar)
+
+        actions = []
+        # CONTCAR is written only after the first ionic step.
+        if os.path.exists("CONTCAR") and os.path.getsize("CONTCAR") > 0:
+            actions.append({"file":   "CONTCAR",
+                            "action": {"_file_copy": {"dest": "POSCAR"}}})
+        actions.append({"dict":   "INCAR",
+                        "action": {"_set": new_settings}})
+        ViseVaspModder().apply_actions(actions)
+        return {"errors": ["Unconverged_prediction"], "actions": actions}
+
+
+def predicted_num_scf_steps(energy_changes: List[float],
+                            ediff: float,
+                            window: int = SCF_PREDICTION_WINDOW) -> float:
+    """Predict the electronic step number where |dE| reaches ediff.
+
+    Args:
+        energy_changes (List[float]):
+            dE of the electronic steps from the first step.
+        ediff (float):
+            EDIFF in eV.
+        window (int):
+            Number of the latest electronic steps used for the fit.
+
+    Returns:
+        Predicted step number counted from 1. inf if |dE| is not decreasing.
+    """
+    de = np.abs(np.array(energy_changes[-window:], dtype=float))
+    steps = np.arange(len(energy_changes) - len(de), len(energy_changes)) + 1
+    if len(de) < 3:
+        return float("inf")
+    if de[-1] < ediff:
+        return float(steps[-1])
+
+    # Upper envelope composed of the local maxima and the last point.
+    is_peak = np.ones(len(de), dtype=bool)
+    is_peak[1:-1] = (de[1:-1] >= de[:-2]) & (de[1:-1] >= de[2:])
+    is_peak[0] = de[0] >= de[1]
+    if is_peak.sum() < 2:
+        is_peak[:] = True
+
+    with np.errstate(divide="ignore"):
+        log_de = np.log(np.maximum(de[is_peak], 1e-300))
+    slope, intercept = np.polyfit(steps[is_peak], log_de, 1)
+    if slope >= 0:
+        return float("inf")
+    return float((np.log(ediff) - intercept) / slope)
+
+
 class DielectricMaxIterationErrorHandler(ErrorHandler):
     """Detects if the SCF is not attained. """
 
@@ -337,12 +654,8 @@ class DielectricMaxIterationErrorHandler(ErrorHandler):
         self.incar = incar
 
     def check(self):
-
-        incar = Incar.from_file(self.incar)
-        nelm = incar.get("NELM", 60)
-        unconverged_line = f":{nelm:4d}"
-        with open(self.oszicar, "r") as fr:
-            return any(unconverged_line in line for line in fr)
+        nelm = cached_incar(self.incar).get("NELM", 60)
+        return oszicar_monitor(self.oszicar).max_electronic_steps >= nelm
 
     def correct(self):
         # Uncorrectable error. Just return None for actions.
@@ -354,18 +667,26 @@ class MemoryOverflowHandler(ErrorHandler):
 
     is_monitor = True
 
-    def __init__(self, memory_usage_limit=0.85):
+    def __init__(self, memory_usage_limit=0.85, per_job=True):
         """
         Initializes the handler with the output file to check.
 
         Args:
             memory_usage_limit (float):
+                Limit of the fraction of the used memory in the node.
+            per_job (bool):
+                Whether to count only the memory used by the processes run by
+                this custodian, which is adequate for shared nodes. Otherwise,
+                the memory used in the whole node is counted.
         """
         self.memory_usage_limit = memory_usage_limit
+        self.per_job = per_job
 
     def check(self):
-        res = subprocess.check_output('free').split()
-        memory_usage = int(res[8]) / int(res[7])
+        if self.per_job:
+            memory_usage = job_memory_usage()
+        else:
+            memory_usage = system_memory_usage()
         if memory_usage > self.memory_usage_limit:
             return True
 
@@ -390,11 +711,7 @@ class TooLongTimeCalcErrorHandler(ErrorHandler):
         self.timeout = timeout
 
     def check(self):
-        now_time = int(subprocess.check_output(['date', '+%s']))
-        incar_time = \
-            int(subprocess.check_output(['date', '+%s', '-r', 'INCAR']))
-        incar_age = now_time - incar_time
-        if incar_age > self.timeout:
+        if file_age("INCAR") > self.timeout:
             return True
 
     def correct(self):
@@ -415,15 +732,12 @@ class DivergingEnergyErrorHandler(ErrorHandler):
         self.energy_criterion = energy_criterion
 
     def check(self):
-        oszicar = Oszicar(self.output_filename)
-        esteps = oszicar.electronic_steps
-        # OSZICAR file can be empty, thus we need try-except here.
-        try:
-            max_energy = max([es["E"] for es in esteps[-1]])
-        except (IndexError, KeyError):
+        step = oszicar_monitor(self.output_filename).last_step
+        # OSZICAR file can be empty.
+        if step.num_electronic_steps == 0:
             return False
 
-        if max_energy > self.energy_criterion:
+        if step.max_energy > self.energy_criterion:
             return True
 
     def correct(self):
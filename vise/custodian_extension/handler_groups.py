@@ -3,7 +3,8 @@ from custodian.vasp import handlers as orig_handlers
 
 from vise.custodian_extension.error_handlers import (
     ViseVaspErrorHandler, ViseUnconvergedErrorHandler, MemoryOverflowHandler,
-    DivergingEnergyErrorHandler, TooLongTimeCalcErrorHandler)
+    DivergingEnergyErrorHandler, TooLongTimeCalcErrorHandler,
+    ScfConvergencePredictionHandler)
 from vise.util.logger import get_logger
 
 # Note1: Custodian handler groups are modified to avoid IBRION=1, which does not
@@ -40,6 +41,20 @@ def handler_group(name: str = "default",
                        DivergingEnergyErrorHandler(),
                        TooLongTimeCalcErrorHandler(timeout=timeout),
                        ],
+        # Stop the electronic steps predicted not to converge before NELM.
+        "scf_prediction": [orig_handlers.MeshSymmetryErrorHandler(),
+                           orig_handlers.NonConvergingErrorHandler(),
+                           orig_handlers.PotimErrorHandler(),
+                           orig_handlers.PositiveEnergyErrorHandler(),
+                           orig_handlers.FrozenJobErrorHandler(),
+                           orig_handlers.StdErrHandler(),
+                           ViseVaspErrorHandler(),
+                           ViseUnconvergedErrorHandler(),
+                           ScfConvergencePredictionHandler(),
+                           MemoryOverflowHandler(),
+                           DivergingEnergyErrorHandler(),
+                           TooLongTimeCalcErrorHandler(timeout=timeout),
+                           ],
         "dielectric": [orig_handlers.MeshSymmetryErrorHandler(),
                        orig_handlers.NonConvergingErrorHandler(
                            nionic_steps=nionic_steps),
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from concurrent.futures import ProcessPoolExecutor
 import json
 import os
 import re
@@ -11,22 +12,25 @@ from typing import Optional, List
 from uuid import uuid4
 
 import numpy as np
+from custodian.custodian import Custodian
 from custodian.vasp.jobs import VaspJob
 from monty.json import MSONable
 from monty.json import MontyEncoder
 from monty.serialization import loadfn
 from pymatgen.core.structure import Structure
-from pymatgen.io.vasp import Kpoints, Vasprun
-from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+from pymatgen.io.vasp import Kpoints
 
 from vise.config import (
     SYMMETRY_TOLERANCE, ANGLE_TOL, KPT_INIT_DENSITY, KPT_FACTOR)
 from vise.input_set.incar import Incar
 from vise.input_set.input_set import ViseInputSet
+from vise.input_set.make_kpoints import next_kpt_density
 from vise.input_set.task import Task, LATTICE_RELAX_TASK
 from vise.input_set.xc import Xc
 from vise.util.error_classes import VaspNotConvergedError, KptNotConvergedError
 from vise.util.logger import get_logger
+from vise.util.structure_handler import get_symmetry_dataset
+from vise.util.vasprun_reader import LightVasprun, RelaxationProbe
 
 """ Provides structure optimization and kpt convergence jobs for VASP runs. """
 
@@ -149,13 +153,12 @@ class StructureOptResult(MSONable):
             raise
 
         final_structure = Structure.from_file(d_path / contcar)
-        sga = SpacegroupAnalyzer(structure=final_structure,
-                                 symprec=symprec,
-                                 angle_tolerance=angle_tolerance)
-        symmetry_dataset = sga.get_symmetry_dataset()
-        final_sg = symmetry_dataset["number"]
+        final_sg = get_symmetry_dataset(structure=final_structure,
+                                        symprec=symprec,
+                                        angle_tolerance=angle_tolerance
+                                        )["number"]
 
-        v = Vasprun(d_path / vasprun)
+        v = LightVasprun(d_path / vasprun, parse_structure=False)
         energy_per_atom = v.final_energy / len(final_structure)
 
         if prev_structure_opt:
@@ -164,11 +167,10 @@ class StructureOptResult(MSONable):
             prev_structure_opt_uuid = prev_structure_opt.uuid
         else:
             initial_structure = Structure.from_file(d_path / poscar)
-            sga = SpacegroupAnalyzer(structure=initial_structure,
-                                     symprec=symprec,
-                                     angle_tolerance=angle_tolerance)
-            initial_symmetry_dataset = sga.get_symmetry_dataset()
-            initial_sg = initial_symmetry_dataset["number"]
+            initial_sg = get_symmetry_dataset(structure=initial_structure,
+                                              symprec=symprec,
+                                              angle_tolerance=angle_tolerance
+                                              )["number"]
             prev_structure_opt_uuid = None
 
         return cls(uuid=int(uuid4()),
@@ -452,7 +454,9 @@ class ViseVaspJob(VaspJob):
             left_files: Optional[list] = None,
             removed_files: Optional[list] = None,
             symprec: float = SYMMETRY_TOLERANCE,
-            angle_tolerance: float = ANGLE_TOL
+            angle_tolerance: float = ANGLE_TOL,
+            force_criterion: Optional[float] = None,
+            volume_criterion: Optional[float] = None
             ) -> None:
         """Vasp job for structure optimization
 
@@ -479,6 +483,12 @@ class ViseVaspJob(VaspJob):
             symprec:
             angle_tolerance:
                 See docstrings of StructureOptResult.
+            force_criterion (float):
+            volume_criterion (float):
+                The relaxation is also regarded as converged when the max
+                force in eV/A and the relative volume change are within the
+                given criteria, even if it takes two or more ionic steps.
+                See docstrings of RelaxationProbe.is_converged.
 
         Yield:
             ViseVaspJob class object.
@@ -493,7 +503,11 @@ class ViseVaspJob(VaspJob):
             shutil.copy(".".join(["CONTCAR", str(job_number)]), "POSCAR")
             backup_initial_input_files = False
 
-            if len(Vasprun(f"vasprun.xml.{job_number}").ionic_steps) == 1:
+            # OSZICAR is left by the job just finished.
+            probe = RelaxationProbe(f"vasprun.xml.{job_number}",
+                                    oszicar="OSZICAR")
+            logger.info(f"Relaxation {job_number}: {probe}")
+            if probe.is_converged(force_criterion, volume_criterion):
                 break
         else:
             raise VaspNotConvergedError("Structure optimization not converged")
@@ -637,11 +651,25 @@ class ViseVaspJob(VaspJob):
 
             if is_sg_changed is False:
                 prev_kpt = prev_str_opt.num_kpt
-                kpt_density = prev_str_opt.kpt_density
+                prev_dir = Path(prev_str_opt.dirname)
+                opts = {**ViseInputSet.load_json(prev_dir / "vise.json").kwargs,
+                        **vis_kwargs}
+                # Jump to the density where the k-point mesh is incremented.
+                kpt_density = next_kpt_density(
+                    structure=Structure.from_file(prev_dir / "CONTCAR.finish"),
+                    kpt_density=prev_str_opt.kpt_density,
+                    kpt_mesh=prev_kpt,
+                    multiplier=KPT_FACTOR,
+                    mode=opts["kpt_mode"],
+                    only_even=opts["only_even"],
+                    kpt_shift=opts["kpt_shift"],
+                    factor=opts["factor"] or 1,
+                    symprec=symprec,
+                    angle_tolerance=angle_tolerance)
 
-                # Iteratively increase kpt_density until num_kpt is incremented.
+                # Further increase kpt_density if num_kpt is not incremented,
+                # which should not happen in principle.
                 while True:
-                    kpt_density *= KPT_FACTOR
                     vis = ViseInputSet.from_prev_calc(
                         dirname=prev_str_opt.dirname,
                         parse_calc_results=False,
@@ -657,6 +685,7 @@ class ViseVaspJob(VaspJob):
                     if (not kpt == prev_kpt
                             and all([i >= j for i, j in zip(kpt, prev_kpt)])):
                         break
+                    kpt_density *= KPT_FACTOR
             else:
                 if is_sg_changed is True:
                     logger.warning("Space group is changed during the kpoint "
@@ -711,4 +740,227 @@ class ViseVaspJob(VaspJob):
             raise KptNotConvergedError(
                 "Energy was not converged as function of k-points numbers.")
 
+    @classmethod
+    def kpt_converge_parallel(cls,
+                              vasp_cmd: list,
+                              handlers: list,
+                              structure: Structure = None,
+                              task: Task = Task.structure_opt,
+                              xc: Xc = Xc.pbe,
+                              user_incar_settings: Optional[dict] = None,
+                              initial_kpt_density: float = KPT_INIT_DENSITY,
+                              gamma_vasp_cmd: Optional[list] = None,
+                              max_relax_num: int = 10,
+                              max_kpt_num: int = 10,
+                              convergence_criterion: float = 0.003,
+                              num_kpt_check: int = 2,
+                              num_processes: Optional[int] = None,
+                              removes_wavecar: bool = False,
+                              left_files: Optional[list] = None,
+                              removed_files: Optional[list] = None,
+                              std_out: str = "vasp.out",
+                              symprec: float = SYMMETRY_TOLERANCE,
+                              angle_tolerance: float = ANGLE_TOL,
+                              custodian_kwargs: Optional[dict] = None,
+                              **vis_kwargs) -> KptConvResult:
+        """K-point convergence running num_kpt_check + 1 meshes concurrently
+
+        Each round lays out the next num_kpt_check + 1 k-point meshes in
+        separate directories, and runs structure optimizations there with
+        Custodian in parallel processes. All the meshes in a round start from
+        the same structure, i.e., the input one or the final structure of the
+        previous round. When the space group is changed, the convergence is
+        checked from the initial k-point density again as kpt_converge.
+
+        Unlike kpt_converge, this runs Custodian by itself, so must not be
+        passed to Custodian as jobs.
+
+        Args:
+            handlers (list):
+                Custodian error handlers.
+            num_processes (int):
+                Number of structure optimizations run at the same time.
+                If None, num_kpt_check + 1 is set.
+            custodian_kwargs (dict):
+                Other keyword arguments for Custodian.
+            Other args:
+                See docstrings of kpt_converge.
+
+        Return:
+            KptConvResult object.
+        """
+        if task not in LATTICE_RELAX_TASK:
+            raise ValueError(f"Task: {task} is not in lattice relax set.")
+
+        structure = structure or Structure.from_file("POSCAR")
+        kpt_conv = KptConvResult.from_dirs(convergence_criterion, num_kpt_check,
+                                           symprec, angle_tolerance)
+        num_processes = num_processes or num_kpt_check + 1
+        custodian_kwargs = {"handlers": handlers, **(custodian_kwargs or {})}
+        optimization_kwargs = {"vasp_cmd": vasp_cmd,
+                               "gamma_vasp_cmd": gamma_vasp_cmd,
+                               "max_relax_num": max_relax_num,
+                               "std_out": std_out,
+                               "left_files": left_files,
+                               "removed_files": removed_files,
+                               "symprec": symprec,
+                               "angle_tolerance": angle_tolerance}
+
+        vis_kwargs.update({"task": task,
+                           "xc": xc,
+                           "user_incar_settings": user_incar_settings,
+                           "symprec": symprec,
+                           "angle_tolerance": angle_tolerance})
+
+        sg_changed = [s for s in kpt_conv.str_opts[-1:] if s.is_sg_changed]
+
+        while not kpt_conv.converged_result \
+                and len(kpt_conv.str_opts) < max_kpt_num:
+
+            num_meshes = min(num_kpt_check + 1,
+                             max_kpt_num - len(kpt_conv.str_opts))
+
+            if kpt_conv.str_opts and not sg_changed:
+                input_sets = cls._kpt_input_sets(
+                    num_meshes, vis_kwargs, prev_str_opt=kpt_conv.str_opts[-1])
+            else:
+                if sg_changed:
+                    logger.warning("Space group is changed during the kpoint "
+                                   "convergence, So the kpoint check is "
+                                   "reiterated.")
+                    name = Path(sg_changed[-1].dirname) / "CONTCAR.finish"
+                    structure = Structure.from_file(name)
+                input_sets = cls._kpt_input_sets(
+                    num_meshes, vis_kwargs, structure=structure,
+                    kpt_density=initial_kpt_density)
+
+            dirnames = []
+            for vis in input_sets:
+                dirname = "mesh" + "x".join(map(str, vis.kpoints.kpts[0]))
+                vis.write_input(dirname)
+                dirnames.append(dirname)
+
+            with ProcessPoolExecutor(max_workers=num_processes) as executor:
+                futures = [executor.submit(_run_structure_opt,
+                                           os.path.abspath(d),
+                                           custodian_kwargs,
+                                           optimization_kwargs)
+                           for d in dirnames]
+                for future in futures:
+                    future.result()
+
+            str_opts = [StructureOptResult.load_json(
+                str(Path(d) / "structure_opt.json")) for d in dirnames]
+            # shutil.move moves a directory into the target when it exists.
+            for d, str_opt in zip(dirnames, str_opts):
+                if os.path.exists(str_opt.dirname):
+                    raise FileExistsError(
+                        f"{str_opt.dirname} already exists, so the result "
+                        f"in {d} cannot be moved there.")
+
+            # Link the results in the order of the k-point meshes.
+            for d, str_opt in zip(dirnames, str_opts):
+                if kpt_conv.str_opts:
+                    str_opt.prev_structure_opt_uuid = kpt_conv.str_opts[-1].uuid
+                str_opt.to_json_file(str(Path(d) / "structure_opt.json"))
+                kpt_conv.str_opts.append(str_opt)
+                shutil.move(d, str_opt.dirname)
+
+            sg_changed = [s for s in str_opts if s.is_sg_changed]
+
+        rm_wavecar(remove_current=removes_wavecar, remove_subdirectories=True)
+
+        if kpt_conv.converged_result:
+            conv_dirname = Path(kpt_conv.converged_result.dirname)
+            for f in VASP_INPUT_FILES | VASP_FINISHED_FILES - {"INCAR"}:
+                os.symlink(str(conv_dirname / f), f)
+            kpt_conv.to_json_file("kpt_conv.json")
+        else:
+            raise KptNotConvergedError(
+                "Energy was not converged as function of k-points numbers.")
+
+        return kpt_conv
+
+    @staticmethod
+    def _kpt_input_sets(num_sets: int,
+                        vis_kwargs: dict,
+                        prev_str_opt: Optional[StructureOptResult] = None,
+                        structure: Optional[Structure] = None,
+                        kpt_density: Optional[float] = None
+                        ) -> List[ViseInputSet]:
+        """Input sets with k-point meshes incremented one by one.
+
+        When prev_str_opt is given, the meshes succeed that of prev_str_opt and
+        the input sets are generated from its final structure. Otherwise, the
+        first mesh is the one at kpt_density for the given structure.
+        """
+        input_sets = []
+        prev_kpt = None
+        if prev_str_opt:
+            prev_kpt = prev_str_opt.num_kpt
+            kpt_density = prev_str_opt.kpt_density
+
+        while len(input_sets) < num_sets:
+            if prev_kpt:
+                if input_sets:
+                    base = input_sets[-1]
+                    kpt_structure = base.structure
+                else:
+                    prev_dir = Path(prev_str_opt.dirname)
+                    base = ViseInputSet.load_json(prev_dir / "vise.json")
+                    kpt_structure = \
+                        Structure.from_file(prev_dir / "CONTCAR.finish")
+                opts = {**base.kwargs, **vis_kwargs}
+                kpt_density = next_kpt_density(
+                    structure=kpt_structure,
+                    kpt_density=kpt_density,
+                    kpt_mesh=prev_kpt,
+                    multiplier=KPT_FACTOR,
+                    mode=opts["kpt_mode"],
+                    only_even=opts["only_even"],
+                    kpt_shift=opts["kpt_shift"],
+                    factor=opts["factor"] or 1,
+                    symprec=opts["symprec"],
+                    angle_tolerance=opts["angle_tolerance"])
+
+            if prev_str_opt:
+                vis = ViseInputSet.from_prev_calc(
+                    dirname=prev_str_opt.dirname,
+                    parse_calc_results=False,
+                    parse_incar=True,
+                    sort_structure=False,
+                    standardize_structure=True,
+                    contcar_filename="CONTCAR.finish",
+                    kpt_density=kpt_density,
+                    **vis_kwargs)
+            else:
+                vis = ViseInputSet.make_input(structure=structure,
+                                              kpt_density=kpt_density,
+                                              **vis_kwargs)
+
+            kpt = vis.kpoints.kpts[0]
+            if (prev_kpt is None
+                    or (not kpt == prev_kpt
+                        and all([i >= j for i, j in zip(kpt, prev_kpt)]))):
+                input_sets.append(vis)
+                prev_kpt = kpt
+            else:
+                kpt_density *= KPT_FACTOR
+
+        return input_sets
+
+
+def _run_structure_opt(dirname: str,
+                       custodian_kwargs: dict,
+                       optimization_kwargs: dict) -> None:
+    """Run structure optimization with Custodian at dirname.
 
+    This is a module-level function so as to be picklable for the process pool.
+    """
+    cwd = os.getcwd()
+    os.chdir(dirname)
+    try:
+        jobs = ViseVaspJob.structure_optimization_run(**optimization_kwargs)
+        Custodian(jobs=jobs, **custodian_kwargs).run()
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+from typing import Dict, List, Optional
+
+""" Resource usages read directly from /proc and the file system.
+
+These are called at every poll of the custodian monitors, so no external
+command such as free and date is run.
+"""
+
+PROC_DIR = "/proc"
+
+
+def read_meminfo(meminfo: str = os.path.join(PROC_DIR, "meminfo")
+                 ) -> Dict[str, int]:
+    """Parse /proc/meminfo.
+
+    Returns:
+        Dict of keys such as "MemTotal" and the values in bytes.
+    """
+    result = {}
+    with open(meminfo) as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            tokens = value.split()
+            if tokens:
+                result[key] = int(tokens[0]) * (1024 if len(tokens) > 1 else 1)
+    return result
+
+
+def system_memory_usage(meminfo: str = os.path.join(PROC_DIR, "meminfo")
+                        ) -> float:
+    """Fraction of the memory used in the node, which is "used" of free. """
+    info = read_meminfo(meminfo)
+    total = info["MemTotal"]
+    if "MemAvailable" in info:
+        available = info["MemAvailable"]
+    else:
+        # Linux kernels older than 3.14.
+        available = info["MemFree"] + info.get("Buffers", 0) \
+                    + info.get("Cached", 0)
+    return (total - available) / total
+
+
+def child_pids(pid: int, proc_dir: str = PROC_DIR) -> List[int]:
+    """Pids of all the descendant processes of pid. """
+    children = {}
+    for name in os.listdir(proc_dir):
+        if not name.isdigit():
+            continue
+        try:
+            with open(os.path.join(proc_dir, name, "stat")) as f:
+                stat = f.read()
+        except OSError:
+            # The process has finished.
+            continue
+        # The command name in the parentheses could include spaces.
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(name))
+
+    result, stack = [], [pid]
+    while stack:
+        for c in children.get(stack.pop(), []):
+            result.append(c)
+            stack.append(c)
+    return result
+
+
+def process_rss(pid: int, proc_dir: str = PROC_DIR) -> int:
+    """Resident set size of a process in bytes, which is 0 if finished. """
+    try:
+        with open(os.path.join(proc_dir, str(pid), "statm")) as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError):
+        return 0
+
+
+def process_tree_rss(pid: Optional[int] = None,
+                     proc_dir: str = PROC_DIR) -> int:
+    """Total resident set size of a process and its descendants in bytes.
+
+    Args:
+        pid (int):
+            Root process id. The current process, which is the custodian
+            running the vasp processes as its descendants, is used when None.
+        proc_dir (str):
+            Directory of the proc file system.
+
+    Returns:
+        Total rss in bytes.
+    """
+    pid = pid or os.getpid()
+    return sum(process_rss(p, proc_dir)
+               for p in [pid] + child_pids(pid, proc_dir))
+
+
+def job_memory_usage(pid: Optional[int] = None,
+                     meminfo: str = os.path.join(PROC_DIR, "meminfo")
+                     ) -> float:
+    """Fraction of the node memory used by the process tree of pid. """
+    return process_tree_rss(pid) / read_meminfo(meminfo)["MemTotal"]
+
+
+def file_age(filename: str) -> float:
+    """Seconds after the file is last modified. """
+    return time.time() - os.stat(filename).st_mtime
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+
+from vise.util.testing import ViseTest
+from vise.custodian_extension.error_handlers import (
+    FileTail, ViseVaspErrorHandler, cached_incar, MemoryOverflowHandler,
+    TooLongTimeCalcErrorHandler, OszicarMonitor, oszicar_monitor,
+    DivergingEnergyErrorHandler, DielectricMaxIterationErrorHandler,
+    ScfConvergencePredictionHandler, predicted_num_scf_steps)
+
+
+class ErrorHandlerTestCase(ViseTest):
+    def setUp(self) -> None:
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+        with open("INCAR", "w") as f:
+            f.write("ISMEAR = 0\n")
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+
+class FileTailTest(ErrorHandlerTestCase):
+    def test_read(self):
+        tail = FileTail("vasp.out")
+        with open("vasp.out", "w") as f:
+            f.write("a\nb")
+        self.assertEqual(("a\nb", True), tail.read())
+        with open("vasp.out", "a") as f:
+            f.write("c\nd\n")
+        # The last line without line break is read again.
+        self.assertEqual(("bc\nd\n", False), tail.read())
+        self.assertEqual(("", False), tail.read())
+
+    def test_truncated(self):
+        tail = FileTail("vasp.out")
+        with open("vasp.out", "w") as f:
+            f.write("a\nb\n")
+        tail.read()
+        with open("vasp.out", "w") as f:
+            f.write("c\n")
+        self.assertEqual(("c\n", True), tail.read())
+
+
+class CachedIncarTest(ErrorHandlerTestCase):
+    def test(self):
+        incar = cached_incar()
+        self.assertEqual(0, incar["ISMEAR"])
+        self.assertIs(incar, cached_incar())
+
+        with open("INCAR", "w") as f:
+            f.write("ISMEAR = -5\nNELECT = 10\n")
+        self.assertEqual(-5, cached_incar()["ISMEAR"])
+
+
+class ViseVaspErrorHandlerTest(ErrorHandlerTestCase):
+    def test_incremental_check(self):
+        handler = ViseVaspErrorHandler()
+        with open("vasp.out", "w") as f:
+            f.write("DAV:   1    -0.1E+02\n")
+        self.assertFalse(handler.check())
+
+        with open("vasp.out", "a") as f:
+            f.write(" Fatal error detecting k-mesh\n")
+            f.write("DAV:   2    -0.1E+02\n")
+        self.assertTrue(handler.check())
+        self.assertEqual({"tet"}, handler.errors)
+
+        # Errors found in the previous checks are kept.
+        with open("vasp.out", "a") as f:
+            f.write(" ERROR RSPHER\n")
+        self.assertTrue(handler.check())
+        self.assertEqual({"tet", "rspher"}, handler.errors)
+
+    def test_restarted(self):
+        handler = ViseVaspErrorHandler()
+        with open("vasp.out", "w") as f:
+            f.write(" ERROR RSPHER\n")
+        self.assertTrue(handler.check())
+
+        with open("vasp.out", "w") as f:
+            f.write("DAV:   1    -0.1E+02\n")
+        self.assertFalse(handler.check())
+
+
+oszicar_header = "       N       E                     dE             d eps " \
+                 "      ncg     rms          rms(c)\n"
+oszicar_ionic_step = """\
+DAV:   1     0.425437313553E+02    0.42544E+02   -0.37475E+03   912   0.115E+03
+DAV:   2     0.181318047339E+01   -0.40731E+02   -0.39496E+02  1168   0.294E+02
+DAV:   3    -0.109093802026E+02   -0.12723E+02   -0.12659E+02  1128   0.122E+02
+   1 F= -.10909380E+02 E0= -.10908838E+02  d E =-.109094E+02  mag=     2.0000
+"""
+
+
+class OszicarMonitorTest(ErrorHandlerTestCase):
+    def test_update(self):
+        with open("OSZICAR", "w") as f:
+            f.write(oszicar_header + oszicar_ionic_step)
+            f.write("RMM:   1    -0.1200E+02   -0.1E+00   -0.1E+00   10   "
+                    "0.1E+00")
+        monitor = OszicarMonitor().update()
+        self.assertEqual(1, len(monitor.ionic_steps))
+        step = monitor.ionic_steps[0]
+        self.assertEqual(3, step.num_electronic_steps)
+        self.assertAlmostEqual(-10.9093802026, step.last_energy)
+        self.assertAlmostEqual(42.5437313553, step.max_abs_energy)
+        self.assertAlmostEqual(-10.909380, step.free_energy)
+        # The line without the line break is not parsed yet.
+        self.assertEqual(0, monitor.current_step.num_electronic_steps)
+        self.assertIs(step, monitor.last_step)
+
+        with open("OSZICAR", "a") as f:
+            f.write("\n")
+        monitor.update()
+        self.assertEqual(1, monitor.last_step.num_electronic_steps)
+        self.assertEqual(3, monitor.max_electronic_steps)
+
+    def test_shared(self):
+        with open("OSZICAR", "w") as f:
+            f.write(oszicar_header)
+        self.assertIs(oszicar_monitor(), oszicar_monitor("OSZICAR"))
+
+
+class OszicarHandlersTest(ErrorHandlerTestCase):
+    def test_diverging_energy(self):
+        handler = DivergingEnergyErrorHandler(energy_criterion=10)
+        with open("OSZICAR", "w") as f:
+            f.write(oszicar_header)
+        self.assertFalse(handler.check())
+        with open("OSZICAR", "a") as f:
+            f.write(oszicar_ionic_step)
+        self.assertTrue(handler.check())
+        with open("OSZICAR", "a") as f:
+            f.write(oszicar_ionic_step.splitlines(True)[2])
+        self.assertFalse(handler.check())
+
+    def test_dielectric_max_iteration(self):
+        with open("INCAR", "w") as f:
+            f.write("NELM = 3\n")
+        with open("OSZICAR", "w") as f:
+            f.write(oszicar_header + "".join(
+                oszicar_ionic_step.splitlines(True)[:2]))
+        handler = DielectricMaxIterationErrorHandler()
+        self.assertFalse(handler.check())
+        with open("OSZICAR", "a") as f:
+            f.write(oszicar_ionic_step.splitlines(True)[2])
+        self.assertTrue(handler.check())
+
+
+class PredictedNumScfStepsTest(ViseTest):
+    def test_exponential(self):
+        energy_changes = [10 * 0.7 ** n for n in range(1, 21)]
+        # 10 * 0.7 ** n = 1e-4 at n = 32.3
+        self.assertAlmostEqual(32.28, predicted_num_scf_steps(energy_changes,
+                                                              ediff=1e-4),
+                               places=2)
+
+    def test_oscillating(self):
+        energy_changes = [(-1) ** n * 0.1 for n in range(1, 21)]
+        # |dE| does not decrease.
+        self.assertGreater(predicted_num_scf_steps(energy_changes, ediff=1e-4),
+                           1e3)
+
+    def test_converged(self):
+        self.assertEqual(5.0, predicted_num_scf_steps([1.0, 0.1, 0.01, 1e-3,
+                                                       1e-5], ediff=1e-4))
+
+
+class ScfConvergencePredictionHandlerTest(ErrorHandlerTestCase):
+    def write_oszicar(self, energy_changes, num_finished_ionic_steps=0,
+                      filename="OSZICAR"):
+        with open(filename, "w") as f:
+            f.write(oszicar_header)
+            f.write(oszicar_ionic_step * num_finished_ionic_steps)
+            for i, de in enumerate(energy_changes, 1):
+                f.write(f"DAV: {i:3d}    -0.1E+02    {de:.5E}   -0.1E+00   "
+                        f"912   0.1E+00\n")
+
+    def test_check(self):
+        with open("INCAR", "w") as f:
+            f.write("NELM = 40\nEDIFF = 1e-5\n")
+        handler = ScfConvergencePredictionHandler(min_steps=20, window=10)
+
+        self.write_oszicar([(-1) ** n * 0.1 for n in range(1, 10)])
+        self.assertFalse(handler.check())
+        self.write_oszicar([(-1) ** n * 0.1 for n in range(1, 30)])
+        self.assertTrue(handler.check())
+        self.write_oszicar([0.5 ** n for n in range(1, 30)])
+        self.assertFalse(handler.check())
+
+    def test_check_relaxation(self):
+        with open("INCAR", "w") as f:
+            f.write("NELM = 40\nEDIFF = 1e-5\nNSW = 3\nIBRION = 2\n")
+        energy_changes = [(-1) ** n * 0.1 for n in range(1, 30)]
+
+        # Intermediate ionic steps are allowed to reach NELM.
+        self.write_oszicar(energy_changes, num_finished_ionic_steps=1,
+                           filename="OSZICAR_2nd")
+        handler = ScfConvergencePredictionHandler(oszicar="OSZICAR_2nd",
+                                                  min_steps=20, window=10)
+        self.assertFalse(handler.check())
+
+        self.write_oszicar(energy_changes, num_finished_ionic_steps=2,
+                           filename="OSZICAR_3rd")
+        handler = ScfConvergencePredictionHandler(oszicar="OSZICAR_3rd",
+                                                  min_steps=20, window=10)
+        self.assertTrue(handler.check())
+
+    def test_check_corrected(self):
+        with open("INCAR", "w") as f:
+            f.write("NELM = 40\nEDIFF = 1e-5\nISTART = 1\nALGO = Normal\n"
+                    "NELMDL = -6\nBMIX = 0.001\nAMIX_MAG = 0.8\n"
+                    "BMIX_MAG = 0.001\n")
+        handler = ScfConvergencePredictionHandler(min_steps=20, window=10)
+        self.write_oszicar([(-1) ** n * 0.1 for n in range(1, 30)])
+        self.assertFalse(handler.check())
+
+    def test_correct(self):
+        with open("INCAR", "w") as f:
+            f.write("ALGO = Fast\n")
+        actual = ScfConvergencePredictionHandler().correct()
+        expected = {"ALGO": "Normal"}
+        self.assertEqual(expected["ALGO"],
+                         actual["actions"][0]["action"]["_set"]["ALGO"])
+
+
+class MemoryOverflowHandlerTest(ViseTest):
+    def test(self):
+        self.assertTrue(MemoryOverflowHandler(memory_usage_limit=0.0).check())
+        self.assertFalse(MemoryOverflowHandler(memory_usage_limit=1.0).check())
+        self.assertFalse(MemoryOverflowHandler(memory_usage_limit=1.0,
+                                               per_job=False).check())
+
+
+class TooLongTimeCalcErrorHandlerTest(ErrorHandlerTestCase):
+    def test(self):
+        self.assertFalse(TooLongTimeCalcErrorHandler(timeout=100).check())
+        os.utime("INCAR", (0, os.stat("INCAR").st_mtime - 200))
+        self.assertTrue(TooLongTimeCalcErrorHandler(timeout=100).check())
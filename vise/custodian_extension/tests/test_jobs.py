@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
 import shutil
 import tempfile
 from pathlib import Path
 import os
+from unittest.mock import patch
+from uuid import uuid4
 
 from pymatgen.core.structure import Structure
+from pymatgen.io.vasp import Kpoints
 
+from vise.input_set.input_set import ViseInputSet
 from vise.util.testing import ViseTest
 from vise.custodian_extension.jobs import (
     rm_wavecar, StructureOptResult, KptConvResult, ViseVaspJob)
@@ -162,3 +168,116 @@ class ViseVaspJobTest(ViseTest):
     def test_msonable(self):
         self.assertMSONable(self.vise_vasp_job)
 
+    def test_kpt_input_sets(self):
+        mgo = self.get_structure_by_name("MgO")
+        input_sets = ViseVaspJob._kpt_input_sets(num_sets=3,
+                                                 vis_kwargs={},
+                                                 structure=mgo,
+                                                 kpt_density=2.5)
+        self.assertEqual(3, len(input_sets))
+        self.assertEqual(2.5, input_sets[0].kwargs["kpt_density"])
+        kpts = [vis.kpoints.kpts[0] for vis in input_sets]
+        for prev, kpt in zip(kpts, kpts[1:]):
+            self.assertNotEqual(prev, kpt)
+            self.assertTrue(all([i >= j for i, j in zip(kpt, prev)]))
+
+
+class KptConvergeParallelTest(ViseTest):
+    """Structure optimizations are replaced with fake_run in threads. """
+
+    def setUp(self) -> None:
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+        self.mgo = self.get_structure_by_name("MgO")
+        self.changes_sg = False
+        self.makes_existing_dir = False
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def fake_run(self, dirname, custodian_kwargs, optimization_kwargs):
+        d = Path(dirname)
+        shutil.copy(str(d / "POSCAR"), str(d / "CONTCAR.finish"))
+        structure = Structure.from_file(d / "CONTCAR.finish")
+        num_kpt = Kpoints.from_file(d / "KPOINTS").kpts[0]
+        first_round = not glob("kpt*")
+        if first_round:
+            # Not converged in the first round.
+            energy_per_atom = -5.0 - 0.01 * sum(num_kpt)
+            initial_sg = 225
+            final_sg = 221 if self.changes_sg else 225
+        else:
+            energy_per_atom = -6.0
+            initial_sg = final_sg = 221 if self.changes_sg else 225
+
+        str_opt = StructureOptResult(
+            uuid=int(uuid4()),
+            energy_per_atom=energy_per_atom,
+            num_kpt=num_kpt,
+            final_structure=structure,
+            final_sg=final_sg,
+            kpt_density=ViseInputSet.load_json(
+                d / "vise.json").kwargs["kpt_density"],
+            initial_structure=structure,
+            initial_sg=initial_sg)
+        str_opt.to_json_file(str(d / "structure_opt.json"))
+        if self.makes_existing_dir:
+            os.makedirs(str_opt.dirname, exist_ok=True)
+
+    def kpt_converge_parallel(self) -> KptConvResult:
+        path = "vise.custodian_extension.jobs"
+        with patch(f"{path}._run_structure_opt", side_effect=self.fake_run), \
+                patch(f"{path}.ProcessPoolExecutor", ThreadPoolExecutor):
+            return ViseVaspJob.kpt_converge_parallel(
+                vasp_cmd=["vasp"],
+                handlers=[],
+                structure=self.mgo,
+                initial_kpt_density=2.5,
+                num_kpt_check=2)
+
+    def test_rounds(self):
+        kpt_conv = self.kpt_converge_parallel()
+        str_opts = kpt_conv.str_opts
+        self.assertEqual(6, len(str_opts))
+        self.assertEqual([], glob("mesh*"))
+        self.assertEqual(sorted(s.dirname for s in str_opts),
+                         sorted(d.rstrip("/") for d in glob("kpt*/")))
+
+        # The second round continues from the meshes of the first one.
+        kpts = [s.num_kpt for s in str_opts]
+        for prev, kpt in zip(kpts, kpts[1:]):
+            self.assertNotEqual(prev, kpt)
+            self.assertTrue(all([i >= j for i, j in zip(kpt, prev)]))
+
+        self.assertIsNone(str_opts[0].prev_structure_opt_uuid)
+        for prev, str_opt in zip(str_opts, str_opts[1:]):
+            self.assertEqual(prev.uuid, str_opt.prev_structure_opt_uuid)
+        from_dirs = KptConvResult.from_dirs(convergence_criterion=0.003,
+                                            num_kpt_check=2,
+                                            symprec=0.01,
+                                            angle_tolerance=5)
+        self.assertEqual([s.uuid for s in str_opts],
+                         [s.uuid for s in from_dirs.str_opts])
+
+        self.assertEqual(str_opts[3].dirname,
+                         kpt_conv.converged_result.dirname)
+        self.assertTrue(Path("kpt_conv.json").is_file())
+        self.assertTrue(Path("POSCAR").is_symlink())
+
+    def test_sg_changed(self):
+        self.changes_sg = True
+        str_opts = self.kpt_converge_parallel().str_opts
+        self.assertEqual(6, len(str_opts))
+        # Reiterated from the initial k-point density.
+        self.assertEqual(str_opts[0].num_kpt, str_opts[3].num_kpt)
+        self.assertEqual(str_opts[0].kpt_density, str_opts[3].kpt_density)
+        self.assertEqual(str_opts[2].uuid, str_opts[3].prev_structure_opt_uuid)
+
+    def test_existing_dir(self):
+        self.makes_existing_dir = True
+        with self.assertRaises(FileExistsError):
+            self.kpt_converge_parallel()
+        for d in glob("kpt*/"):
+            self.assertEqual([], os.listdir(d))
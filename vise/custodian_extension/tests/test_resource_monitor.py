@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import tempfile
+import unittest
+
+from vise.util.testing import ViseTest
+from vise.custodian_extension.resource_monitor import (
+    read_meminfo, system_memory_usage, child_pids, process_tree_rss,
+    process_rss, file_age)
+
+no_proc = not os.path.exists("/proc/meminfo")
+
+
+class MeminfoTest(ViseTest):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.meminfo = os.path.join(self.tmp_dir.name, "meminfo")
+        with open(self.meminfo, "w") as f:
+            f.write("MemTotal:        1000 kB\n"
+                    "MemFree:          300 kB\n"
+                    "MemAvailable:     600 kB\n"
+                    "Buffers:          100 kB\n"
+                    "Cached:           100 kB\n"
+                    "HugePages_Total:    0\n")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_read(self):
+        actual = read_meminfo(self.meminfo)
+        self.assertEqual(1024000, actual["MemTotal"])
+        self.assertEqual(0, actual["HugePages_Total"])
+
+    def test_usage(self):
+        self.assertAlmostEqual(0.4, system_memory_usage(self.meminfo))
+
+
+@unittest.skipIf(no_proc, "/proc does not exist.")
+class ProcessTreeTest(ViseTest):
+    def test(self):
+        p = subprocess.Popen(["sleep", "10"])
+        try:
+            self.assertIn(p.pid, child_pids(os.getpid()))
+            self.assertGreater(process_tree_rss(), process_rss(os.getpid()))
+        finally:
+            p.kill()
+            p.wait()
+
+
+class FileAgeTest(ViseTest):
+    def test(self):
+        with tempfile.NamedTemporaryFile() as f:
+            os.utime(f.name, (0, os.stat(f.name).st_mtime - 100))
+            self.assertAlmostEqual(100, file_age(f.name), delta=10)
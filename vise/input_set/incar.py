@@ -7,7 +7,6 @@ from copy import deepcopy
 from pathlib import Path
 
 from monty.io import zopen
-from monty.serialization import loadfn
 
 from pymatgen.electronic_structure.core import Magmom
 from pymatgen.io.vasp import Incar
@@ -15,11 +14,13 @@ from pymatgen.util.io_utils import clean_lines
 
 from tabulate import tabulate
 
+from vise.input_set.settings_util import load_dataset
+
 
 MODULE_DIR = Path(os.path.dirname(os.path.abspath(__file__)))
 # This incar_flags should be OrderedDict, but from python 3.6, dict uses
 # order-preserving semantics. Furthermore, it does not affect vasp result.
-incar_flags = loadfn(MODULE_DIR / "datasets" / "incar_flags.yaml")
+incar_flags = load_dataset("incar_flags.yaml")
 
 
 class ViseIncar(Incar):
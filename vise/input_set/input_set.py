@@ -4,9 +4,10 @@ import json
 import os
 import re
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from pathlib import Path
-from typing import Optional, Union
+from typing import Optional, Union, List, Dict
 
 
 import numpy as np
@@ -28,7 +29,7 @@ from vise.input_set.incar import ViseIncar
 from vise.input_set.settings_incar import (
     TaskIncarSettings, XcIncarSettings, XcTaskIncarSettings,
     CommonIncarSettings)
-from vise.input_set.settings_potcar import XcTaskPotcar
+from vise.input_set.settings_potcar import XcTaskPotcar, potcar_pool
 from vise.input_set.settings_structure_kpoints import TaskStructureKpoints
 from vise.input_set.task import Task
 from vise.input_set.xc import Xc
@@ -383,6 +384,62 @@ class ViseInputSet(VaspInputSet):
                    files_to_transfer=abs_files_to_transfer,
                    **opts)
 
+    @classmethod
+    def make_inputs(cls,
+                    structures: List[Structure],
+                    output_dirs: List[str],
+                    num_processes: int = 1,
+                    individual_kwargs: Optional[List[dict]] = None,
+                    **kwargs) -> Dict[str, str]:
+        """Construct and write ViseInputSets for many structures at once.
+
+        Each structure is processed with the same pipeline as make_input
+        followed by write_input, so the written files are identical to those
+        generated one by one. Since the working directory is never changed,
+        the structures can be distributed over a process pool.
+
+        Args:
+            structures (List[Structure]):
+                Structures to create inputs for.
+            output_dirs (List[str]):
+                Directories where the input files are written. The length
+                must be the same as that of structures.
+            num_processes (int):
+                Number of worker processes. When 1, inputs are generated
+                serially in the current process.
+            individual_kwargs (List[dict]):
+                Keyword arguments for each structure that override kwargs,
+                e.g., task and user_incar_settings modified by prior_info.
+            kwargs (dict):
+                Common arguments passed to make_input.
+
+        Return:
+            Dict of failed output directories as keys and error messages as
+            values. Empty when all the input sets are successfully written.
+        """
+        if len(structures) != len(output_dirs):
+            raise ValueError("The numbers of structures and output_dirs "
+                             "are different.")
+
+        individual_kwargs = individual_kwargs or [{}] * len(structures)
+        tasks = [(s, str(d), {**kwargs, **ind_kwargs})
+                 for s, d, ind_kwargs
+                 in zip(structures, output_dirs, individual_kwargs)]
+
+        if num_processes > 1:
+            with ProcessPoolExecutor(max_workers=num_processes) as executor:
+                errors = list(executor.map(_write_input_set, *zip(*tasks)))
+        else:
+            errors = [_write_input_set(*t) for t in tasks]
+
+        failures = {}
+        for (_, d, _), error in zip(tasks, errors):
+            if error:
+                logger.error(f"Constructing vasp set in {d} failed: {error}")
+                failures[d] = error
+
+        return failures
+
     @property
     def potcar(self):
         return self._potcar
@@ -442,7 +499,7 @@ class ViseInputSet(VaspInputSet):
                 logger.warning(f"{key} does not exist.")
 
         if to_json_file:
-            self.to_json_file(json_filename)
+            self.to_json_file(str(Path(output_dir) / json_filename))
 
     @pmg_serialize
     def as_dict(self, **kwargs):
@@ -495,7 +552,8 @@ class ViseInputSet(VaspInputSet):
                    xc=Xc.from_string(d["xc"]),
                    task=Task.from_string(d["task"]),
                    kpoints=d["kpoints"],
-                   potcar=Potcar.from_dict(d["potcar"]),
+                   potcar=potcar_pool.potcar(d["potcar"]["symbols"],
+                                             d["potcar"]["functional"]),
                    version=d["version"],
                    incar_settings=d["incar_settings"],
                    files_to_transfer=d["files_to_transfer"],
@@ -636,3 +694,17 @@ class ViseInputSet(VaspInputSet):
                               **kwargs)
 
 
+def _write_input_set(structure: Structure,
+                     output_dir: str,
+                     kwargs: dict) -> Optional[str]:
+    """Make and write a ViseInputSet, and return an error message if failed.
+
+    Defined at the module level so that it can be pickled for process pools.
+    """
+    try:
+        logger.info(f"Constructing vasp set in {output_dir}")
+        input_set = ViseInputSet.make_input(structure=structure, **kwargs)
+        input_set.write_input(output_dir)
+    except Exception as e:
+        return f"{e.__class__.__name__}: {e}"
+    return None
@@ -1,15 +1,15 @@
 # -*- coding: utf-8 -*-
 
 from enum import Enum, unique
-from math import ceil, modf, pow
-from typing import List
+from math import ceil, floor, modf, pow
+from typing import List, NamedTuple, Optional, Sequence
 
 import numpy as np
+import spglib
 from pymatgen import Structure
 from pymatgen.core.periodic_table import Element
 from pymatgen.io.vasp.inputs import Kpoints
-from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
-from vise.config import BAND_REF_DIST, KPT_DENSITY
+from vise.config import BAND_REF_DIST, KPT_DENSITY, KPT_FACTOR
 from vise.config import SYMMETRY_TOLERANCE, ANGLE_TOL
 from vise.input_set.datasets.kpt_centering import kpt_centering
 from vise.util.logger import get_logger
@@ -233,38 +233,46 @@ class MakeKpoints:
             self.kpt_mesh = self.manual_kpts
 
         else:
-            reciprocal_lat = \
-                self.corresponding_structure.lattice.reciprocal_lattice
-            reciprocal_abc = reciprocal_lat.abc
-            if self.mode in (KpointsMode.band, KpointsMode.primitive_uniform):
-
-                body_centered_ortho = {23, 24, 44, 45, 46, 71, 72, 73, 74}
-                body_centered_tetra = {79, 80, 81, 82, 87, 88, 97, 98, 107, 108,
-                                       109, 110, 119, 120, 121, 122, 139, 140,
-                                       141, 142}
-                if self.sg in body_centered_ortho | body_centered_tetra:
-                    logger.warning("To keep the space group symmetry, the "
-                                   "number of k-points along three directions "
-                                   "are kept the same for oI and tI Bravais "
-                                   "lattice.")
-                    average_abc = pow(np.prod(reciprocal_lat.abc), 1 / 3)
-                    reciprocal_abc = (average_abc, average_abc, average_abc)
-
-            if self.only_even:
-                self.kpt_mesh = [int(ceil(self.kpt_density * r / 2) * 2)
-                                 for r in reciprocal_abc]
-            else:
-                self.kpt_mesh = [int(ceil(self.kpt_density * r))
-                                 for r in reciprocal_abc]
-
-            self.kpt_mesh = [i * self.factor for i in self.kpt_mesh]
+            self.kpt_mesh = kpt_mesh_from_density(
+                reciprocal_abc=self.reciprocal_abc,
+                kpt_density=self.kpt_density,
+                only_even=self.only_even,
+                factor=self.factor)
 
             self.comment += f"Mode: {self.mode}, " \
                             f"kpt density: {self.kpt_density}, " \
                             f"factor: {self.factor}. "
 
+    @property
+    def reciprocal_abc(self) -> tuple:
+        """Reciprocal lattice constants used for determining the k-mesh.
+
+        For oI and tI Bravais lattices, their geometric average is used for
+        three directions to keep the space group symmetry.
+        """
+        reciprocal_lat = self.corresponding_structure.lattice.reciprocal_lattice
+        reciprocal_abc = reciprocal_lat.abc
+        if self.mode in (KpointsMode.band, KpointsMode.primitive_uniform):
+
+            body_centered_ortho = {23, 24, 44, 45, 46, 71, 72, 73, 74}
+            body_centered_tetra = {79, 80, 81, 82, 87, 88, 97, 98, 107, 108,
+                                   109, 110, 119, 120, 121, 122, 139, 140,
+                                   141, 142}
+            if self.sg in body_centered_ortho | body_centered_tetra:
+                logger.warning("To keep the space group symmetry, the "
+                               "number of k-points along three directions "
+                               "are kept the same for oI and tI Bravais "
+                               "lattice.")
+                average_abc = pow(np.prod(reciprocal_lat.abc), 1 / 3)
+                reciprocal_abc = (average_abc, average_abc, average_abc)
+
+        return reciprocal_abc
+
     def _set_centering(self):
-        self.kpt_shift = []
+        self.kpt_shift = self._centering(self.kpt_mesh)
+
+    def _centering(self, kpt_mesh: List[int]) -> List[float]:
+        kpt_shift = []
         if self.mode is KpointsMode.manual_set:
             angle = self.corresponding_structure.lattice.angles
 
@@ -272,16 +280,18 @@ class MakeKpoints:
                 # shift kpt mesh center only for the lattice vector being normal
                 # to a lattice plane and even number of k-points.
                 if max([abs(angle[i - 2] - 90), abs(angle[i - 1] - 90)]) < 1e-5:
-                    self.kpt_shift.append(0.5)
+                    kpt_shift.append(0.5)
                 else:
-                    self.kpt_shift.append(0.0)
+                    kpt_shift.append(0.0)
         else:
-            self.kpt_shift = kpt_centering[self.sg]
+            kpt_shift = list(kpt_centering[self.sg])
 
         # If number of k-point is odd, off centering has no meaning.
         for i in range(3):
-            if self.kpt_mesh[i] % 2 == 1:
-                self.kpt_shift[i] = 0.0
+            if kpt_mesh[i] % 2 == 1:
+                kpt_shift[i] = 0.0
+
+        return kpt_shift
 
     def _add_band_kpts(self):
         k_path = self.seekpath_info["explicit_kpoints_rel"]
@@ -321,6 +331,32 @@ def irreducible_kpoints(structure: Structure,
         List of irreducible kpoints and their weights tuples
         [(ir_kpoint, weight)], with ir_kpoint given in fractional coordinates.
     """
+    shift = spglib_shift(kpoints)
+
+    # Symmetry operations are taken from the cached symmetry dataset.
+    rotations = get_symmetry_dataset(structure=structure,
+                                     symprec=symprec,
+                                     angle_tolerance=angle_tolerance
+                                     )["rotations"]
+    mesh = np.array(kpoints.kpts[0], dtype=int)
+    shift = np.array(shift, dtype=int)
+    mapping, grid = spglib.get_stabilized_reciprocal_mesh(
+        mesh=mesh, rotations=rotations, is_shift=shift, is_time_reversal=True)
+
+    return [((grid[i] + shift * 0.5) / mesh, count)
+            for i, count in zip(*np.unique(mapping, return_counts=True))]
+
+
+def spglib_shift(kpoints: Kpoints) -> List[int]:
+    """Half grid shift in spglib convention from Gamma or Monkhorst Kpoints.
+
+    Args:
+        kpoints (Kpoints):
+            Kpoints file. Supported modes are only Gamma and Monkhorst.
+
+    Returns:
+        List of 0 or 1 along three directions, where 1 means half shift.
+    """
     if kpoints.style == Kpoints.supported_modes.Monkhorst:
         kpts_shift = [0.5, 0.5, 0.5]
     elif kpoints.style == Kpoints.supported_modes.Gamma:
@@ -330,13 +366,106 @@ def irreducible_kpoints(structure: Structure,
 
     kpts_shift = [kpts_shift[x] + kpoints.kpts_shift[x] for x in range(3)]
     # modf(x) returns (fraction part, integer part)
-    shift = [1 if modf(i)[0] == 0.5 else 0 for i in kpts_shift]
+    return [1 if modf(i)[0] == 0.5 else 0 for i in kpts_shift]
+
+
+def num_irreducible_kpoints_batch(structure: Structure,
+                                  meshes: Sequence[Sequence[int]],
+                                  is_shift: Sequence = (0, 0, 0),
+                                  symprec: float = SYMMETRY_TOLERANCE,
+                                  angle_tolerance: float = ANGLE_TOL,
+                                  time_reversal: bool = True) -> np.ndarray:
+    """Count irreducible k-points for many candidate meshes at once.
 
-    sga = SpacegroupAnalyzer(structure=structure,
-                             symprec=symprec,
-                             angle_tolerance=angle_tolerance)
+    The symmetry search is performed only once and the orbits of the grid
+    points are counted with numpy for each mesh, which gives the same numbers
+    as spglib.get_ir_reciprocal_mesh.
 
-    return sga.get_ir_reciprocal_mesh(mesh=kpoints.kpts[0], is_shift=shift)
+    Args:
+        structure (Structure):
+            Input structure corresponding to meshes.
+        meshes (Sequence):
+            Numbers of k-points along three directions for each mesh,
+            e.g., [[2, 2, 2], [4, 4, 4]].
+        is_shift (Sequence):
+            Half grid shift in spglib convention (see spglib_shift). Either a
+            single triplet common to all meshes or one triplet per mesh.
+        symprec (float):
+        angle_tolerance (float):
+            See docstrings in spglib.
+        time_reversal (bool):
+            Whether the time reversal symmetry is considered.
+
+    Returns:
+        np.ndarray of numbers of irreducible k-points for each mesh.
+    """
+    meshes = np.array(meshes, dtype=np.int64).reshape(-1, 3)
+    shifts = np.broadcast_to(np.array(is_shift, dtype=np.int64) % 2,
+                             meshes.shape)
+
+    rotations = get_symmetry_dataset(structure=structure,
+                                     symprec=symprec,
+                                     angle_tolerance=angle_tolerance
+                                     )["rotations"]
+    rot_reciprocal = reciprocal_point_group(rotations, time_reversal)
+
+    return np.array([_num_grid_orbits(rot_reciprocal, mesh, shift)
+                     for mesh, shift in zip(meshes, shifts)])
+
+
+def reciprocal_point_group(rotations: np.ndarray,
+                           time_reversal: bool = True) -> np.ndarray:
+    """Point group operations acting on the fractional reciprocal coords.
+
+    Args:
+        rotations (np.ndarray):
+            Rotation matrices of space group operations in the spglib dataset.
+        time_reversal (bool):
+            Whether to add the inversion due to the time reversal symmetry.
+
+    Returns:
+        np.ndarray of unique integer matrices with (n, 3, 3) shape.
+    """
+    rots = np.array(rotations, dtype=np.int64).transpose(0, 2, 1)
+    if time_reversal:
+        rots = np.concatenate([rots, -rots])
+    return np.unique(rots, axis=0)
+
+
+def _num_grid_orbits(rot_reciprocal: np.ndarray,
+                     mesh: np.ndarray,
+                     is_shift: np.ndarray,
+                     chunk_size: int = 8192) -> int:
+    """Count the orbits of the k-point grid under the given point group.
+
+    Grid points are expressed as integer numerators with the common
+    denominator 2 * n1 * n2 * n3 so that the rotated points can be checked
+    whether they are on the grid with integer arithmetic. Each grid point is
+    labelled with the smallest grid index in its orbit, and the number of
+    distinct labels is the number of irreducible k-points.
+    """
+    num_grid = int(np.prod(mesh))
+    # Multiplier of the double grid address to the common denominator.
+    multiplier = num_grid // mesh
+    strides = np.array([mesh[1] * mesh[2], mesh[2], 1])
+    labels = np.empty(num_grid, dtype=np.int64)
+
+    for start in range(0, num_grid, chunk_size):
+        grid_index = np.arange(start, min(start + chunk_size, num_grid))
+        address = (grid_index[:, None] // strides) % mesh
+        numerators = (2 * address + is_shift) * multiplier
+        rotated = np.einsum("rij,nj->nri", rot_reciprocal, numerators)
+
+        double_address = rotated // multiplier
+        on_grid = np.all(rotated % multiplier == 0, axis=2)
+        on_grid &= np.all((double_address - is_shift) % 2 == 0, axis=2)
+
+        rotated_address = ((double_address - is_shift) // 2) % mesh
+        rotated_index = rotated_address @ strides
+        labels[grid_index] = \
+            np.where(on_grid, rotated_index, num_grid).min(axis=1)
+
+    return len(np.unique(labels))
 
 
 def num_irreducible_kpoints(kpoints: Kpoints,
@@ -361,8 +490,199 @@ def num_irreducible_kpoints(kpoints: Kpoints,
     if kpoints.style == Kpoints.supported_modes.Reciprocal:
         return len(kpoints.kpts)
     else:
-        return len(irreducible_kpoints(structure=structure,
-                                       kpoints=kpoints,
-                                       symprec=symprec,
-                                       angle_tolerance=angle_tolerance))
+        return int(num_irreducible_kpoints_batch(
+            structure=structure,
+            meshes=[kpoints.kpts[0]],
+            is_shift=spglib_shift(kpoints),
+            symprec=symprec,
+            angle_tolerance=angle_tolerance)[0])
+
+
+def kpt_mesh_from_density(reciprocal_abc: Sequence[float],
+                          kpt_density: float,
+                          only_even: bool = False,
+                          factor: int = 1) -> List[int]:
+    """Numbers of k-points along three directions at the given density.
+
+    Args:
+        reciprocal_abc (Sequence):
+            Reciprocal lattice constants including 2 * pi.
+        kpt_density (float):
+        only_even (bool):
+        factor (int):
+            See docstrings of MakeKpoints.
+
+    Returns:
+        List of the numbers of k-points.
+    """
+    if only_even:
+        kpt_mesh = [int(ceil(kpt_density * r / 2) * 2) for r in reciprocal_abc]
+    else:
+        kpt_mesh = [int(ceil(kpt_density * r)) for r in reciprocal_abc]
+
+    return [i * factor for i in kpt_mesh]
+
+
+class KptMeshPlan(NamedTuple):
+    """K-point mesh in a sweep of the k-point density.
+
+    The mesh is generated for lower_density < kpt_density <= upper_density,
+    and kpt_density is the minimal (rounded up) density generating it.
+    """
+    mesh: List[int]
+    kpt_shift: List[float]
+    num_kpts: Optional[int]
+    kpt_density: float
+    lower_density: float
+    upper_density: float
+
+
+def plan_kpt_meshes(structure: Structure,
+                    min_density: float,
+                    max_density: float,
+                    mode: str = "primitive_uniform",
+                    only_even: bool = False,
+                    kpt_shift: list = None,
+                    factor: int = 1,
+                    symprec: float = SYMMETRY_TOLERANCE,
+                    angle_tolerance: float = ANGLE_TOL,
+                    counts_kpts: bool = True) -> List[KptMeshPlan]:
+    """All the distinct k-point meshes between min_density and max_density.
+
+    The number of k-points along the i-th direction is incremented just above
+    the density of j * step / b_i, where j is an integer, b_i is the
+    reciprocal lattice constant, and step is 2 (1) when only_even is True
+    (False). Therefore, the distinct meshes are determined from these
+    thresholds without generating the k-points at trial densities.
+
+    Args:
+        structure (Structure):
+            Input structure.
+        min_density (float):
+            Minimum k-point density. The mesh at this density is the first one.
+        max_density (float):
+            Maximum k-point density.
+        counts_kpts (bool):
+            Whether to count the irreducible k-points for each mesh.
+        mode (str):
+        only_even (bool):
+        kpt_shift (list):
+        factor (int):
+        symprec (float):
+        angle_tolerance (float):
+            See docstrings of MakeKpoints.
+
+    Returns:
+        List of KptMeshPlan with monotonically increasing meshes.
+    """
+    if not 0 < min_density <= max_density:
+        raise ValueError(f"Density range [{min_density}, {max_density}] is "
+                         f"invalid.")
+
+    kpoints = MakeKpoints(mode=mode,
+                          structure=structure,
+                          kpt_density=min_density,
+                          only_even=only_even,
+                          kpt_shift=kpt_shift,
+                          factor=factor,
+                          symprec=symprec,
+                          angle_tolerance=angle_tolerance)
+    if kpoints.mode is KpointsMode.band:
+        raise ValueError("Density sweep is not supported for the band mode.")
+    kpoints._set_structure()
+    reciprocal_abc = np.array(kpoints.reciprocal_abc)
+    step = 2 if only_even else 1
+
+    thresholds = []
+    for r in reciprocal_abc:
+        j = np.arange(ceil(min_density * r / step),
+                      ceil(max_density * r / step))
+        thresholds.extend(j * step / r)
+    thresholds = np.unique(thresholds)
+
+    meshes = [kpt_mesh_from_density(reciprocal_abc, min_density,
+                                    only_even, factor)]
+    # Meshes just above the thresholds.
+    for t in thresholds[(thresholds >= min_density)
+                        & (thresholds < max_density)]:
+        mesh = kpt_mesh_from_density(reciprocal_abc, t * (1 + 1e-9),
+                                     only_even, factor)
+        if mesh != meshes[-1]:
+            meshes.append(mesh)
+
+    kpt_shifts = [kpt_shift or kpoints._centering(mesh) for mesh in meshes]
+    if counts_kpts:
+        is_shift = [spglib_shift(Kpoints(kpts=(mesh,), kpts_shift=shift))
+                    for mesh, shift in zip(meshes, kpt_shifts)]
+        num_kpts = num_irreducible_kpoints_batch(
+            structure=kpoints.corresponding_structure,
+            meshes=meshes,
+            is_shift=is_shift,
+            symprec=symprec,
+            angle_tolerance=angle_tolerance).tolist()
+    else:
+        num_kpts = [None] * len(meshes)
+
+    result = []
+    for i, (mesh, shift, num) in enumerate(zip(meshes, kpt_shifts, num_kpts)):
+        n = np.array(mesh) / factor
+        lower = float(np.max((n - step) / reciprocal_abc))
+        upper = float(np.min(n / reciprocal_abc))
+        if i == 0:
+            density = min_density
+        else:
+            density = (floor(lower * 1e5) + 1) / 1e5
+            if density > upper:
+                density = (lower + upper) / 2
+        result.append(KptMeshPlan(mesh=mesh,
+                                  kpt_shift=shift,
+                                  num_kpts=num,
+                                  kpt_density=density,
+                                  lower_density=lower,
+                                  upper_density=upper))
 
+    return result
+
+
+def next_kpt_density(structure: Structure,
+                     kpt_density: float,
+                     kpt_mesh: Optional[List[int]] = None,
+                     multiplier: float = KPT_FACTOR,
+                     **kwargs) -> float:
+    """Smallest kpt_density * multiplier ** n (n >= 1) increasing the mesh.
+
+    The new mesh must be different from kpt_mesh and equal or larger along all
+    the directions, which is the condition used for the k-point convergence.
+
+    Args:
+        structure (Structure):
+            Input structure.
+        kpt_density (float):
+            Current k-point density.
+        kpt_mesh (list):
+            Current k-point mesh. If None, the mesh at kpt_density is used.
+        multiplier (float):
+            Multiplier of the k-point density at each trial.
+        kwargs:
+            Arguments passed to plan_kpt_meshes.
+
+    Returns:
+        Float of the k-point density.
+    """
+    if multiplier <= 1:
+        raise ValueError(f"Multiplier {multiplier} must be larger than 1.")
+
+    max_density = kpt_density * multiplier
+    while True:
+        plans = plan_kpt_meshes(structure, kpt_density, max_density,
+                                counts_kpts=False, **kwargs)
+        kpt_mesh = kpt_mesh or plans[0].mesh
+        for plan in plans:
+            if (plan.mesh != list(kpt_mesh)
+                    and all([i >= j for i, j in zip(plan.mesh, kpt_mesh)])):
+                # Same float operations as multiplying the density one by one.
+                new_density = kpt_density * multiplier
+                while new_density <= plan.lower_density:
+                    new_density *= multiplier
+                return new_density
+        max_density *= multiplier
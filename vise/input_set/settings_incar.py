@@ -4,14 +4,13 @@ from math import ceil
 from pathlib import Path
 from typing import Optional
 
-from monty.serialization import loadfn
-
 from pymatgen import Structure, Composition, Element
 from pymatgen.io.vasp import Potcar
 
 from vise.config import BAND_GAP_CRITERION
 from vise.input_set.settings_util import (
-    load_default_incar_settings, check_keys, nelect, nbands, calc_npar_kpar)
+    load_dataset, load_default_incar_settings, check_keys, nelect, nbands,
+    calc_npar_kpar)
 from vise.input_set.task import (
     LATTICE_RELAX_TASK, PLOT_TASK, SPECTRA_TASK, Task)
 from vise.input_set.xc import Xc, LDA_OR_GGA, HYBRID_FUNCTIONAL
@@ -42,7 +41,7 @@ COMMON_REQUIRED_FLAGS = {"NELM", "LASPH", "LORBIT", "LCHARG", "SIGMA"}
 COMMON_OPTIONAL_FLAGS = {"NELECT"}
 COMMON_FLAGS = COMMON_REQUIRED_FLAGS | COMMON_OPTIONAL_FLAGS
 
-ALL_FLAGS = set(sum(loadfn(SET_DIR / "incar_flags.yaml").values(), []))
+ALL_FLAGS = set(sum(load_dataset("incar_flags.yaml").values(), []))
 
 OTHER_FLAGS = ALL_FLAGS - (TASK_FLAGS | XC_FLAGS | XC_TASK_FLAGS | COMMON_FLAGS)
 
@@ -187,7 +186,7 @@ class XcIncarSettings:
             settings["METAGGA"] = "SCAN"
 
         if hubbard_u:
-            u_set = loadfn(SET_DIR / "u_parameter_set.yaml")
+            u_set = load_dataset("u_parameter_set.yaml")
             ldauu_set = u_set["LDAUU"][ldaul_set_name]
             ldauu_set.update(ldauu)
             ldauu = [ldauu_set.get(el, 0) for el in symbol_list]
@@ -1,11 +1,62 @@
 # -*- coding: utf-8 -*-
 
-from pymatgen.io.vasp import Potcar
+from typing import List, Tuple
+
+from pymatgen import SETTINGS
+from pymatgen.io.vasp import Potcar, PotcarSingle
 
 from vise.input_set.settings_util import load_potcar_yaml
 from vise.input_set.xc import Xc
 
 
+class PotcarPool:
+    """Process-wide pool of PotcarSingle objects and their ENMAX.
+
+    Potcar reads and parses the POTCAR file of each symbol every time it is
+    constructed, which is slow for large d- and f-element POTCARs and on
+    network file systems. Thus, PotcarSingle objects are stored with a key of
+    (functional, symbol) together with the POTCAR directory, and shared among
+    the Potcar objects. They are not modified by vise.
+    """
+
+    def __init__(self):
+        self._singles = {}
+        self._enmax = {}
+
+    @staticmethod
+    def key(symbol: str, functional: str) -> Tuple[str, str, str]:
+        return functional, symbol, SETTINGS.get("PMG_VASP_PSP_DIR")
+
+    def single(self, symbol: str, functional: str) -> PotcarSingle:
+        key = self.key(symbol, functional)
+        if key not in self._singles:
+            single = PotcarSingle.from_symbol_and_functional(symbol,
+                                                             functional)
+            self._singles[key] = single
+            self._enmax[key] = single.enmax
+        return self._singles[key]
+
+    def enmax(self, symbol: str, functional: str) -> float:
+        self.single(symbol, functional)
+        return self._enmax[self.key(symbol, functional)]
+
+    def potcar(self, symbols: List[str], functional: str) -> Potcar:
+        """Potcar object composed of the pooled PotcarSingle objects. """
+        potcar = Potcar(functional=functional)
+        potcar.extend([self.single(s, functional) for s in symbols])
+        return potcar
+
+    def clear(self) -> None:
+        self._singles.clear()
+        self._enmax.clear()
+
+    def __len__(self):
+        return len(self._singles)
+
+
+potcar_pool = PotcarPool()
+
+
 class XcTaskPotcar:
 
     def __init__(self,
@@ -35,8 +86,9 @@ class XcTaskPotcar:
 
         potcar_list = load_potcar_yaml(potcar_set_name, override_potcar_set)
         potcar_symbols = [potcar_list.get(el, el) for el in symbol_list]
-        potcar = Potcar(potcar_symbols, functional=potcar_functional)
+        potcar = potcar_pool.potcar(potcar_symbols, potcar_functional)
 
-        max_enmax = max([p.enmax for p in potcar])
+        max_enmax = max([potcar_pool.enmax(s, potcar_functional)
+                         for s in potcar_symbols])
 
         return cls(potcar, max_enmax)
@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
+from copy import deepcopy
+import hashlib
 from math import ceil
+import os
 from pathlib import Path
-from typing import Optional
+import pickle
+import tempfile
+from typing import Any, Optional, Union
 from typing import Tuple
 
 from monty.serialization import loadfn
 from pymatgen import Composition
 from pymatgen.io.vasp import Potcar
+from vise.config import DATASET_CACHE_DIR
 from vise.input_set.datasets.element_parameters import unoccupied_bands
 from vise.util.logger import get_logger
 
@@ -14,6 +20,85 @@ logger = get_logger(__name__)
 SET_DIR = Path(__file__).parent / "datasets"
 
 
+class DatasetCache:
+    """Process-wide cache of the parsed yaml files such as task_incar_set.yaml.
+
+    The yaml files are parsed every time an input set is constructed, which
+    takes a measurable time with the pure-python yaml loader in batch runs.
+    Thus, the parsed data are stored with the modification time and size of
+    the file, and parsed again only when they change. When pickle_dir is set,
+    the parsed data are also pickled there and shared among processes.
+
+    A deep copy is returned on every load as the callers update the dicts.
+    """
+
+    def __init__(self, pickle_dir: Optional[str] = DATASET_CACHE_DIR):
+        self.pickle_dir = Path(pickle_dir) if pickle_dir else None
+        self._entries = {}
+
+    def load(self, filename: Union[str, Path]) -> Any:
+        path = Path(filename).absolute()
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._entries.get(path)
+        if entry is None or entry[0] != stamp:
+            data = self._load_pickle(path, stamp)
+            if data is None:
+                data = loadfn(path)
+                self._save_pickle(path, stamp, data)
+            entry = self._entries[path] = (stamp, data)
+
+        return deepcopy(entry[1])
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _pickle_name(self, path: Path) -> Path:
+        key = hashlib.sha1(str(path).encode()).hexdigest()
+        return self.pickle_dir / f"{path.stem}_{key}.pkl"
+
+    def _load_pickle(self, path: Path, stamp: tuple) -> Optional[Any]:
+        if self.pickle_dir is None:
+            return None
+        try:
+            with open(self._pickle_name(path), "rb") as f:
+                pickled_stamp, data = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            logger.warning(f"Dataset cache of {path} is broken and ignored.")
+            return None
+        return data if pickled_stamp == stamp else None
+
+    def _save_pickle(self, path: Path, stamp: tuple, data: Any) -> None:
+        if self.pickle_dir is None:
+            return
+        self.pickle_dir.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that concurrent processes never
+        # read a partially written file.
+        fd, tmp_name = tempfile.mkstemp(dir=self.pickle_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((stamp, data), f)
+        os.replace(tmp_name, self._pickle_name(path))
+
+
+dataset_cache = DatasetCache()
+
+
+def load_dataset(filename: str) -> Any:
+    """Load a yaml file in vise/input_set/datasets via dataset_cache.
+
+    Args:
+        filename (str):
+            File name such as "potcar_set.yaml".
+
+    Returns:
+        Parsed data.
+    """
+    return dataset_cache.load(SET_DIR / filename)
+
+
 def load_potcar_yaml(set_name: Optional[str] = "normal",
                      override_potcar_set: Optional[dict] = None) -> dict:
     """Load the yaml setting files for config and POTCAR list.
@@ -27,7 +112,7 @@ def load_potcar_yaml(set_name: Optional[str] = "normal",
     Returns:
           Dictionary of potcar_set, like {"Zr": "Zr_pv", ...}
     """
-    potcar_set = loadfn(SET_DIR / "potcar_set.yaml")
+    potcar_set = load_dataset("potcar_set.yaml")
     try:
         potcar = potcar_set[set_name]
     except KeyError:
@@ -61,7 +146,7 @@ def load_default_incar_settings(yaml_filename: str,
     Returns:
           settings (dict):
     """
-    incar_set = loadfn(SET_DIR / yaml_filename)
+    incar_set = load_dataset(yaml_filename)
     settings = {}
     for f in required_flags:
         settings[f] = incar_set[f][key_name]
@@ -26,6 +26,31 @@ class InputSetTest(ViseTest):
             os.remove("vise.json")
             Path.cwd()  # may be safer to go back to cwd
 
+    def test_make_inputs(self):
+        mgo = self.get_structure_by_name("MgO")
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            dirs = [Path(tmp_dirname) / "a", Path(tmp_dirname) / "b"]
+            failures = ViseInputSet.make_inputs(
+                structures=[mgo, mgo],
+                output_dirs=dirs,
+                individual_kwargs=[{}, {"kpt_density": 3.0}],
+                xc=Xc.hse)
+            self.assertEqual({}, failures)
+            for d in dirs:
+                for f in ["INCAR", "POSCAR", "POTCAR", "KPOINTS", "vise.json"]:
+                    self.assertTrue((d / f).is_file())
+            actual = ViseInputSet.load_json(dirs[0] / "vise.json")
+            self.assertEqual(self.input_set.as_dict(), actual.as_dict())
+
+    def test_make_inputs_failure(self):
+        mgo = self.get_structure_by_name("MgO")
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            d = str(Path(tmp_dirname) / "a")
+            failures = ViseInputSet.make_inputs(structures=[mgo],
+                                                output_dirs=[d],
+                                                task="no_task")
+            self.assertEqual([d], list(failures))
+
     def test_dict(self):
         expected = self.input_set.as_dict()
         actual = ViseInputSet.from_dict(expected).as_dict()
@@ -7,7 +7,9 @@ from pymatgen.core.structure import Structure
 from pymatgen.core.lattice import Lattice
 
 from vise.input_set.make_kpoints import (
-    KpointsMode, MakeKpoints, irreducible_kpoints, num_irreducible_kpoints)
+    KpointsMode, MakeKpoints, irreducible_kpoints, num_irreducible_kpoints,
+    num_irreducible_kpoints_batch, spglib_shift, plan_kpt_meshes,
+    next_kpt_density)
 from vise.util.testing import ViseTest
 
 __author__ = "Yu Kumagai"
@@ -137,3 +139,76 @@ class IrreducibleKpointsTest(ViseTest):
                                                     kpoints=self.kpoints_g))
         self.assertEqual(1, num_irreducible_kpoints(structure=self.ortho,
                                                     kpoints=self.kpoints_mp))
+
+    def test_spglib_shift(self):
+        self.assertEqual([0, 0, 0], spglib_shift(self.kpoints_g))
+        self.assertEqual([1, 1, 1], spglib_shift(self.kpoints_mp))
+
+    def test_num_kpts_batch(self):
+        meshes = [[2, 2, 2], [3, 3, 2], [4, 4, 4], [5, 3, 2]]
+        actual = num_irreducible_kpoints_batch(structure=self.hexagonal,
+                                               meshes=meshes)
+        expected = [len(irreducible_kpoints(
+            structure=self.hexagonal,
+            kpoints=Kpoints.gamma_automatic(kpts=m))) for m in meshes]
+        self.assertEqual(expected, actual.tolist())
+
+        actual = num_irreducible_kpoints_batch(structure=self.ortho,
+                                               meshes=[[2, 2, 2]],
+                                               is_shift=[1, 1, 1])
+        self.assertEqual([1], actual.tolist())
+
+
+class PlanKptMeshesTest(ViseTest):
+
+    def setUp(self) -> None:
+        self.sg1 = self.get_structure_by_sg(1)
+
+    def test_plan(self):
+        plans = plan_kpt_meshes(structure=self.sg1,
+                                min_density=2.0,
+                                max_density=6.0)
+        self.assertEqual(2.0, plans[0].kpt_density)
+        for prev, plan in zip(plans, plans[1:]):
+            self.assertNotEqual(prev.mesh, plan.mesh)
+            self.assertTrue(all([i >= j for i, j in zip(plan.mesh, prev.mesh)]))
+            self.assertAlmostEqual(prev.upper_density, plan.lower_density)
+
+        for plan in plans:
+            k = MakeKpoints(mode="primitive_uniform",
+                            structure=self.sg1,
+                            kpt_density=plan.kpt_density)
+            k.make_kpoints()
+            self.assertEqual(plan.mesh, k.kpt_mesh)
+            self.assertEqual(plan.kpt_shift, k.kpt_shift)
+            self.assertEqual(plan.num_kpts, k.num_kpts)
+
+    def test_plan_only_even(self):
+        plans = plan_kpt_meshes(structure=self.sg1,
+                                min_density=2.0,
+                                max_density=6.0,
+                                only_even=True,
+                                factor=2,
+                                counts_kpts=False)
+        for plan in plans:
+            self.assertTrue(all([i % 4 == 0 for i in plan.mesh]))
+            self.assertIsNone(plan.num_kpts)
+
+    def test_next_kpt_density(self):
+        kpt_density = 2.5
+        mesh = plan_kpt_meshes(self.sg1, kpt_density, kpt_density)[0].mesh
+        expected = kpt_density
+        while True:
+            expected *= 1.2
+            k = MakeKpoints(mode="primitive_uniform",
+                            structure=self.sg1,
+                            kpt_density=expected)
+            k.make_kpoints()
+            if k.kpt_mesh != mesh:
+                break
+        self.assertEqual(expected,
+                         next_kpt_density(self.sg1, kpt_density, multiplier=1.2))
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            plan_kpt_meshes(structure=self.sg1, min_density=3.0, max_density=2.0)
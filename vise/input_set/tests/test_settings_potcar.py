@@ -3,7 +3,7 @@ from copy import deepcopy
 
 from pymatgen.io.vasp import Potcar
 
-from vise.input_set.settings_potcar import XcTaskPotcar
+from vise.input_set.settings_potcar import PotcarPool, XcTaskPotcar
 from vise.input_set.xc import Xc
 
 from vise.util.testing import ViseTest
@@ -45,3 +45,22 @@ class XcTaskPotcarTest(ViseTest):
 
         expected = Potcar(["Mg_pv", "O"], functional="PBE_54").as_dict()
         self.assertEqual(expected, xc_task_potcar.potcar.as_dict())
+
+
+class PotcarPoolTest(ViseTest):
+    def setUp(self) -> None:
+        self.pool = PotcarPool()
+
+    def test_single(self) -> None:
+        mg = self.pool.single("Mg", "PBE_54")
+        self.assertIs(mg, self.pool.single("Mg", "PBE_54"))
+        self.assertEqual(1, len(self.pool))
+
+    def test_potcar(self) -> None:
+        expected = Potcar(["Mg_pv", "O"], functional="PBE_54")
+        actual = self.pool.potcar(["Mg_pv", "O"], "PBE_54")
+        self.assertEqual(expected.as_dict(), actual.as_dict())
+        self.assertEqual(str(expected), str(actual))
+
+    def test_enmax(self) -> None:
+        self.assertEqual(400.0, self.pool.enmax("O", "PBE_54"))
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import os
+import tempfile
+from pathlib import Path
+
+from monty.serialization import loadfn
 from pymatgen.io.vasp import Potcar
 
 from vise.input_set.settings_util import (
-    load_potcar_yaml, load_default_incar_settings, check_keys, nelect, nbands)
+    DatasetCache, SET_DIR, load_dataset, load_potcar_yaml,
+    load_default_incar_settings, check_keys, nelect, nbands)
 from vise.input_set.settings_incar import (
     XC_REQUIRED_FLAGS, XC_OPTIONAL_FLAGS)
 from vise.util.testing import ViseTest
@@ -29,6 +35,46 @@ class LoadPotcarYamlTest(ViseTest):
             load_potcar_yaml("not_exist_set_name")
 
 
+class DatasetCacheTest(ViseTest):
+    def test_load_dataset(self):
+        expected = loadfn(SET_DIR / "u_parameter_set.yaml")
+        actual = load_dataset("u_parameter_set.yaml")
+        self.assertEqual(expected, actual)
+        # Modifying the returned dict does not affect the cache.
+        actual["LDAUU"] = None
+        self.assertEqual(expected, load_dataset("u_parameter_set.yaml"))
+
+    def test_invalidate(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            filename = Path(tmp_dirname) / "a.yaml"
+            filename.write_text("a: 1\n")
+            cache = DatasetCache()
+            self.assertEqual({"a": 1}, cache.load(filename))
+
+            filename.write_text("a: 10\n")
+            os.utime(filename, ns=(0, 0))
+            self.assertEqual({"a": 10}, cache.load(filename))
+
+    def test_pickle(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            filename = Path(tmp_dirname) / "a.yaml"
+            filename.write_text("a: 1\n")
+            pickle_dir = Path(tmp_dirname) / "cache"
+            DatasetCache(pickle_dir=pickle_dir).load(filename)
+            self.assertEqual(1, len(list(pickle_dir.glob("a_*.pkl"))))
+
+            # The pickle is used by another cache while the yaml is unchanged.
+            stat = filename.stat()
+            filename.write_text("a: 2\n")
+            os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertEqual({"a": 1},
+                             DatasetCache(pickle_dir=pickle_dir).load(filename))
+
+            filename.write_text("a: 30\n")
+            self.assertEqual({"a": 30},
+                             DatasetCache(pickle_dir=pickle_dir).load(filename))
+
+
 class LoadDefaultIncarSettingsTest(ViseTest):
     def setUp(self):
         self.hse = \
@@ -1,22 +1,155 @@
 # -*- coding: utf-8 -*-
 
+from collections import OrderedDict
+from copy import deepcopy
+import hashlib
 from itertools import groupby
 import operator
-from typing import Tuple
+import os
+from pathlib import Path
+import pickle
+import tempfile
+from typing import List, Tuple, Optional
 
+import numpy as np
 import seekpath
 import spglib
 
 from pymatgen import Structure
+from pymatgen.core.lattice import Lattice
 from pymatgen.core.periodic_table import Element
 
-from vise.config import ANGLE_TOL, SYMMETRY_TOLERANCE, BAND_REF_DIST
+from vise.config import (
+    ANGLE_TOL, SYMMETRY_TOLERANCE, BAND_REF_DIST, SYMMETRY_CACHE_SIZE,
+    SEEKPATH_CACHE_DIR)
 from vise.util.logger import get_logger
 
 
 logger = get_logger(__name__)
 
 
+class SymmetryCache:
+    """LRU cache of spglib and seekpath results for each structure.
+
+    Spglib and seekpath are called many times for the same structure with the
+    same symprec and angle_tolerance while constructing an input set, and
+    the symmetry search is the dominant cost for large cells. Thus, the
+    results are stored with a key of the canonical hash of the lattice,
+    fractional coordinates, species, symprec and angle_tolerance.
+
+    Each entry is a dict that can hold the following keys.
+        "dataset": spglib symmetry dataset.
+        "primitive": spglib cell tuple of the primitive cell.
+        "conventional": spglib cell tuple of the standardized conventional cell.
+        "seekpath": dict of seekpath results with the seekpath args as keys.
+    """
+
+    def __init__(self, max_size: int = SYMMETRY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(structure: Structure,
+            symprec: float,
+            angle_tolerance: float) -> str:
+        """Canonical hash of the structure and tolerances. """
+        lattice, positions, atomic_numbers = structure_to_spglib_cell(structure)
+        # Fractional coordinates are wrapped to [0, 1) and both lattice and
+        # positions are rounded to remove the numerical noise.
+        frac_coords = np.round(np.mod(np.round(positions, 8), 1.0), 8)
+        h = hashlib.sha1()
+        h.update(np.round(np.array(lattice, dtype=float), 8).tobytes())
+        h.update(np.ascontiguousarray(frac_coords, dtype=float).tobytes())
+        h.update(np.array(atomic_numbers, dtype=int).tobytes())
+        h.update(f"{float(symprec)}_{float(angle_tolerance)}".encode())
+        return h.hexdigest()
+
+    def entry(self,
+              structure: Structure,
+              symprec: float,
+              angle_tolerance: float) -> dict:
+        """Return the entry, and create an empty one if not exists. """
+        key = self.key(structure, symprec, angle_tolerance)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            self._entries[key] = {"seekpath": {}}
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+symmetry_cache = SymmetryCache()
+
+
+class SeekpathDiskCache:
+    """Persistent content-addressed store of seekpath results.
+
+    Band inputs are regenerated many times for the same relaxed structures,
+    so the results of seekpath.get_explicit_k_path are pickled in cache_dir
+    with a file name of the hash of the structure fingerprint and the seekpath
+    arguments. When cache_dir is None, nothing is stored.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = SEEKPATH_CACHE_DIR):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+    @staticmethod
+    def key(structure: Structure,
+            time_reversal: bool,
+            ref_distance: float,
+            recipe: str,
+            threshold: float,
+            symprec: float,
+            angle_tolerance: float) -> str:
+        fingerprint = SymmetryCache.key(structure, symprec, angle_tolerance)
+        args = f"{time_reversal}_{float(ref_distance)}_{recipe}_" \
+               f"{float(threshold)}_{seekpath.__version__}"
+        return hashlib.sha1(f"{fingerprint}_{args}".encode()).hexdigest()
+
+    def load(self, key: str) -> Optional[dict]:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.cache_dir / f"{key}.pkl", "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError):
+            logger.warning(f"Seekpath cache {key} is broken and ignored.")
+            return None
+
+    def save(self, key: str, res: dict) -> None:
+        if self.cache_dir is None:
+            return
+        tmp_name = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so that concurrent processes
+            # never read a partially written file.
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(res, f)
+            os.replace(tmp_name, self.cache_dir / f"{key}.pkl")
+        except OSError as e:
+            logger.warning(f"Seekpath cache {key} cannot be written: {e}")
+            if tmp_name:
+                try:
+                    os.remove(tmp_name)
+                except OSError:
+                    pass
+
+
+seekpath_disk_cache = SeekpathDiskCache()
+
+
 def get_symmetry_dataset(structure: Structure,
                          symprec: float = SYMMETRY_TOLERANCE,
                          angle_tolerance: float = ANGLE_TOL) -> dict:
@@ -34,10 +167,14 @@ def get_symmetry_dataset(structure: Structure,
     Return:
         spglib symmetry dataset. See docstrings of spglib for details.
     """
-    cell = structure_to_spglib_cell(structure)
-    return spglib.get_symmetry_dataset(cell=cell,
-                                       symprec=symprec,
-                                       angle_tolerance=angle_tolerance)
+    entry = symmetry_cache.entry(structure, symprec, angle_tolerance)
+    if "dataset" not in entry:
+        cell = structure_to_spglib_cell(structure)
+        entry["dataset"] = \
+            spglib.get_symmetry_dataset(cell=cell,
+                                        symprec=symprec,
+                                        angle_tolerance=angle_tolerance)
+    return deepcopy(entry["dataset"])
 
 
 def structure_to_spglib_cell(structure: Structure) -> Tuple[list, list, list]:
@@ -90,13 +227,16 @@ def find_spglib_standard_conventional(structure: Structure,
     Returns:
         Structure of a standard conventional unit cell.
     """
-    cell = structure_to_spglib_cell(structure)
-    return spglib_cell_to_structure(
-        spglib.standardize_cell(cell=cell,
-                                to_primitive=False,
-                                no_idealize=False,
-                                symprec=symprec,
-                                angle_tolerance=angle_tolerance))
+    entry = symmetry_cache.entry(structure, symprec, angle_tolerance)
+    if "conventional" not in entry:
+        cell = structure_to_spglib_cell(structure)
+        entry["conventional"] = \
+            spglib.standardize_cell(cell=cell,
+                                    to_primitive=False,
+                                    no_idealize=False,
+                                    symprec=symprec,
+                                    angle_tolerance=angle_tolerance)
+    return spglib_cell_to_structure(entry["conventional"])
 
 
 def find_spglib_primitive(structure: Structure,
@@ -116,10 +256,14 @@ def find_spglib_primitive(structure: Structure,
     Returns:
         Structure of a primitive unit cell.
     """
-    cell = structure_to_spglib_cell(structure)
-    primitive_cell = spglib.find_primitive(cell=cell,
-                                           symprec=symprec,
-                                           angle_tolerance=angle_tolerance)
+    entry = symmetry_cache.entry(structure, symprec, angle_tolerance)
+    if "primitive" not in entry:
+        cell = structure_to_spglib_cell(structure)
+        entry["primitive"] = \
+            spglib.find_primitive(cell=cell,
+                                  symprec=symprec,
+                                  angle_tolerance=angle_tolerance)
+    primitive_cell = entry["primitive"]
     if primitive_cell is None:
         raise SpglibError("spglib couldn't find the primitive cell."
                           "Chenge the symprec and/or angle_tolerance.")
@@ -130,6 +274,86 @@ def find_spglib_primitive(structure: Structure,
     return primitive_structure, is_structure_changed
 
 
+def structure_fingerprint(structure: Structure,
+                          symprec: float = SYMMETRY_TOLERANCE,
+                          angle_tolerance: float = ANGLE_TOL,
+                          length_digits: int = 2,
+                          angle_digits: int = 1) -> str:
+    """Cheap canonical fingerprint for finding duplicated structures.
+
+    Composed of the reduced formula, space group number, sorted Wyckoff
+    letters of the independent sites, and the sorted lengths and angles of the
+    Niggli-reduced lattice of the primitive cell. Symmetry-equivalent
+    structures, e.g., a primitive cell and its supercells, have the same
+    fingerprint. Note that the lattice invariants are rounded, so nearly
+    identical structures close to the rounding boundaries could have
+    different fingerprints.
+
+    Args:
+        structure (Structure):
+            Pymatgen Structure class object
+        symprec (float):
+            Distance tolerance in cartesian coordinates Unit is compatible with
+            the cell.
+        angle_tolerance (float):
+            Angle tolerance used for symmetry analyzer.
+        length_digits (int):
+            Number of decimal digits of lattice lengths in Angstrom.
+        angle_digits (int):
+            Number of decimal digits of lattice angles in degree.
+
+    Returns:
+        Fingerprint string.
+    """
+    dataset = get_symmetry_dataset(structure, symprec, angle_tolerance)
+    primitive, _ = find_spglib_primitive(structure, symprec, angle_tolerance)
+    lattice = primitive.lattice.get_niggli_reduced_lattice()
+    # Adding 0.0 removes the negative zeros.
+    lengths = sorted(float(round(x, length_digits)) + 0.0
+                     for x in lattice.abc)
+    angles = sorted(float(round(x, angle_digits)) + 0.0
+                    for x in lattice.angles)
+    # Wyckoff letters of the symmetrically independent sites.
+    orbits = set(zip(dataset["wyckoffs"], dataset["equivalent_atoms"]))
+    wyckoffs = "".join(sorted(w for w, _ in orbits))
+
+    return f"{structure.composition.reduced_formula}_{dataset['number']}_" \
+           f"{wyckoffs}_{lengths}_{angles}"
+
+
+def group_duplicated_structures(structures: List[Structure],
+                                symprec: float = SYMMETRY_TOLERANCE,
+                                angle_tolerance: float = ANGLE_TOL,
+                                keys: Optional[List[str]] = None
+                                ) -> List[List[int]]:
+    """Group the structures with the same fingerprints.
+
+    Args:
+        structures (List[Structure]):
+            Pymatgen Structure class objects.
+        symprec (float):
+            Distance tolerance in cartesian coordinates Unit is compatible with
+            the cell.
+        angle_tolerance (float):
+            Angle tolerance used for symmetry analyzer.
+        keys (List[str]):
+            Additional keys for each structure. Structures with different keys
+            are not grouped even if they are duplicated.
+
+    Returns:
+        List of the indices of the structures in each group, which is ordered
+        by the first index. The first index is the representative.
+    """
+    groups = {}
+    for i, structure in enumerate(structures):
+        fingerprint = structure_fingerprint(structure, symprec,
+                                            angle_tolerance)
+        key = (fingerprint, keys[i] if keys else None)
+        groups.setdefault(key, []).append(i)
+
+    return list(groups.values())
+
+
 def find_hpkot_primitive(structure: Structure,
                          symprec: float = SYMMETRY_TOLERANCE,
                          angle_tolerance: float = ANGLE_TOL
@@ -147,10 +371,13 @@ def find_hpkot_primitive(structure: Structure,
     Returns:
          Structure of a hpkot primitive unit cell.
     """
-    cell = structure_to_spglib_cell(structure)
-    res = seekpath.get_explicit_k_path(structure=cell,
-                                       symprec=symprec,
-                                       angle_tolerance=angle_tolerance)
+    res = _cached_seekpath(structure=structure,
+                           time_reversal=True,
+                           ref_distance=BAND_REF_DIST,
+                           recipe="hpkot",
+                           threshold=1e-7,
+                           symprec=symprec,
+                           angle_tolerance=angle_tolerance)
 
     return seekpath_to_hpkot_structure(res)
 
@@ -184,24 +411,53 @@ def structure_to_seekpath(structure: Structure,
     Return:
         Dict with some properties. See docstrings of seekpath.
     """
-    cell = structure_to_spglib_cell(structure)
-    res = seekpath.get_explicit_k_path(cell,
-                                       with_time_reversal=time_reversal,
-                                       reference_distance=ref_distance,
-                                       recipe=recipe,
-                                       threshold=threshold,
-                                       symprec=symprec,
-                                       angle_tolerance=angle_tolerance)
+    res = _cached_seekpath(structure=structure,
+                           time_reversal=time_reversal,
+                           ref_distance=ref_distance,
+                           recipe=recipe,
+                           threshold=threshold,
+                           symprec=symprec,
+                           angle_tolerance=angle_tolerance)
 
     # If numpy.allclose is too strict in pymatgen.core.lattice __eq__,
     # make almost_equal
-    if structure.lattice != seekpath_to_hpkot_structure(res).lattice:
+    if structure.lattice != Lattice(res["primitive_lattice"]):
         logger.warning(
             "Given structure is modified to be compatible with HPKOT k-path.")
 
     return res
 
 
+def _cached_seekpath(structure: Structure,
+                     time_reversal: bool,
+                     ref_distance: float,
+                     recipe: str,
+                     threshold: float,
+                     symprec: float,
+                     angle_tolerance: float) -> dict:
+    """Return a copy of seekpath result stored in symmetry_cache. """
+    entry = symmetry_cache.entry(structure, symprec, angle_tolerance)
+    seekpath_key = (time_reversal, ref_distance, recipe, threshold)
+    if seekpath_key not in entry["seekpath"]:
+        disk_key = SeekpathDiskCache.key(structure, *seekpath_key,
+                                         symprec, angle_tolerance)
+        res = seekpath_disk_cache.load(disk_key)
+        if res is None:
+            cell = structure_to_spglib_cell(structure)
+            res = seekpath.get_explicit_k_path(
+                cell,
+                with_time_reversal=time_reversal,
+                reference_distance=ref_distance,
+                recipe=recipe,
+                threshold=threshold,
+                symprec=symprec,
+                angle_tolerance=angle_tolerance)
+            seekpath_disk_cache.save(disk_key, res)
+        entry["seekpath"][seekpath_key] = res
+
+    return deepcopy(entry["seekpath"][seekpath_key])
+
+
 def seekpath_to_hpkot_structure(res: dict) -> Structure:
     """
     Args:
@@ -1,16 +1,56 @@
 # -*- coding: utf-8 -*-
 #  Copyright (c) 2020. Distributed under the terms of the MIT License.
 
+import os
+import tempfile
+from unittest.mock import patch
+
 import numpy as np
 
 from pymatgen.analysis.structure_matcher import StructureMatcher
 
 from vise.util.structure_handler import (
     get_symmetry_dataset, structure_to_spglib_cell, spglib_cell_to_structure,
-    find_hpkot_primitive, structure_to_seekpath)
+    find_hpkot_primitive, structure_to_seekpath, SymmetryCache,
+    symmetry_cache, SeekpathDiskCache, structure_fingerprint,
+    group_duplicated_structures)
 from vise.util.testing import ViseTest
 
 
+class SymmetryCacheTest(ViseTest):
+
+    def setUp(self):
+        self.mgo = self.get_structure_by_name("MgO")
+        self.conv_mgo = self.get_structure_by_name("conventional_MgO")
+        symmetry_cache.clear()
+
+    def test_key(self):
+        self.assertEqual(SymmetryCache.key(self.mgo, 0.01, 5),
+                         SymmetryCache.key(self.mgo.copy(), 0.01, 5))
+        self.assertNotEqual(SymmetryCache.key(self.mgo, 0.01, 5),
+                            SymmetryCache.key(self.mgo, 0.1, 5))
+        self.assertNotEqual(SymmetryCache.key(self.mgo, 0.01, 5),
+                            SymmetryCache.key(self.conv_mgo, 0.01, 5))
+
+    def test_lru(self):
+        cache = SymmetryCache(max_size=1)
+        cache.entry(self.mgo, 0.01, 5)["dataset"] = "a"
+        cache.entry(self.conv_mgo, 0.01, 5)
+        self.assertEqual(1, len(cache))
+        self.assertNotIn("dataset", cache.entry(self.mgo, 0.01, 5))
+
+    @patch("vise.util.structure_handler.spglib.get_symmetry_dataset",
+           return_value={"number": 225})
+    def test_dataset_cached(self, mock):
+        get_symmetry_dataset(self.mgo)
+        actual = get_symmetry_dataset(self.mgo.copy())
+        self.assertEqual({"number": 225}, actual)
+        mock.assert_called_once()
+
+    def tearDown(self) -> None:
+        symmetry_cache.clear()
+
+
 class GetSymmetryDatasetTest(ViseTest):
 
     def setUp(self):
@@ -21,6 +61,87 @@ class GetSymmetryDatasetTest(ViseTest):
         print(dataset)
 
 
+class SeekpathDiskCacheTest(ViseTest):
+
+    def setUp(self):
+        self.mgo = self.get_structure_by_name("MgO")
+        symmetry_cache.clear()
+
+    def test_key(self):
+        args = {"time_reversal": True, "ref_distance": 0.025,
+                "recipe": "hpkot", "threshold": 1e-7, "symprec": 0.01,
+                "angle_tolerance": 5}
+        key = SeekpathDiskCache.key(self.mgo, **args)
+        self.assertEqual(key, SeekpathDiskCache.key(self.mgo.copy(), **args))
+        args["time_reversal"] = False
+        self.assertNotEqual(key, SeekpathDiskCache.key(self.mgo, **args))
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            cache = SeekpathDiskCache(tmp_dirname)
+            self.assertIsNone(cache.load("a"))
+            cache.save("a", {"b": np.array([1, 2])})
+            np.testing.assert_equal(np.array([1, 2]), cache.load("a")["b"])
+
+    @patch("vise.util.structure_handler.pickle.dump",
+           side_effect=OSError("No space left on device"))
+    def test_save_failed(self, _):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            cache = SeekpathDiskCache(tmp_dirname)
+            cache.save("a", {"b": 1})
+            self.assertEqual([], os.listdir(tmp_dirname))
+            self.assertIsNone(cache.load("a"))
+
+    def test_disabled(self):
+        cache = SeekpathDiskCache(None)
+        cache.save("a", {"b": 1})
+        self.assertIsNone(cache.load("a"))
+
+    def test_seekpath_from_disk(self):
+        with tempfile.TemporaryDirectory() as tmp_dirname:
+            cache = SeekpathDiskCache(tmp_dirname)
+            with patch("vise.util.structure_handler.seekpath_disk_cache",
+                       cache):
+                expected = structure_to_seekpath(self.mgo)
+                symmetry_cache.clear()
+                with patch("vise.util.structure_handler.seekpath."
+                           "get_explicit_k_path") as mock:
+                    actual = structure_to_seekpath(self.mgo)
+                    mock.assert_not_called()
+        self.assertEqual(expected["explicit_kpoints_labels"],
+                         actual["explicit_kpoints_labels"])
+
+    def tearDown(self) -> None:
+        symmetry_cache.clear()
+
+
+class StructureFingerprintTest(ViseTest):
+    def setUp(self):
+        self.mgo = self.get_structure_by_name("MgO")
+        self.conv_mgo = self.get_structure_by_name("conventional_MgO")
+        self.translated_mgo = self.mgo.copy()
+        self.translated_mgo.translate_sites(list(range(len(self.mgo))),
+                                            [0.1, 0.2, 0.3])
+        self.strained_mgo = self.mgo.copy()
+        self.strained_mgo.scale_lattice(self.mgo.volume * 1.1)
+
+    def test_fingerprint(self):
+        expected = structure_fingerprint(self.mgo)
+        self.assertTrue(expected.startswith("MgO_225_"))
+        self.assertEqual(expected, structure_fingerprint(self.conv_mgo))
+        self.assertEqual(expected, structure_fingerprint(self.mgo * 2))
+        self.assertEqual(expected, structure_fingerprint(self.translated_mgo))
+        self.assertNotEqual(expected, structure_fingerprint(self.strained_mgo))
+
+    def test_group(self):
+        structures = [self.mgo, self.strained_mgo, self.conv_mgo, self.mgo]
+        self.assertEqual([[0, 2, 3], [1]],
+                         group_duplicated_structures(structures))
+        self.assertEqual([[0, 2], [1], [3]],
+                         group_duplicated_structures(
+                             structures, keys=["a", "a", "a", "b"]))
+
+
 class StructureToSpglibCellTest(ViseTest):
 
     def setUp(self):
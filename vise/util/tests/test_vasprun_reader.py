@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from pymatgen.io.vasp import Vasprun
+
+from vise.util.testing import ViseTest
+from vise.util.vasprun_reader import LightVasprun, RelaxationProbe
+
+vasprun_file = ViseTest.TEST_FILES_DIR / "chempotdiag" / "MgO" / \
+               "vasprun.xml.finish"
+
+
+class LightVasprunTest(ViseTest):
+
+    def setUp(self) -> None:
+        self.light = LightVasprun(vasprun_file)
+        self.vasprun = Vasprun(str(vasprun_file))
+
+    def test_final_energy(self):
+        self.assertEqual(self.vasprun.final_energy, self.light.final_energy)
+
+    def test_num_ionic_steps(self):
+        self.assertEqual(len(self.vasprun.ionic_steps),
+                         self.light.num_ionic_steps)
+
+    def test_final_structure(self):
+        self.assertEqual(self.vasprun.final_structure,
+                         self.light.final_structure)
+
+    def test_efermi(self):
+        self.assertEqual(self.vasprun.efermi, self.light.efermi)
+
+    def test_wo_structure(self):
+        light = LightVasprun(vasprun_file, parse_structure=False)
+        self.assertIsNone(light.final_structure)
+        self.assertEqual(self.light.final_energy, light.final_energy)
+
+
+class RelaxationProbeTest(ViseTest):
+
+    def setUp(self) -> None:
+        self.probe = RelaxationProbe(vasprun_file)
+
+    def test_num_ionic_steps(self):
+        self.assertEqual(1, self.probe.num_ionic_steps)
+
+    def test_last_step(self):
+        self.assertEqual(0.0, self.probe.max_force)
+        self.assertEqual(0.08998524, self.probe.max_stress)
+        self.assertEqual(0.0, self.probe.volume_change)
+
+    def test_small_chunk(self):
+        probe = RelaxationProbe(vasprun_file, chunk_size=7)
+        self.assertEqual(str(self.probe), str(probe))
+
+    def test_is_converged(self):
+        self.assertTrue(self.probe.is_converged())
+        self.probe.num_ionic_steps = 2
+        self.assertFalse(self.probe.is_converged())
+        self.assertTrue(self.probe.is_converged(force_criterion=0.01,
+                                                volume_criterion=0.001))
+        self.probe.volume_change = 0.01
+        self.assertFalse(self.probe.is_converged(force_criterion=0.01,
+                                                 volume_criterion=0.001))
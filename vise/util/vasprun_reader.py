@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+import re
+from typing import List, Optional, Union
+from xml.etree.ElementTree import Element as XmlElement, iterparse
+
+from pymatgen import Structure
+
+from vise.util.logger import get_logger
+
+""" Light-weight readers of vasprun.xml for a few final quantities. """
+
+logger = get_logger(__name__)
+
+# Large subtrees in a calculation that are not used and discarded immediately.
+DISCARDED_TAGS = {"eigenvalues", "projected", "dos", "dynmat", "scstep"}
+
+
+class LightVasprun:
+    """Streaming vasprun.xml reader only for the final energy and structure.
+
+    Elements are parsed with iterparse and cleared one by one, so the memory
+    usage does not depend on the number of ionic steps nor on the size of the
+    eigenvalues and projections, unlike pymatgen.io.vasp.Vasprun.
+
+    Attributes:
+        final_energy (float):
+            Energy without entropy at the last ionic step, which corresponds
+            to Vasprun.final_energy. If not found, float("inf").
+        num_ionic_steps (int):
+            Number of ionic steps, which corresponds to
+            len(Vasprun.ionic_steps).
+        final_structure (Structure):
+            Final structure. None when parse_structure is False.
+        efermi (float):
+            Fermi level in eV. None when it does not exist.
+    """
+
+    def __init__(self,
+                 filename: Union[str, Path],
+                 parse_structure: bool = True):
+        """
+        Args:
+            filename (str/Path):
+                vasprun.xml file name.
+            parse_structure (bool):
+                Whether to parse the final structure.
+        """
+        self.filename = str(filename)
+        self.final_energy = float("inf")
+        self.num_ionic_steps = 0
+        self.final_structure = None
+        self.efermi = None
+
+        self._parse(parse_structure)
+
+    def _parse(self, parse_structure: bool) -> None:
+        atomic_symbols = []
+        tag_stack = []
+        for event, elem in iterparse(self.filename, events=("start", "end")):
+            if event == "start":
+                tag_stack.append(elem.tag)
+                continue
+
+            tag_stack.pop()
+            parent = tag_stack[-1] if tag_stack else None
+            tag = elem.tag
+
+            if tag == "calculation":
+                self.num_ionic_steps += 1
+                energy = elem.find("energy")
+                if energy is not None:
+                    for i in energy.iter("i"):
+                        if i.get("name") == "e_wo_entrp":
+                            self.final_energy = float(i.text)
+                elem.clear()
+
+            elif tag == "i" and parent == "dos" \
+                    and elem.get("name") == "efermi":
+                self.efermi = float(elem.text)
+
+            elif tag in DISCARDED_TAGS and parent == "calculation":
+                elem.clear()
+
+            elif tag == "array" and parent == "atominfo" \
+                    and elem.get("name") == "atoms":
+                atomic_symbols = _atomic_symbols(elem)
+                elem.clear()
+
+            elif tag == "structure" and elem.get("name") == "finalpos":
+                if parse_structure:
+                    self.final_structure = _structure(elem, atomic_symbols)
+                elem.clear()
+
+        if self.num_ionic_steps == 0:
+            logger.warning(f"No ionic step is found in {self.filename}.")
+
+
+def _atomic_symbols(elem: XmlElement) -> List[str]:
+    symbols = []
+    for rc in elem.find("set"):
+        symbol = rc.find("c").text.strip()
+        # Same as pymatgen as vasp sometimes writes wrong symbols.
+        if symbol == "X":
+            symbol = "Xe"
+        elif symbol == "r":
+            symbol = "Zr"
+        symbols.append(symbol)
+    return symbols
+
+
+def _structure(elem: XmlElement, atomic_symbols: List[str]) -> Structure:
+    lattice = _varray(elem.find("crystal").find("varray[@name='basis']"))
+    coords = _varray(elem.find("varray[@name='positions']"))
+    return Structure(lattice, atomic_symbols, coords)
+
+
+def _varray(elem: XmlElement) -> List[List[float]]:
+    return [[float(x) for x in v.text.split()] for v in elem.iter("v")]
+
+
+class RelaxationProbe:
+    """Convergence of a relaxation without parsing the whole vasprun.xml.
+
+    The number of ionic steps is counted from OSZICAR, and the forces, the
+    stress and the final volume are read from the tail of vasprun.xml, which
+    starts at the structure of the last ionic step. The initial volume is read
+    from the head. Thus, no xml tree is constructed.
+
+    Attributes:
+        num_ionic_steps (int):
+            Number of ionic steps.
+        max_force (float):
+            Maximum norm of the forces at the last ionic step in eV/A. None
+            when it does not exist.
+        max_stress (float):
+            Maximum absolute value of the stress tensor components at the last
+            ionic step in kbar. None when it does not exist.
+        volume_change (float):
+            Final volume divided by the initial one minus 1. None when it does
+            not exist.
+    """
+
+    def __init__(self,
+                 vasprun: Union[str, Path],
+                 oszicar: Optional[Union[str, Path]] = None,
+                 chunk_size: int = 2 ** 20):
+        """
+        Args:
+            vasprun (str/Path):
+                vasprun.xml file name.
+            oszicar (str/Path):
+                OSZICAR file name of the same calculation. When it is not
+                given or does not exist, <calculation> tags in vasprun.xml are
+                counted instead.
+            chunk_size (int):
+                Size in bytes read at once from the tail of vasprun.xml.
+        """
+        self.vasprun = str(vasprun)
+        self.num_ionic_steps = _num_ionic_steps(self.vasprun, oszicar,
+                                                chunk_size)
+
+        # Named structures are the initial and final ones.
+        tail = _tail_from(self.vasprun, b"<structure>", chunk_size)
+        forces = _last_varray(tail, "forces")
+        stress = _last_varray(tail, "stress")
+        self.max_force = max(sum(f ** 2 for f in force) ** 0.5
+                             for force in forces) if forces else None
+        self.max_stress = \
+            max(abs(s) for row in stress for s in row) if stress else None
+
+        initial_volume = _initial_volume(self.vasprun)
+        volumes = _volume_pattern.findall(tail)
+        if initial_volume and volumes:
+            self.volume_change = float(volumes[-1]) / initial_volume - 1
+        else:
+            self.volume_change = None
+
+    def is_converged(self,
+                     force_criterion: Optional[float] = None,
+                     volume_criterion: Optional[float] = None) -> bool:
+        """Whether another relaxation is needless.
+
+        It is converged when the relaxation finished at the first ionic step.
+        Otherwise, when the criteria are given, the max force and the
+        absolute volume change must be equal to or smaller than them.
+
+        Args:
+            force_criterion (float):
+                Criterion of the max force in eV/A.
+            volume_criterion (float):
+                Criterion of the relative volume change, e.g., 0.001.
+
+        Returns:
+            Bool.
+        """
+        if self.num_ionic_steps == 1:
+            return True
+        if force_criterion is None and volume_criterion is None:
+            return False
+        if force_criterion is not None and \
+                (self.max_force is None or self.max_force > force_criterion):
+            return False
+        if volume_criterion is not None and \
+                (self.volume_change is None
+                 or abs(self.volume_change) > volume_criterion):
+            return False
+        return True
+
+    def __str__(self):
+        return f"ionic steps: {self.num_ionic_steps}, " \
+               f"max force: {self.max_force}, " \
+               f"max stress: {self.max_stress}, " \
+               f"volume change: {self.volume_change}"
+
+
+_volume_pattern = re.compile(r'<i name="volume">\s*(\S+)\s*</i>')
+_ionic_step_pattern = re.compile(r"^\s*\d+\s+F=", re.MULTILINE)
+
+
+def _num_ionic_steps(vasprun: str,
+                     oszicar: Optional[Union[str, Path]],
+                     chunk_size: int) -> int:
+    if oszicar is not None and Path(oszicar).exists():
+        with open(oszicar) as f:
+            return len(_ionic_step_pattern.findall(f.read()))
+
+    tag = b"<calculation>"
+    result = 0
+    remainder = b""
+    with open(vasprun, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            chunk = remainder + chunk
+            result += chunk.count(tag)
+            # Keep the end that could be the beginning of the tag.
+            remainder = chunk[-(len(tag) - 1):]
+    return result
+
+
+def _tail_from(filename: str, pattern: bytes, chunk_size: int) -> str:
+    """Text from the last occurrence of pattern to the end of file.
+
+    The whole file is returned when the pattern is not found.
+    """
+    with open(filename, "rb") as f:
+        f.seek(0, 2)
+        position = f.tell()
+        tail = b""
+        while position > 0:
+            size = min(chunk_size, position)
+            position -= size
+            f.seek(position)
+            tail = f.read(size) + tail
+            index = tail.rfind(pattern)
+            if index >= 0:
+                tail = tail[index:]
+                break
+    return tail.decode("utf-8", errors="replace")
+
+
+def _last_varray(text: str, name: str) -> List[List[float]]:
+    start = text.rfind(f'<varray name="{name}"')
+    if start < 0:
+        return []
+    end = text.find("</varray>", start)
+    if end < 0:
+        # Writing the varray has not finished.
+        return []
+    vectors = re.findall(r"<v>(.*?)</v>", text[start:end], re.DOTALL)
+    return [[float(x) for x in v.split()] for v in vectors]
+
+
+def _initial_volume(filename: str) -> Optional[float]:
+    with open(filename) as f:
+        for line in f:
+            if "<calculation>" in line:
+                break
+            match = _volume_pattern.search(line)
+            if match:
+                return float(match.group(1))
+    return None